@@ -0,0 +1,30 @@
+"""Shared setup for benchmarks that need the ORM: configures Django and a fresh test database."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+
+import django
+
+
+def setup(keepdb=False):
+    django.setup()
+    from django.test.utils import setup_test_environment
+    from django.test.runner import DiscoverRunner
+
+    setup_test_environment()
+    return DiscoverRunner(verbosity=0, keepdb=keepdb).setup_databases()
+
+
+def timed(fn, repeat=3):
+    """Best wall time of `repeat` runs of fn(), in seconds."""
+    import time
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
@@ -0,0 +1,98 @@
+"""
+Archive export and import throughput (planer/archive.py) on a million points:
+100 routes of 10000 points plus boards with dots and paths. Exports to a
+file, plain and gzipped, then imports the plain archive for another user.
+Peak RSS growth shows that neither direction holds the data in memory; the
+test database is a file so that SQLite's pages do not count towards it.
+
+    python benchmarks/bench_archive.py [--routes 100] [--points 10000] [--boards 200]
+"""
+import argparse
+import gzip
+import os
+import random
+import resource
+import tempfile
+import time
+
+import _django
+from django.conf import settings
+
+DB_DIR = tempfile.TemporaryDirectory()
+settings.DATABASES['default']['TEST'] = {'NAME': os.path.join(DB_DIR.name, 'bench.sqlite3')}
+_django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from planer.archive import export_archive, import_archive, read_records
+from planer.models import SEQ_GAP, BackgroundImage, Dot, GameBoard, Route, UserPath
+
+BATCH = 20000
+
+
+def populate(user, routes, points, boards):
+    rng = random.Random(0)
+    background = BackgroundImage.objects.create(name='bg', image='backgrounds/bench.jpg')
+    Route.objects.bulk_create([Route(user=user, background=background, name=f'R{i}') for i in range(routes)])
+    GameBoard.objects.bulk_create([GameBoard(user=user, name=f'B{i}', rows=10, cols=10) for i in range(boards)])
+    board_ids = list(GameBoard.objects.filter(user=user).values_list('id', flat=True))
+    Dot.objects.bulk_create(
+        [Dot(board_id=b, row=r, col=c, color=f'#{r:02X}{c:02X}00') for b in board_ids for r in range(10) for c in (0, 9)],
+        batch_size=5000,
+    )
+    path = [{'row': r, 'col': c, 'color': f'#{r:02X}0000', 'route': 0} for r in range(10) for c in range(1, 9)]
+    UserPath.objects.bulk_create([UserPath(board_id=b, user=user, name='p', path=path, step_count=len(path))
+                                  for b in board_ids for _ in range(5)], batch_size=1000)
+    rows = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for route_id in Route.objects.values_list('id', flat=True):
+            for i in range(points):
+                rows.append((route_id, rng.uniform(0, 1000), rng.uniform(0, 1000), (i + 1) * SEQ_GAP))
+                if len(rows) >= BATCH:
+                    cursor.executemany('INSERT INTO planer_point (route_id, x, y, seq) VALUES (%s, %s, %s, %s)', rows)
+                    rows = []
+        if rows:
+            cursor.executemany('INSERT INTO planer_point (route_id, x, y, seq) VALUES (%s, %s, %s, %s)', rows)
+
+
+def max_rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--routes', type=int, default=100)
+    parser.add_argument('--points', type=int, default=10000)
+    parser.add_argument('--boards', type=int, default=200)
+    args = parser.parse_args()
+
+    source = User.objects.create_user(username='source', password='bench')
+    target = User.objects.create_user(username='target', password='bench')
+    populate(source, args.routes, args.points, args.boards)
+    rows = args.routes * args.points + args.boards * (1 + 20 + 5) + args.routes
+    print(f"{args.routes} routes x {args.points} points, {args.boards} boards: {rows} rows")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, opener, name in (('export', open, 'a.ndjson'), ('export gz', gzip.open, 'a.ndjson.gz')):
+            path = os.path.join(tmp, name)
+            rss = max_rss_mib()
+            start = time.perf_counter()
+            with opener(path, 'wb') as out:
+                for chunk in export_archive(source):
+                    out.write(chunk)
+            elapsed = time.perf_counter() - start
+            print(f"  {label:<10} {elapsed:7.2f} s  {rows / elapsed:10.0f} rows/s  "
+                  f"{os.path.getsize(path) / 2**20:7.1f} MiB  peak RSS +{max_rss_mib() - rss:.0f} MiB")
+
+        rss = max_rss_mib()
+        start = time.perf_counter()
+        with open(os.path.join(tmp, 'a.ndjson'), 'rb') as source_file:
+            report = import_archive(target, read_records(source_file))
+        elapsed = time.perf_counter() - start
+        assert report['complete'], report
+        print(f"  {'import':<10} {elapsed:7.2f} s  {rows / elapsed:10.0f} rows/s  "
+              f"{'':>11}  peak RSS +{max_rss_mib() - rss:.0f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Board payloads of the REST API (GameBoardViewSet): response size and time
+of one board's detail in each dot layout, and of a page of boards, on
+generated boards (planer/generator.py).
+
+    python benchmarks/bench_board_api.py [--size 30] [--pairs 60] [--boards 50]
+"""
+import argparse
+import time
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from planer.generator import create_boards, generate_layouts
+
+LAYOUTS = ('objects', 'columns', 'grid')
+
+
+def measure(client, url, params, repeat=20):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        resp = client.get(url, params)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    assert resp.status_code == 200, resp.status_code
+    with CaptureQueriesContext(connection) as queries:
+        client.get(url, params)
+    return len(resp.content), best, len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=30)
+    parser.add_argument('--pairs', type=int, default=60)
+    parser.add_argument('--boards', type=int, default=50)
+    args = parser.parse_args()
+    user = User.objects.create_user(username='bench', password='x')
+    layouts = generate_layouts(args.size, args.size, args.pairs, args.boards, seed=1)
+    ids = create_boards(user, args.size, args.size, layouts)
+    client = APIClient()
+    client.force_authenticate(user)
+
+    print(f"{args.size}x{args.size} boards, {2 * args.pairs} dots each")
+    for layout in LAYOUTS:
+        size, seconds, queries = measure(client, f'/planer/api/plansze/{ids[0]}/', {'dots': layout})
+        print(f"detail  {layout:>8}: {size:7d} B {seconds * 1000:6.2f} ms {queries} queries")
+    for layout in LAYOUTS:
+        size, seconds, queries = measure(
+            client, '/planer/api/plansze/', {'dots': layout, 'page_size': args.boards}, repeat=5,
+        )
+        print(f"list    {layout:>8}: {size:7d} B {seconds * 1000:6.2f} ms {queries} queries")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Board save: the old delete-all + per-dot INSERT path against the diff-based
+planer.boards.save_board_dots, at 10 / 1k / 10k dots.
+
+    python benchmarks/bench_board_save.py
+"""
+import json
+import random
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection
+from planer.boards import parse_dots, save_board_dots
+from planer.models import Dot, GameBoard
+
+
+def legacy_save(board, dots_json):
+    board.dots.all().delete()
+    for dot in json.loads(dots_json):
+        Dot.objects.create(board=board, row=dot['row'], col=dot['col'], color=dot['color'])
+
+
+def new_save(board, dots_json):
+    save_board_dots(board, parse_dots(dots_json, board.rows, board.cols))
+
+
+def make_dots(n, side, seed):
+    rng = random.Random(seed)
+    cells = rng.sample([(r, c) for r in range(side) for c in range(side)], n)
+    return [{'row': r, 'col': c, 'color': rng.choice(['#e41a1c', '#377eb8', '#4daf4a'])} for r, c in cells]
+
+
+def run(label, fn, board, first, second):
+    fn(board, first)
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        elapsed = _django.timed(lambda: fn(board, second), repeat=1)
+    print(f"  {label:<8} {elapsed * 1000:9.1f} ms  {len(queries):6d} queries")
+
+
+def main():
+    user = User.objects.create_user(username='bench', password='bench')
+    for n in (10, 1000, 10000):
+        side = 100
+        dots = make_dots(n, side, seed=n)
+        # Second save keeps 90% of the dots, recolors some and moves the rest.
+        edited = [dict(d) for d in dots[: n * 9 // 10]]
+        for d in edited[::7]:
+            d['color'] = '#984ea3'
+        taken = {(d['row'], d['col']) for d in edited}
+        extra = [d for d in make_dots(n, side, seed=n + 1) if (d['row'], d['col']) not in taken]
+        edited += extra[: n - len(edited)]
+        first, second = json.dumps(dots), json.dumps(edited)
+        for label, dots_json in (('resave', first), ('edit', second)):
+            print(f"{n} dots, {label}:")
+            for name, fn in (('legacy', legacy_save), ('diff', new_save)):
+                board = GameBoard.objects.create(user=user, name=f'{name}-{n}', rows=side, cols=side)
+                run(name, fn, board, first, dots_json)
+
+
+if __name__ == '__main__':
+    main()
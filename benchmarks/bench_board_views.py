@@ -0,0 +1,57 @@
+"""
+GET latency of the board views (edit, draw path, create route) on boards with
+100 / 2k / 10k dots, with the per-board snapshot cache cold and warm.
+
+    python benchmarks/bench_board_views.py
+"""
+import random
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User
+from django.test import Client
+from django.urls import reverse
+from planer.board_cache import board_cache
+from planer.boards import save_board_dots
+from planer.models import GameBoard
+
+VIEWS = ('edit_board', 'draw_path', 'create_route_on_board')
+REQUESTS = 20
+
+
+def main():
+    user = User.objects.create_user(username='bench', password='bench')
+    client = Client()
+    client.force_login(user)
+    colors = [f'#{i:06x}' for i in range(0, 0xffffff, 0x1111)]
+    for n in (100, 2000, 10000):
+        side = 100
+        board = GameBoard.objects.create(user=user, name=f'B{n}', rows=side, cols=side)
+        rng = random.Random(n)
+        cells = rng.sample([(r, c) for r in range(side) for c in range(side)], n)
+        save_board_dots(board, {cell: colors[i // 2 % len(colors)] for i, cell in enumerate(cells)})
+        print(f"{n} dots:")
+        for name in VIEWS:
+            url = reverse(name, args=[board.id])
+
+            def cold():
+                for _ in range(REQUESTS):
+                    board_cache.clear()
+                    client.get(url)
+
+            def warm():
+                for _ in range(REQUESTS):
+                    client.get(url)
+
+            board_cache.clear()
+            cold_time = _django.timed(cold) / REQUESTS
+            warm_time = _django.timed(warm) / REQUESTS
+            print(f"  {name:<22} cold {cold_time * 1000:8.2f} ms  warm {warm_time * 1000:8.2f} ms  "
+                  f"x{cold_time / warm_time:5.1f}")
+    print(f"cache: {board_cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
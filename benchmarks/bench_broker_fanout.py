@@ -0,0 +1,52 @@
+"""
+Fan-out benchmark for the SSE brokers.
+
+    python benchmarks/bench_broker_fanout.py [--subscribers 10000] [--events 100]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from planer.broker import InMemoryBroker, SQLiteBroker
+
+
+def bench(broker, subscribers, events):
+    subs = [broker.subscribe() for _ in range(subscribers)]
+    start = time.perf_counter()
+    for i in range(events):
+        broker.publish('newPath', {'path_id': i, 'board_id': 1, 'path_name': 'bench'})
+    # Wait until the last subscriber has seen every event (matters for the SQLite poller).
+    while len(subs[-1]) < events:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    ids = [e.id for e in subs[0].get(timeout=0)]
+    assert ids == sorted(ids) and len(ids) == events
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--subscribers', type=int, default=10000)
+    parser.add_argument('--events', type=int, default=100)
+    args = parser.parse_args()
+
+    elapsed = bench(InMemoryBroker(maxsize=args.events), args.subscribers, args.events)
+    print(f"InMemoryBroker: {args.events} events x {args.subscribers} subscribers "
+          f"in {elapsed:.3f}s ({elapsed / args.events * 1000:.2f} ms/event, "
+          f"{args.events * args.subscribers / elapsed:,.0f} deliveries/s)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        broker = SQLiteBroker(os.path.join(tmp, 'events.sqlite3'), poll_interval=0.001, maxsize=args.events)
+        elapsed = bench(broker, args.subscribers, args.events)
+        broker.close()
+    print(f"SQLiteBroker:   {args.events} events x {args.subscribers} subscribers "
+          f"in {elapsed:.3f}s ({elapsed / args.events * 1000:.2f} ms/event, "
+          f"{args.events * args.subscribers / elapsed:,.0f} deliveries/s)")
+
+
+if __name__ == '__main__':
+    main()
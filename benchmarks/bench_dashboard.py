@@ -0,0 +1,84 @@
+"""
+route_list dashboard on a large instance: 100k boards and 1M user paths by
+default, a tenth of each owned by the benchmark user. Times the old querysets
+(every path body of the user, every foreign board) against rendering the
+paged dashboard's first page and a page deep into the user's paths.
+
+    python benchmarks/bench_dashboard.py [--boards 100000] [--paths 1000000]
+"""
+import argparse
+import random
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from planer.fields import encode_path
+from planer.models import GameBoard, UserPath
+from planer.views import DASHBOARD_PAGE_SIZE
+
+BATCH = 20000
+
+
+def populate(user, other, boards, paths):
+    rng = random.Random(0)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    body = encode_path([{'row': 0, 'col': i, 'color': '#e41a1c', 'route': 0} for i in range(1, 4)])
+    owners = [user.id if i % 10 == 0 else other.id for i in range(boards)]
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, boards, BATCH):
+            cursor.executemany(
+                'INSERT INTO planer_gameboard (user_id, name, rows, cols, version) VALUES (%s, %s, 10, 10, 0)',
+                [(owners[i], f'Board {i}') for i in range(start, min(start + BATCH, boards))],
+            )
+        board_ids = list(GameBoard.objects.values_list('id', flat=True))
+        for start in range(0, paths, BATCH):
+            cursor.executemany(
+                'INSERT INTO planer_userpath (board_id, user_id, path, name, created_at, step_count) '
+                'VALUES (%s, %s, %s, %s, %s, 3)',
+                [(rng.choice(board_ids), user.id if i % 10 == 0 else other.id, body, f'Path {i}', now)
+                 for i in range(start, min(start + BATCH, paths))],
+            )
+
+
+def legacy(user):
+    list(UserPath.objects.filter(user=user).select_related('board'))
+    list(GameBoard.objects.filter(user=user))
+    list(GameBoard.objects.exclude(user=user).select_related('user'))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--boards', type=int, default=100000)
+    parser.add_argument('--paths', type=int, default=1000000)
+    args = parser.parse_args()
+
+    user = User.objects.create_user(username='bench', password='bench')
+    other = User.objects.create_user(username='other', password='other')
+    populate(user, other, args.boards, args.paths)
+    print(f"{args.boards} boards, {args.paths} paths, {args.paths // 10} of them the user's")
+
+    client = Client()
+    client.force_login(user)
+    url = reverse('route_list')
+    first = client.get(url)
+    deep_url, depth = url, 1
+    while depth < 51:
+        next_page = client.get(deep_url).context['paths_next']
+        if next_page is None:
+            break
+        deep_url, depth = url + next_page, depth + 1
+
+    print(f"  old querysets       {_django.timed(lambda: legacy(user), repeat=1) * 1000:10.1f} ms")
+    print(f"  first page          {_django.timed(lambda: client.get(url)) * 1000:10.1f} ms")
+    print(f"  page {depth:<3} of paths   {_django.timed(lambda: client.get(deep_url)) * 1000:10.1f} ms")
+    print(f"  ({DASHBOARD_PAGE_SIZE} rows per section, {len(first.content)} bytes per page)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Mixed readers and writers against an SQLite file in each database profile
+(mysite/databases.py). Worker processes play app-server workers: writers save
+drawn paths and board dots, readers load a dashboard page and a board's dots,
+and every operation ends the way a request does (close_old_connections), so
+the development profile reconnects each time and production reuses
+connections.
+
+Reports throughput, latency percentiles and "database is locked" failures.
+
+    python benchmarks/bench_db_concurrency.py [--readers 4 --writers 2 --seconds 5]
+"""
+import argparse
+import os
+import random
+import multiprocessing
+import subprocess
+import sys
+import tempfile
+import time
+
+PROFILES = ('development', 'production')
+
+
+def child(args):
+    import django
+
+    django.setup()
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import OperationalError, close_old_connections, connection, transaction
+    from planer.boards import save_board_dots
+    from planer.models import Dot, GameBoard, UserPath
+
+    call_command('migrate', verbosity=0)
+    user = User.objects.create_user(username='bench', password='bench')
+    boards = [GameBoard.objects.create(user=user, name=f'b{i}', rows=20, cols=20) for i in range(8)]
+    path = [{'row': 0, 'col': c, 'color': '#FF0000', 'route': 0} for c in range(20)]
+    for board in boards:
+        UserPath.objects.bulk_create(UserPath(board=board, user=user, path=path, name='p') for _ in range(200))
+    connection.close()
+
+    results = {'read': [], 'write': []}
+    failures = {'read': 0, 'write': 0}
+
+    def write(rng):
+        board = rng.choice(boards)
+        if rng.random() < 0.5:
+            with transaction.atomic():
+                UserPath.objects.create(board=board, user=user, path=path, name='bench')
+        else:
+            dots = {(r, rng.randrange(20)): f'#{r:06X}' for r in range(20) for _ in range(2)}
+            save_board_dots(board, dots)
+
+    def read(rng):
+        board = rng.choice(boards)
+        list(UserPath.objects.filter(user=user).order_by('-created_at', '-id').values('id', 'name', 'step_count')[:20])
+        list(Dot.objects.filter(board=board).order_by('id').values('row', 'col', 'color'))
+
+    def worker(kind, seed, deadline, queue):
+        rng = random.Random(seed)
+        operation = write if kind == 'write' else read
+        timings = []
+        failed = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                operation(rng)
+                timings.append(time.perf_counter() - start)
+            except OperationalError:
+                failed += 1
+            finally:
+                close_old_connections()
+        connection.close()
+        queue.put((kind, timings, failed))
+
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    deadline = time.perf_counter() + args.seconds
+    kinds = ['read'] * args.readers + ['write'] * args.writers
+    processes = [context.Process(target=worker, args=(kind, i, deadline, queue)) for i, kind in enumerate(kinds)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        kind, timings, failed = queue.get()
+        results[kind] += timings
+        failures[kind] += failed
+    for process in processes:
+        process.join()
+
+    for kind in ('read', 'write'):
+        timings = sorted(results[kind])
+        pick = lambda q: timings[min(len(timings) - 1, int(q * len(timings)))] * 1000 if timings else float('nan')
+        print(f"  {kind:<6} {len(timings) / args.seconds:8.0f} ops/s   p50 {pick(0.5):7.1f} ms"
+              f"   p99 {pick(0.99):7.1f} ms   locked {failures[kind]}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if args.child:
+        sys.path.insert(0, root)
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+        return child(args)
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g} s per profile")
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, PLANER_DB_PROFILE=profile, PLANER_DB_PATH=os.path.join(tmp, 'bench.sqlite3'))
+            print(f"{profile}:", flush=True)
+            subprocess.run([sys.executable, __file__, '--child', *sys.argv[1:]], env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Cost of the newPath notifications (planer/events.py) for a burst of path
+saves in one transaction, with many SSE subscribers connected: queries, wall
+time of the saves plus publishing, and events delivered per subscriber, for
+a window of 0 (one event per save, as each commits) and for a coalescing
+window (flushed by hand, as the dispatcher thread would).
+
+    python benchmarks/bench_events.py [--paths 500] [--subscribers 1000]
+"""
+import argparse
+import time
+from unittest import mock
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from planer import events
+from planer.broker import InMemoryBroker
+from planer.models import GameBoard, UserPath
+
+
+def run(board, user, paths, subscribers, window):
+    broker = InMemoryBroker(maxsize=paths + 1)
+    subs = [broker.subscribe() for _ in range(subscribers)]
+    dispatcher = events.Dispatcher(window)
+    with mock.patch('planer.events.get_broker', return_value=broker), \
+            mock.patch('planer.events.get_dispatcher', return_value=dispatcher), \
+            CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        with transaction.atomic():
+            for i in range(paths):
+                UserPath.objects.create(board_id=board.id, user_id=user.id, name=f'p{i}', path=[])
+        dispatcher.flush()
+        elapsed = time.perf_counter() - start
+    return elapsed, len(queries), len(subs[0])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--paths', type=int, default=500)
+    parser.add_argument('--subscribers', type=int, default=1000)
+    args = parser.parse_args()
+    user = User.objects.create_user(username='bench', password='x')
+    # bulk_create sends no post_save, so no event for the board reaches the brokers below
+    board, = GameBoard.objects.bulk_create([GameBoard(user=user, name='bench', rows=10, cols=10)])
+    for window in (0, 60):
+        elapsed, queries, delivered = run(board, user, args.paths, args.subscribers, window)
+        print(f"window {window:>2}: {args.paths} saves in {elapsed * 1000:7.1f} ms, "
+              f"{queries} queries, {delivered} events per subscriber")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Board generation (planer/generator.py): layouts per second with 1 up to
+cpu_count worker processes, for a few board sizes, and the rate at which
+create_boards() writes them to a test database.
+
+    python benchmarks/bench_generator.py [--count 2000] [--workers 4]
+"""
+import argparse
+import os
+import time
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User
+
+from planer.generator import create_boards, generate_layouts
+
+SIZES = ((7, 7, 6), (15, 15, 12), (30, 30, 25))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    print(f"{os.cpu_count()} CPUs")
+
+    for rows, cols, pairs in SIZES:
+        baseline = None
+        for workers in range(1, args.workers + 1):
+            start = time.perf_counter()
+            layouts = list(generate_layouts(rows, cols, pairs, args.count, seed=1, workers=workers))
+            rate = len(layouts) / (time.perf_counter() - start)
+            baseline = baseline or rate
+            print(f"{rows}x{cols} {pairs} pairs, {workers} workers: {rate:9.0f} layouts/s ({rate / baseline:.2f}x)")
+
+    user = User.objects.create_user(username='bench', password='x')
+    layouts = list(generate_layouts(7, 7, 6, args.count, seed=2))
+    start = time.perf_counter()
+    create_boards(user, 7, 7, layouts)
+    print(f"create_boards: {args.count / (time.perf_counter() - start):.0f} boards/s")
+
+
+if __name__ == '__main__':
+    main()
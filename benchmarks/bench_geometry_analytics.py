@@ -0,0 +1,69 @@
+"""
+Route analytics on one large route: planer.geometry (NumPy) against the same
+length computation in pure Python, plus simplification and resampling, and a
+cached simplify as edit_and_view_route sees it.
+
+    python benchmarks/bench_geometry_analytics.py [--points 1000000]
+"""
+import argparse
+import math
+import random
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User
+from planer import geometry
+from planer.ingest import ingest_points
+from planer.models import BackgroundImage, Route
+from planer.packing import route_coords
+
+
+def python_length(coords):
+    total = 0.0
+    for i in range(0, len(coords) - 2, 2):
+        total += math.hypot(coords[i + 2] - coords[i], coords[i + 3] - coords[i + 1])
+    return total
+
+
+def report(label, fn, repeat=3):
+    print(f"  {label:<28} {_django.timed(fn, repeat) * 1000:9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, default=1000000)
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    args = parser.parse_args()
+
+    user = User.objects.create_user(username='bench', password='bench')
+    bg = BackgroundImage.objects.create(name='bg', image='bench.jpg')
+    route = Route.objects.create(user=user, background=bg, name='bench')
+    # A random walk: smooth enough that simplification has something to drop
+    rng = random.Random(0)
+    x = y = 0.0
+
+    def walk():
+        nonlocal x, y
+        for _ in range(args.points):
+            x += rng.uniform(-1, 1)
+            y += rng.uniform(-1, 1)
+            yield {'x': x, 'y': y}
+
+    ingest_points(route, walk(), chunk_size=5000)
+    coords = route_coords(route.id).tolist()
+    points = geometry.route_array(route.id)
+    print(f"Route with {len(points)} points:")
+    report('length, pure Python', lambda: python_length(coords))
+    report('length, NumPy', lambda: geometry.segment_lengths(points).sum())
+    report('stats', lambda: geometry.stats(points))
+    report(f'simplify({args.tolerance})', lambda: geometry.simplify(points, args.tolerance), repeat=1)
+    report('resample(10000)', lambda: geometry.resample(points, 10000))
+    geometry.simplified_route(route.id, args.tolerance)
+    report('simplified_route, cached', lambda: geometry.simplified_route(route.id, args.tolerance))
+    print(f"  simplified to {len(geometry.simplified_route(route.id, args.tolerance))} points")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Background image pipeline on one large image: time to build the thumbnails and
+tile pyramid, and bytes a client fetches for an overview or one full-zoom
+viewport compared with downloading the original.
+
+    python benchmarks/bench_imaging.py [--width 8192 --height 4096] [--viewport 1280x720]
+"""
+import argparse
+import math
+import tempfile
+import time
+from pathlib import Path
+
+import _django
+
+_django.setup()
+
+from PIL import Image
+
+from planer import imaging
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--width', type=int, default=8192)
+    parser.add_argument('--height', type=int, default=4096)
+    parser.add_argument('--viewport', default='1280x720')
+    args = parser.parse_args()
+    view_w, view_h = map(int, args.viewport.split('x'))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        # Noise over a gradient, so JPEG sizes are closer to a real map than a flat fill
+        image = Image.merge('RGB', (
+            Image.linear_gradient('L').resize((args.width, args.height)),
+            Image.effect_noise((args.width, args.height), 40),
+            Image.linear_gradient('L').rotate(90).resize((args.width, args.height)),
+        ))
+        source = tmp / 'source.jpg'
+        image.save(source, 'JPEG', quality=90)
+        target = tmp / 'derived'
+        target.mkdir()
+
+        start = time.perf_counter()
+        manifest = imaging.build_derivatives(source, target)
+        elapsed = time.perf_counter() - start
+
+        tiles = list((target / 'tiles').rglob('*.jpg'))
+        size = imaging.TILE_SIZE
+        top = target / 'tiles' / str(manifest['levels'] - 1)
+        viewport = sum(
+            (top / f'{x}_{y}.jpg').stat().st_size
+            for x in range(math.ceil(view_w / size) + 1) for y in range(math.ceil(view_h / size) + 1)
+        )
+        print(f"{args.width}x{args.height}, {manifest['levels']} levels, {len(tiles)} tiles built in {elapsed:.2f} s")
+        print(f"  original                {source.stat().st_size / 1024:10.1f} KiB")
+        for name in imaging.THUMBNAIL_SIZES:
+            print(f"  thumb-{name:<17} {(target / f'thumb-{name}.jpg').stat().st_size / 1024:10.1f} KiB")
+        print(f"  {view_w}x{view_h} at full zoom  {viewport / 1024:10.1f} KiB  (worst-case tile alignment)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Overhead of the request instrumentation (planer/metrics.py) on the route_list
+dashboard and the route detail API: mean time per request with the middleware
+off, at the default 10% sampling and with every request sampled.
+
+    python benchmarks/bench_instrumentation.py [--requests 500]
+"""
+import argparse
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User
+from django.test import Client, override_settings
+from planer.metrics import registry
+from planer.models import BackgroundImage, Point, Route
+from rest_framework_simplejwt.tokens import AccessToken
+
+MODES = (('off', {'ENABLED': False}), ('sampled 10%', {'ENABLED': True, 'SAMPLE_RATE': 0.1}),
+         ('sampled 100%', {'ENABLED': True, 'SAMPLE_RATE': 1.0}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    user = User.objects.create_user(username='bench', password='bench')
+    background = BackgroundImage.objects.create(name='bg', image='backgrounds/bench.jpg')
+    route = Route.objects.create(user=user, background=background, name='R')
+    Point.objects.bulk_create(Point(route=route, x=i, y=i, seq=i + 1) for i in range(100))
+    token = str(AccessToken.for_user(user))
+    targets = (
+        ('route_list', '/planer/', {}),
+        ('route detail', f'/planer/api/trasy/{route.id}/', {'HTTP_AUTHORIZATION': f'Bearer {token}'}),
+    )
+
+    print(f"{args.requests} requests each")
+    for label, url, headers in targets:
+        baseline = None
+        for mode, config in MODES:
+            with override_settings(PLANER_METRICS=config):
+                client = Client()  # loads the middleware with this configuration
+                client.force_login(user)
+                client.get(url, **headers)
+                per_request = _django.timed(lambda: [client.get(url, **headers) for _ in range(args.requests)])
+                per_request /= args.requests
+            baseline = baseline or per_request
+            print(f"  {label:<13} {mode:<13} {per_request * 1e6:8.0f} us/request  "
+                  f"{(per_request / baseline - 1) * 100:+6.1f}%")
+    registry.clear()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+UserPath.path storage: JSON (as draw_path posts it) against the packed format
+of planer.fields, for solved boards of 5x5 to 25x25 cells. Reports bytes per
+path and encode / decode time per path.
+
+    python benchmarks/bench_path_encoding.py
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from planer.fields import decode_path, encode_path
+
+REPEAT = 200
+COLORS = ['#e41a1c', '#377eb8', '#4daf4a', '#984ea3', '#ff7f00', '#a65628', '#ffd700', '#00ced1']
+
+
+def serpentine_path(size):
+    """A filled board: one stroke per row pair, snaking between two dots, as draw_path stores it."""
+    path = []
+    for band in range(size // 2):
+        color = COLORS[band % len(COLORS)]
+        top, bottom = 2 * band, 2 * band + 1
+        # dots at (top, 0) and (bottom, 0); the route runs along the top row and back
+        cells = [(top, c) for c in range(1, size)] + [(bottom, c) for c in range(size - 1, 0, -1)]
+        path += [{'row': r, 'col': c, 'color': color, 'route': 0} for r, c in cells]
+    return path
+
+
+def per_call(fn, arg):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn(arg)
+    return (time.perf_counter() - start) / REPEAT * 1e6
+
+
+def main():
+    print(f"{'board':>7} {'cells':>6} {'json B':>8} {'packed B':>9} {'ratio':>6} "
+          f"{'json enc':>9} {'pack enc':>9} {'json dec':>9} {'pack dec':>9}  (us)")
+    for size in (5, 10, 15, 20, 25):
+        path = serpentine_path(size)
+        as_json = json.dumps(path)
+        packed = encode_path(path)
+        assert decode_path(packed) == path
+        print(f"{size:>3}x{size:<3} {len(path):6d} {len(as_json):8d} {len(packed):9d} "
+              f"{len(as_json) / len(packed):6.1f} "
+              f"{per_call(json.dumps, path):9.1f} {per_call(encode_path, path):9.1f} "
+              f"{per_call(json.loads, as_json):9.1f} {per_call(decode_path, packed):9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Reading one 100k-point route: Point model instances vs values_list vs the packed
+RouteGeometry copy. Reports wall time and tracemalloc peak for each.
+
+    python benchmarks/bench_route_geometry.py [--points 100000]
+"""
+import argparse
+import random
+import tracemalloc
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User
+from planer.ingest import ingest_points
+from planer.models import BackgroundImage, Point, Route
+from planer.packing import route_coords
+
+
+def measure(label, fn):
+    fn()  # warm up (and build the packed copy)
+    elapsed = _django.timed(fn)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<24} {elapsed * 1000:9.1f} ms  peak {peak / 2**20:7.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, default=100000)
+    args = parser.parse_args()
+
+    user = User.objects.create_user(username='bench', password='bench')
+    bg = BackgroundImage.objects.create(name='bg', image='bench.jpg')
+    route = Route.objects.create(user=user, background=bg, name='bench')
+    rng = random.Random(0)
+    ingest_points(route, ({'x': rng.uniform(0, 1000), 'y': rng.uniform(0, 1000)} for _ in range(args.points)),
+                  chunk_size=5000)
+    print(f"Route with {route.points.count()} points:")
+    measure('ORM instances', lambda: list(route.points.order_by('id')))
+    measure('values_list', lambda: list(Point.objects.filter(route=route).order_by('id').values_list('x', 'y')))
+    measure('packed -> array', lambda: route_coords(route.id))
+    measure('packed -> list', lambda: route_coords(route.id).tolist())
+
+
+if __name__ == '__main__':
+    main()
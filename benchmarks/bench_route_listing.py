@@ -0,0 +1,71 @@
+"""
+Peak RSS of listing every route of a user: the in-memory RouteSerializer path
+(before) against planer.streaming (after). Each mode runs in a fresh process so
+ru_maxrss is not shared.
+
+    python benchmarks/bench_route_listing.py [--routes 200] [--points 5000]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+
+
+def run_mode(mode, routes, points):
+    import _django
+
+    _django.setup()
+    import random
+
+    from django.contrib.auth.models import User
+    from rest_framework.renderers import JSONRenderer
+    from planer.models import BackgroundImage, Point, Route
+    from planer.serializers import RouteSerializer
+    from planer.streaming import stream_routes
+
+    user = User.objects.create_user(username='bench', password='bench')
+    bg = BackgroundImage.objects.create(name='bg', image='bench.jpg')
+    rng = random.Random(0)
+    for i in range(routes):
+        route = Route.objects.create(user=user, background=bg, name=f'route {i}')
+        Point.objects.bulk_create(
+            [Point(route=route, x=rng.uniform(0, 1000), y=rng.uniform(0, 1000), seq=j + 1) for j in range(points)],
+            batch_size=5000,
+        )
+    queryset = Route.objects.filter(user=user)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    size = 0
+    if mode == 'serializer':
+        size = len(JSONRenderer().render(RouteSerializer(queryset, many=True).data))
+    elif mode == 'ndjson-ids':
+        for part in stream_routes(queryset, ['id', 'name'], ndjson=True):
+            size += len(part)
+    else:
+        for part in stream_routes(queryset, ndjson=(mode == 'ndjson')):
+            size += len(part)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"  {mode:<12} {elapsed:7.2f}s  {size / 2**20:8.1f} MiB body  "
+          f"peak RSS +{(peak - baseline) / 1024:7.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--routes', type=int, default=200)
+    parser.add_argument('--points', type=int, default=5000)
+    parser.add_argument('--mode')
+    args = parser.parse_args()
+    if args.mode:
+        run_mode(args.mode, args.routes, args.points)
+        return
+    print(f"{args.routes} routes x {args.points} points:")
+    for mode in ('serializer', 'json-stream', 'ndjson', 'ndjson-ids'):
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--mode', mode,
+                        '--routes', str(args.routes), '--points', str(args.points)], check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Auto-routing (planer/router.py) on 100 x 100 boards strewn with obstacles:
+random single cells at several densities and long walls with gaps. Each case
+routes between dots in opposite corner regions and reports time per route
+and cells expanded, for A* with reused buffers, A* building its Router every
+time, and the solver's dict-based breadth-first search as the baseline.
+
+    python benchmarks/bench_router.py [--size 100] [--routes 50]
+"""
+import argparse
+import random
+import time
+
+import _django
+import django
+
+django.setup()  # no database needed
+
+from planer.router import Router, get_router
+from planer.solver import Solver
+
+
+def random_case(rng, size, density):
+    n = size * size
+    blocked = bytearray(1 if rng.random() < density else 0 for _ in range(n))
+    return _ends(rng, size, blocked)
+
+
+def walls_case(rng, size, _):
+    blocked = bytearray(size * size)
+    for row in range(2, size - 2, 4):
+        gap = rng.randrange(size)
+        for col in range(size):
+            if abs(col - gap) > 1:
+                blocked[row * size + col] = 1
+    return _ends(rng, size, blocked)
+
+
+def _ends(rng, size, blocked):
+    a = rng.randrange(size // 10) * size + rng.randrange(size // 10)
+    b = (size - 1 - rng.randrange(size // 10)) * size + size - 1 - rng.randrange(size // 10)
+    blocked[a] = blocked[b] = 1
+    return a, b, blocked
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=100)
+    parser.add_argument('--routes', type=int, default=50)
+    args = parser.parse_args()
+    size = args.size
+
+    print(f"{size} x {size}, {args.routes} routes per case")
+    print(f"  {'case':<14} {'A* reused':>12} {'A* fresh':>12} {'BFS':>12} {'expanded':>10} {'found':>6}")
+    for label, make, density in (('open', random_case, 0.0), ('random 20%', random_case, 0.2),
+                                 ('random 35%', random_case, 0.35), ('walls', walls_case, None)):
+        rng = random.Random(0)
+        cases = [make(rng, size, density) for _ in range(args.routes)]
+        router = get_router(size, size)
+
+        start = time.perf_counter()
+        results = [router.search(a, b, blocked) for a, b, blocked in cases]
+        reused = (time.perf_counter() - start) / len(cases)
+
+        start = time.perf_counter()
+        for a, b, blocked in cases:
+            Router(size, size).search(a, b, blocked)
+        fresh = (time.perf_counter() - start) / len(cases)
+
+        solver = Solver(size, size, [])
+        bits = [sum(1 << i for i, v in enumerate(blocked) if v) for _, _, blocked in cases]
+        start = time.perf_counter()
+        for (a, b, _), mask in zip(cases, bits):
+            solver._shortest_path(a, b, mask)
+        bfs = (time.perf_counter() - start) / len(cases)
+
+        expanded = sum(e for _, e in results) / len(results)
+        found = sum(path is not None for path, _ in results)
+        print(f"  {label:<14} {reused * 1000:9.2f} ms {fresh * 1000:9.2f} ms {bfs * 1000:9.2f} ms "
+              f"{expanded:10.0f} {found:4d}/{len(results)}")
+
+
+if __name__ == '__main__':
+    main()
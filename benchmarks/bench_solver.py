@@ -0,0 +1,88 @@
+"""
+Solver benchmark on random solvable boards from 5x5 to 15x15, with per-size
+time and memory budgets. Exits non-zero if a budget is exceeded.
+
+    python benchmarks/bench_solver.py [--boards 10] [--exact]
+
+--exact disables the rip-up-and-reroute phase so the depth-first search is
+measured on its own. Sparse boards are its worst case, so it runs under a
+node limit and only reports; the budgets apply to the default solver.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from planer import solver
+
+# size -> (seconds per board, MiB peak per board)
+BUDGETS = {5: (0.05, 5), 7: (0.1, 5), 9: (0.25, 10), 11: (0.5, 20), 13: (1.0, 50), 15: (2.0, 100)}
+
+
+def random_board(size, pairs, rng):
+    """Lay random non-crossing walks and keep their ends as dots, so a solution exists."""
+    taken = set()
+    result = []
+    for _ in range(pairs * 50):
+        if len(result) == pairs:
+            break
+        start = (rng.randrange(size), rng.randrange(size))
+        if start in taken:
+            continue
+        walk = [start]
+        length = rng.randint(3, 2 * size)
+        while len(walk) < length:
+            r, c = walk[-1]
+            options = [
+                (r + dr, c + dc) for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                if 0 <= r + dr < size and 0 <= c + dc < size
+                and (r + dr, c + dc) not in taken and (r + dr, c + dc) not in walk
+            ]
+            if not options:
+                break
+            walk.append(rng.choice(options))
+        if len(walk) >= 3:
+            taken.update(walk)
+            result.append((f'#{len(result):06x}', walk[0], walk[-1]))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--boards', type=int, default=10)
+    parser.add_argument('--exact', action='store_true')
+    args = parser.parse_args()
+    node_limit = solver.DEFAULT_NODE_LIMIT
+    if args.exact:
+        solver.REROUTE_ATTEMPTS = 0
+        node_limit = 2000
+
+    rng = random.Random(42)
+    over_budget = False
+    for size, (time_budget, memory_budget) in BUDGETS.items():
+        times, peaks, nodes, statuses = [], [], 0, {}
+        for _ in range(args.boards):
+            pairs = random_board(size, size, rng)
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = solver.solve(size, size, pairs, node_limit=node_limit)
+            times.append(time.perf_counter() - start)
+            peaks.append(tracemalloc.get_traced_memory()[1] / 2**20)
+            tracemalloc.stop()
+            nodes += result.nodes
+            statuses[result.status] = statuses.get(result.status, 0) + 1
+        ok = max(times) <= time_budget and max(peaks) <= memory_budget
+        over_budget |= not ok and not args.exact
+        print(f"{size:2d}x{size:<2d} {statuses}  avg {sum(times) / len(times) * 1000:8.2f} ms  "
+              f"max {max(times) * 1000:8.2f} ms (budget {time_budget * 1000:.0f})  "
+              f"peak {max(peaks):6.2f} MiB (budget {memory_budget})  nodes {nodes}  "
+              f"{'ok' if ok else 'OVER BUDGET'}")
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Spatial queries over a million points: 1000 routes of 1000-point random walks
+on a 10000 x 10000 plane. Times building the grid-hash index and answering
+?bbox= and ?near= queries, against scanning Point for points in the box
+(which also misses routes that only cross the box between two points).
+
+    python benchmarks/bench_spatial.py [--routes 1000] [--points 1000]
+"""
+import argparse
+import random
+
+import _django
+from django.conf import settings
+
+# The default cell suits board-sized coordinates; scale it with this 10000-unit plane
+settings.PLANER_SPATIAL_CELL_SIZE = 64.0
+_django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from planer.models import SEQ_GAP, BackgroundImage, Point, Route, RouteCell
+from planer.packing import route_coords
+from planer.spatial import BBox, Circle, matching_route_ids
+
+SIDE = 10000.0
+BATCH = 20000
+
+
+def populate(user, routes, points):
+    rng = random.Random(0)
+    background = BackgroundImage.objects.create(name='bg', image='bench.jpg')
+    Route.objects.bulk_create([Route(user=user, background=background, name=f'R{i}') for i in range(routes)])
+    rows = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for route_id in Route.objects.values_list('id', flat=True):
+            x, y = rng.uniform(0, SIDE), rng.uniform(0, SIDE)
+            for i in range(points):
+                x = min(max(x + rng.uniform(-20, 20), 0), SIDE)
+                y = min(max(y + rng.uniform(-20, 20), 0), SIDE)
+                rows.append((route_id, x, y, (i + 1) * SEQ_GAP))
+            if len(rows) >= BATCH:
+                cursor.executemany('INSERT INTO planer_point (route_id, x, y, seq) VALUES (%s, %s, %s, %s)', rows)
+                rows = []
+        if rows:
+            cursor.executemany('INSERT INTO planer_point (route_id, x, y, seq) VALUES (%s, %s, %s, %s)', rows)
+
+
+def scan(shape):
+    x0, y0, x1, y1 = shape.bounds
+    return set(Point.objects.filter(x__range=(x0, x1), y__range=(y0, y1)).values_list('route_id', flat=True))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--routes', type=int, default=1000)
+    parser.add_argument('--points', type=int, default=1000)
+    args = parser.parse_args()
+
+    user = User.objects.create_user(username='bench', password='bench')
+    populate(user, args.routes, args.points)
+    queryset = Route.objects.filter(user=user)
+    print(f"{args.routes} routes x {args.points} points")
+    route_ids = list(queryset.values_list('id', flat=True))
+    build = _django.timed(lambda: [route_coords(route_id) for route_id in route_ids], repeat=1)
+    print(f"  index build      {build:10.2f} s   {RouteCell.objects.count()} cells")
+
+    rng = random.Random(1)
+    for label, size in (('small', 50), ('medium', 500), ('large', 3000)):
+        shapes = []
+        for _ in range(5):
+            x, y = rng.uniform(0, SIDE - size), rng.uniform(0, SIDE - size)
+            shapes.append(BBox(x, y, x + size, y + size))
+        index_time = _django.timed(lambda: [matching_route_ids(queryset, s) for s in shapes]) / len(shapes)
+        scan_time = _django.timed(lambda: [scan(s) for s in shapes], repeat=1) / len(shapes)
+        found = sum(len(matching_route_ids(queryset, s)) for s in shapes) / len(shapes)
+        print(f"  bbox {label:<7} {size:5d}  index {index_time * 1000:9.1f} ms  "
+              f"point scan {scan_time * 1000:9.1f} ms  ~{found:.0f} routes")
+    circles = [Circle(rng.uniform(0, SIDE), rng.uniform(0, SIDE), 100) for _ in range(5)]
+    near_time = _django.timed(lambda: [matching_route_ids(queryset, c) for c in circles]) / len(circles)
+    print(f"  near radius 100      index {near_time * 1000:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
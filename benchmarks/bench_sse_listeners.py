@@ -0,0 +1,67 @@
+"""
+Load test for the async SSE endpoint: thousands of concurrent listeners served by
+one event loop in one process.
+
+    python benchmarks/bench_sse_listeners.py [--listeners 5000] [--events 20]
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+
+import django
+
+django.setup()
+
+from django.test import RequestFactory
+from planer.broker import get_broker
+from planer.views import sse_notifications
+
+
+async def listener(stream, events, received):
+    await anext(stream)  # retry: header
+    seen = 0
+    while seen < events:
+        chunk = await anext(stream)
+        if chunk.startswith(b'id: '):
+            seen += 1
+    received.append(time.perf_counter())
+
+
+async def main(listeners, events):
+    factory = RequestFactory()
+    broker = get_broker()
+    streams = []
+    for _ in range(listeners):
+        response = await sse_notifications(factory.get('/planer/sse/notifications/'))
+        streams.append(aiter(response.streaming_content))
+    received = []
+    tasks = [asyncio.create_task(listener(s, events, received)) for s in streams]
+    await asyncio.sleep(0.5)  # let every listener park on its queue
+    print(f"{listeners} listeners connected, {threading.active_count()} threads, "
+          f"max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+
+    start = time.perf_counter()
+    for i in range(events):
+        broker.publish('newPath', {'path_id': i, 'board_id': 1, 'path_name': 'load'})
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    latencies = sorted(t - start for t in received)
+    print(f"{events} events delivered to all listeners in {elapsed:.3f}s "
+          f"(p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms to last event)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--listeners', type=int, default=5000)
+    parser.add_argument('--events', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.listeners, args.events))
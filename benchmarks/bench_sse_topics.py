@@ -0,0 +1,49 @@
+"""
+Publish cost of a board event as the number of SSE subscribers grows while
+the number interested in that board stays the same. With the topic index
+(planer/broker.py) only the interested subscriptions are touched; the
+"all global" row is the old behaviour, where every client got every event.
+
+    python benchmarks/bench_sse_topics.py [--interested 10] [--events 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from planer.broker import GLOBAL, InMemoryBroker
+
+TOTALS = (100, 1000, 10000, 100000)
+
+
+def bench(total, interested, events, scoped=True):
+    broker = InMemoryBroker(maxsize=events)
+    for i in range(total - interested):
+        # The rest follow other boards (scoped) or everything (unscoped)
+        broker.subscribe(topics={f'board:{2 + i % 1000}'} if scoped else {GLOBAL})
+    subs = [broker.subscribe(topics={'board:1'} if scoped else {GLOBAL}) for _ in range(interested)]
+    topics = (GLOBAL, 'board:1', 'user:1')
+    start = time.perf_counter()
+    for i in range(events):
+        broker.publish('newPath', {'path_id': i, 'board_id': 1}, topics)
+    elapsed = time.perf_counter() - start
+    assert all(len(sub) == events for sub in subs)
+    return elapsed / events
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--interested', type=int, default=10)
+    parser.add_argument('--events', type=int, default=200)
+    args = parser.parse_args()
+    print(f"{'subscribers':>11} {'topic index':>14} {'all global':>14}")
+    for total in TOTALS:
+        scoped = bench(total, args.interested, args.events)
+        unscoped = bench(total, args.interested, max(1, args.events // 20), scoped=False)
+        print(f"{total:>11} {scoped * 1e6:11.1f} us {unscoped * 1e6:11.1f} us")
+
+
+if __name__ == '__main__':
+    main()
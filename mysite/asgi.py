@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Serve the site through this module (e.g. ``uvicorn mysite.asgi:application``) so
+the async SSE endpoint parks idle listeners on the event loop instead of
+holding one worker thread each, as it does under WSGI.
 """
 
 import os
@@ -0,0 +1,55 @@
+"""
+Database profiles, picked in settings.py by the PLANER_DB_PROFILE environment
+variable.
+
+development: Django's SQLite defaults; a fresh connection per request and a
+rollback journal, so a writer locks out readers.
+
+production: SQLite in WAL mode, so readers keep reading while one writer
+commits, with synchronous=NORMAL (durable at checkpoints, never corrupt),
+a memory-mapped read path and a larger page cache. Writers take the write
+lock when their transaction begins (IMMEDIATE) and wait for it up to
+`timeout` seconds, instead of failing with "database is locked" when two
+read transactions try to upgrade at once. Connections are kept for
+CONN_MAX_AGE seconds and health-checked before reuse.
+"""
+import os
+
+PROFILES = ('development', 'production')
+
+
+def sqlite_database(name, profile='development', conn_max_age=600, timeout=20, mmap_size=256 * 2**20):
+    """DATABASES entry for an SQLite file in the given profile."""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown database profile {profile!r}; expected one of {', '.join(PROFILES)}")
+    database = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+    }
+    if profile == 'production':
+        database.update({
+            'CONN_MAX_AGE': conn_max_age,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'timeout': timeout,  # sqlite3's busy timeout, in seconds
+                'transaction_mode': 'IMMEDIATE',
+                # Run on every new connection; WAL itself is persistent in the file
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    f'PRAGMA mmap_size={mmap_size};'
+                    'PRAGMA cache_size=-65536;'
+                    'PRAGMA temp_store=MEMORY;'
+                ),
+            },
+        })
+    return database
+
+
+def from_environ(default_name, environ=os.environ):
+    """DATABASES['default'] from PLANER_DB_PROFILE, PLANER_DB_PATH and PLANER_DB_CONN_MAX_AGE."""
+    return sqlite_database(
+        environ.get('PLANER_DB_PATH', default_name),
+        environ.get('PLANER_DB_PROFILE', 'development'),
+        conn_max_age=int(environ.get('PLANER_DB_CONN_MAX_AGE', 600)),
+    )
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .databases import from_environ
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'planer.metrics.MetricsMiddleware',  # first, so its timings cover the others; off unless PLANER_METRICS
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,12 +78,11 @@ WSGI_APPLICATION = 'mysite.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# PLANER_DB_PROFILE=production turns on WAL and persistent connections (see mysite/databases.py);
+# PLANER_DB_PATH moves the file, PLANER_DB_CONN_MAX_AGE sets the connection lifetime.
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': from_environ(BASE_DIR / 'db.sqlite3'),
 }
 
 REST_FRAMEWORK = {
@@ -89,6 +92,33 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'planer.pagination.IdCursorPagination',
+    'PAGE_SIZE': 50,
+}
+
+# Server-sent events broker. InMemoryBroker only reaches clients of the publishing
+# process; use planer.broker.SQLiteBroker when running several workers on one host.
+PLANER_SSE_BROKER = {
+    'BACKEND': 'planer.broker.InMemoryBroker',
+    'OPTIONS': {
+        'maxsize': 1000,  # events queued per subscriber before dropping
+        'policy': 'drop_oldest',
+        'replay': 100,  # recent events kept for Last-Event-ID resume
+    },
+}
+PLANER_SSE_KEEPALIVE = 15  # seconds between keep-alive comments on idle streams
+# New board and path events that commit within this many seconds are published together, several
+# paths on one board as one newPaths event (planer/events.py); 0 publishes each one as it commits.
+PLANER_SSE_COALESCE_WINDOW = 0.25
+
+# Request instrumentation (planer/metrics.py), off unless PLANER_METRICS=1. SAMPLE_RATE is the share of
+# requests whose queries are recorded and timed in a Server-Timing header; /planer/metrics/ serves the
+# totals to staff users and to scrapers sending "Authorization: Bearer $PLANER_METRICS_TOKEN".
+PLANER_METRICS = {
+    'ENABLED': os.environ.get('PLANER_METRICS') == '1',
+    'SAMPLE_RATE': float(os.environ.get('PLANER_METRICS_SAMPLE_RATE', '0.1')),
+    'DUPLICATE_QUERY_THRESHOLD': 5,
+    'TOKEN': os.environ.get('PLANER_METRICS_TOKEN') or None,
 }
 
 # Password validation
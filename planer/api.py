@@ -1,15 +1,105 @@
+import math
+
 from rest_framework import viewsets, permissions, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.decorators import action
-from .models import Route, Point
-from .serializers import RouteSerializer, PointSerializer
+from rest_framework.decorators import action, api_view, parser_classes, permission_classes
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer, BrowsableAPIRenderer
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
+from . import geometry
+from .archive import ArchiveError, export_archive, import_archive
+from .board_cache import mark_dirty
+from .boards import COLUMNS, GRID, LAYOUTS, OBJECTS, check_grid
+from .conditional import FRAGMENT_TIMEOUT, ROUTE_CACHE_MAX_POINTS, make_etag
+from .deltas import DeltaError, RevisionConflict, apply_path_delta, apply_route_delta
+from .models import Route, Point, GameBoard, Dot, UserPath
+from .serializers import (
+    DotSerializer, GameBoardSerializer, GenerateBoardsSerializer, RouteSerializer, PointSerializer, UserPathSerializer,
+    board_dots,
+)
+from .parsers import NDJSONParser
+from .ingest import ingest_points
+from .packing import invalidate_route_geometry, route_coords
+from .pagination import PointCursorPagination
+from .renderers import NDJSONRenderer
+from .streaming import parse_fields, stream_routes
+from .generator import GeneratorError, create_boards, generate_layouts
+from .router import route_board
+from .solver import DEFAULT_NODE_LIMIT, SolverError, solve_board
+from .spatial import matching_route_ids, parse_shape
 
 class RouteViewSet(viewsets.ModelViewSet):
     serializer_class = RouteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [JSONRenderer, BrowsableAPIRenderer, NDJSONRenderer]
 
     def get_queryset(self):
-        return Route.objects.filter(user=self.request.user)
+        queryset = Route.objects.filter(user=self.request.user)
+        if self.action == 'list':
+            # ?bbox=x0,y0,x1,y1 or ?near=x,y&radius=r: routes passing through that region
+            shape = parse_shape(self.request.query_params)
+            if shape is not None:
+                queryset = queryset.filter(id__in=matching_route_ids(queryset, shape))
+        if self.action in ('list', 'retrieve'):
+            # Constant query count per page: one JOIN for backgrounds, one prefetch for points
+            queryset = queryset.select_related('background')
+            fields = parse_fields(self.request.query_params.get('fields'))
+            if fields is None or 'points' in fields:
+                queryset = queryset.prefetch_related(Prefetch('points', queryset=Point.objects.order_by('seq', 'id')))
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == 'GET' and self.action in ('list', 'retrieve'):
+            kwargs.setdefault('fields', parse_fields(self.request.query_params.get('fields')))
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        # ?format=ndjson or ?stream=1 stream the whole listing instead of building it in memory
+        ndjson = request.accepted_renderer.format == 'ndjson'
+        if ndjson or request.query_params.get('stream'):
+            fields = parse_fields(request.query_params.get('fields'))
+            queryset = self.filter_queryset(self.get_queryset())
+            return StreamingHttpResponse(
+                stream_routes(queryset, fields, request, ndjson=ndjson),
+                content_type=NDJSONRenderer.media_type if ndjson else 'application/json',
+            )
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        # Everything the serialized route shows, stamped in one narrow query: a matching
+        # If-None-Match gets a 304 and a cache hit skips the points prefetch and serializer
+        try:
+            stamp = Route.objects.filter(pk=kwargs['pk'], user=request.user).values_list(
+                'revision', 'updated_at', 'background_id', 'background__name', 'background__image',
+                'background__content_hash', 'background__tile_levels',
+            ).first()
+        except ValueError:
+            stamp = None  # a malformed pk; get_object() turns it into a 404
+        if stamp is None or request.accepted_renderer.format != 'json':
+            return super().retrieve(request, *args, **kwargs)
+        etag = quote_etag(make_etag(
+            'route', kwargs['pk'], stamp, request.query_params.get('fields'), request.get_host(), request.is_secure(),
+        ))
+        response = get_conditional_response(request._request, etag=etag)
+        if response is not None:
+            return response
+        key = f'planer:route-data:{etag}'
+        data = cache.get(key)
+        if data is None:
+            data = self.get_serializer(self.get_object()).data
+            # Long routes keep only their ETag: the cache is per process and holds whole payloads
+            if len(data.get('points') or ()) <= ROUTE_CACHE_MAX_POINTS:
+                cache.set(key, data, FRAGMENT_TIMEOUT)
+        response = Response(data)
+        response['ETag'] = etag
+        return response
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -18,8 +108,9 @@ class RouteViewSet(viewsets.ModelViewSet):
     def points(self, request, pk=None):
         route = self.get_object()
         if request.method == 'GET':
-            points = route.points.all()
-            return Response(PointSerializer(points, many=True).data)
+            paginator = PointCursorPagination()
+            page = paginator.paginate_queryset(route.points.all(), request, view=self)
+            return paginator.get_paginated_response(PointSerializer(page, many=True).data)
         elif request.method == 'POST':
             serializer = PointSerializer(data=request.data)
             if serializer.is_valid():
@@ -27,15 +118,307 @@ class RouteViewSet(viewsets.ModelViewSet):
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['post'], url_path='points/batch', parser_classes=[JSONParser, NDJSONParser])
+    def points_batch(self, request, pk=None):
+        # Accepts a JSON array or an application/x-ndjson stream of {"x", "y"} objects
+        route = self.get_object()
+        if isinstance(request.data, dict):
+            return Response({'detail': 'Expected a list of points.'}, status=status.HTTP_400_BAD_REQUEST)
+        report = ingest_points(route, request.data)
+        if report['errors']:
+            return Response(report, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'])
+    def coords(self, request, pk=None):
+        # Flat [x0, y0, x1, y1, ...] list decoded from the packed geometry
+        route = self.get_object()
+        coords = route_coords(route.pk)
+        return Response({'count': len(coords) // 2, 'coords': coords.tolist()})
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        route = self.get_object()
+        return Response(geometry.stats(geometry.route_array(route.pk)))
+
+    @action(detail=True, methods=['get'])
+    def simplify(self, request, pk=None):
+        # Douglas-Peucker with ?tolerance=, in the same flat form as coords/
+        route = self.get_object()
+        tolerance = _number_param(request, 'tolerance', float, minimum=0)
+        points = geometry.simplified_route(route.pk, tolerance, route.revision)
+        return Response({
+            'tolerance': tolerance,
+            'original_count': len(route_coords(route.pk)) // 2,
+            'count': len(points),
+            'coords': points.ravel().tolist(),
+        })
+
+    @action(detail=True, methods=['get'])
+    def resample(self, request, pk=None):
+        # ?count=n evenly spaced points, or ?step=d apart along the route
+        route = self.get_object()
+        points = geometry.route_array(route.pk)
+        if 'step' in request.query_params:
+            step = _number_param(request, 'step', float, minimum=0, inclusive=False)
+            count = int(geometry.segment_lengths(points).sum() // step) + 1
+        else:
+            count = _number_param(request, 'count', int, minimum=1)
+        if count > geometry.MAX_RESAMPLE:
+            raise ValidationError({'count': f'At most {geometry.MAX_RESAMPLE} points.'})
+        points = geometry.resample(points, count)
+        return Response({'count': len(points), 'coords': points.ravel().tolist()})
+
+    @action(detail=True, methods=['post'])
+    def delta(self, request, pk=None):
+        # {"revision": n, "ops": [...]} as described in planer/deltas.py
+        route = self.get_object()
+        return _delta_response(apply_route_delta, route.pk, request.data)
+
+def _delta_response(apply, target, data):
+    try:
+        return Response(apply(target, data))
+    except RevisionConflict as e:
+        return Response(
+            {'detail': 'Revision does not match; reload and retry.', 'revision': e.revision},
+            status=status.HTTP_409_CONFLICT,
+        )
+    except DeltaError as e:
+        return Response({'ops': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+def _number_param(request, name, kind, minimum, inclusive=True):
+    try:
+        value = kind(request.query_params[name])
+    except KeyError:
+        raise ValidationError({name: 'This parameter is required.'})
+    except ValueError:
+        raise ValidationError({name: f'Expected {"an integer" if kind is int else "a number"}.'})
+    if not math.isfinite(value) or value < minimum or (value == minimum and not inclusive):
+        raise ValidationError({name: f'Must be {"at least" if inclusive else "greater than"} {minimum}.'})
+    return value
+
 class PointViewSet(viewsets.ModelViewSet):
     serializer_class = PointSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PointCursorPagination
 
     def get_queryset(self):
         route_id = self.kwargs['route_pk']
         return Point.objects.filter(route__id=route_id, route__user=self.request.user)
 
     def perform_create(self, serializer):
-        route_id = self.kwargs['route_pk']
-        route = Route.objects.get(id=route_id, user=self.request.user)
+        route = get_object_or_404(Route, id=self.kwargs['route_pk'], user=self.request.user)
         serializer.save(route=route)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        invalidate_route_geometry(instance.route_id)
+
+MAX_SOLVER_NODES = 1000000
+
+def _layout_param(request, name, default, choices=LAYOUTS):
+    # ?dots= / ?path= pick the payload layout; "none" leaves the cells out
+    value = request.query_params.get(name, default)
+    if value == 'none':
+        return None
+    if value not in choices:
+        raise ValidationError({name: f'Expected one of: {", ".join((*choices, "none"))}.'})
+    return value
+
+class GameBoardViewSet(viewsets.ModelViewSet):
+    serializer_class = GameBoardSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        # Any logged-in user may read, solve and draw on any board; only its owner changes it
+        queryset = GameBoard.objects.all()
+        if self.request.method not in permissions.SAFE_METHODS or self.request.query_params.get('mine') in ('1', 'true'):
+            queryset = queryset.filter(user=self.request.user)
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.select_related('user')
+        if self.action == 'list' and self.dots_layout is not None:
+            # One query for the dots of the whole page; a single board reads them from the board cache
+            queryset = queryset.prefetch_related(
+                Prefetch('dots', queryset=Dot.objects.order_by('id').only('board_id', 'row', 'col', 'color'))
+            )
+        return queryset
+
+    @cached_property
+    def dots_layout(self):
+        return _layout_param(self.request, 'dots', OBJECTS)
+
+    def _check_grid(self, boards):
+        # Before anything is serialized, so ?dots=grid on a board it can't hold is a clean 400
+        for board in boards:
+            try:
+                check_grid(board.rows, board.cols, board_dots(board))
+            except ValueError as e:
+                raise ValidationError({'dots': f'Board {board.id}: {e} Use ?dots=columns.'})
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if self.dots_layout == GRID:
+            self._check_grid(page if page is not None else queryset)
+        return page
+
+    def get_object(self):
+        board = super().get_object()
+        if self.action == 'retrieve' and self.dots_layout == GRID:
+            self._check_grid([board])
+        return board
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request is not None and self.action in ('list', 'retrieve', 'create', 'update', 'partial_update'):
+            context['dots_layout'] = self.dots_layout
+        return context
+
+    def retrieve(self, request, *args, **kwargs):
+        # The version moves with the dots and updated_at with the rest, so they stamp the response
+        try:
+            stamp = GameBoard.objects.filter(pk=kwargs['pk']).values_list('version', 'updated_at').first()
+        except ValueError:
+            stamp = None
+        if stamp is None or request.accepted_renderer.format != 'json':
+            return super().retrieve(request, *args, **kwargs)
+        etag = quote_etag(make_etag('board', kwargs['pk'], stamp, self.dots_layout))
+        response = get_conditional_response(request._request, etag=etag)
+        if response is not None:
+            return response
+        response = super().retrieve(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @action(detail=True, methods=['get'])
+    def solve(self, request, pk=None):
+        board = self.get_object()
+        fill = request.query_params.get('fill') in ('1', 'true')
+        try:
+            node_limit = min(int(request.query_params.get('node_limit', DEFAULT_NODE_LIMIT)), MAX_SOLVER_NODES)
+        except ValueError:
+            return Response({'node_limit': 'Must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            solution = solve_board(board, fill=fill, node_limit=node_limit)
+        except SolverError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'status': solution.status,
+            'nodes': solution.nodes,
+            'paths': {color: [list(cell) for cell in cells] for color, cells in solution.paths.items()},
+            'path': solution.as_user_path(),
+        })
+
+    @action(detail=True, methods=['get'])
+    def route(self, request, pk=None):
+        # ?color= to route; with ?path_id= (one of the user's paths on this board) its other colors are obstacles
+        board = self.get_object()
+        color = request.query_params.get('color')
+        if not color:
+            return Response({'color': 'This parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        path = ()
+        if 'path_id' in request.query_params:
+            path_id = _number_param(request, 'path_id', int, minimum=1)
+            path = get_object_or_404(UserPath.objects.only('path'), pk=path_id, board=board, user=request.user).path
+        try:
+            result = route_board(board, color, path)
+        except SolverError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'color': color,
+            'status': result.status,
+            'expanded': result.expanded,
+            'path': result.as_user_path(),
+        })
+
+    @action(detail=False, methods=['post'], url_path='generuj', serializer_class=GenerateBoardsSerializer)
+    def generate(self, request):
+        # Small batches are made inline; the generate_boards command runs big ones on a process pool
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        rows, cols = params['rows'], params['cols']
+        try:
+            layouts = list(generate_layouts(rows, cols, params['pairs'], params['count'], seed=params.get('seed')))
+        except GeneratorError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        ids = create_boards(request.user, rows, cols, layouts, name=params.get('name'))
+        return Response({'count': len(ids), 'boards': ids}, status=status.HTTP_201_CREATED)
+
+class DotViewSet(viewsets.ModelViewSet):
+    # The dots of one board, each with its id; boards/<id>/?dots=columns is the compact read
+    serializer_class = DotSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None  # a board holds at most rows x cols dots
+
+    @cached_property
+    def board(self):
+        boards = GameBoard.objects.all()
+        if self.request.method not in permissions.SAFE_METHODS:
+            boards = boards.filter(user=self.request.user)
+        return get_object_or_404(boards, pk=self.kwargs['board_pk'])
+
+    def get_queryset(self):
+        return Dot.objects.filter(board=self.board).order_by('id')
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'board': self.board}
+
+    def perform_create(self, serializer):
+        serializer.save(board=self.board)  # dot_saved marks the board dirty
+
+    def perform_destroy(self, instance):
+        # Bumped here rather than from post_delete, which would make every cascade fetch the dots
+        instance.delete()
+        mark_dirty(self.board.id)
+
+class UserPathViewSet(viewsets.ModelViewSet):
+    # Unlike boards, a drawn path is only visible to and editable by its owner
+    serializer_class = UserPathSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = UserPath.objects.filter(user=self.request.user)
+        if 'board' in self.request.query_params:
+            queryset = queryset.filter(board_id=_number_param(self.request, 'board', int, minimum=1))
+        if self.action == 'list' and self.path_layout is None:
+            queryset = queryset.defer('path')  # step_count stands in for it in listings
+        if self.request.method not in permissions.SAFE_METHODS:
+            queryset = queryset.select_related('board')  # validation and deltas need the board
+        return queryset
+
+    @cached_property
+    def path_layout(self):
+        # Listings leave the cells out unless asked for
+        return _layout_param(self.request, 'path', 'none' if self.action == 'list' else OBJECTS, (OBJECTS, COLUMNS))
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request is not None and self.action in ('list', 'retrieve', 'create', 'update', 'partial_update'):
+            context['path_layout'] = self.path_layout
+        return context
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @action(detail=True, methods=['post'])
+    def delta(self, request, pk=None):
+        # {"revision": n, "ops": [...]} as described in planer/deltas.py
+        return _delta_response(apply_path_delta, self.get_object(), request.data)
+
+@api_view(['GET', 'POST'])
+@permission_classes([permissions.IsAuthenticated])
+@parser_classes([NDJSONParser])
+def archive(request):
+    # GET streams the user's archive (planer/archive.py); POST imports one, resuming a partial import
+    if request.method == 'GET':
+        response = StreamingHttpResponse(export_archive(request.user), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="planer-{request.user.username}.ndjson"'
+        return response
+    try:
+        report = import_archive(request.user, request.data)
+    except ArchiveError as e:
+        return Response({'detail': str(e), 'record': e.position}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(report, status=status.HTTP_201_CREATED if report['complete'] else status.HTTP_202_ACCEPTED)
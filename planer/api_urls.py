@@ -1,10 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .api import RouteViewSet
+from .api import DotViewSet, GameBoardViewSet, PointViewSet, RouteViewSet, UserPathViewSet, archive
 
 router = DefaultRouter()
 router.register(r'trasy', RouteViewSet, basename='route')
+router.register(r'trasy/(?P<route_pk>\d+)/punkty', PointViewSet, basename='route-point')
+router.register(r'plansze', GameBoardViewSet, basename='board')
+router.register(r'plansze/(?P<board_pk>\d+)/kropki', DotViewSet, basename='board-dot')
+router.register(r'sciezki', UserPathViewSet, basename='path')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('archiwum/', archive, name='archive'),
 ]
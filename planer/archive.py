@@ -0,0 +1,388 @@
+"""
+Export and import of a user's boards, paths and routes as an NDJSON archive.
+
+An archive is one JSON record per line, table by table, so both directions
+stream with constant memory and every reference points at a record earlier
+in the file:
+
+    {"type": "planer-archive", "version": 1, "id": "<uuid>", "created": "..."}
+    {"type": "board", "id": 1, "name": "...", "rows": 5, "cols": 5}
+    {"type": "dots", "board": 1, "dots": [[row, col, "#FF0000"], ...]}
+    {"type": "path", "board": 1, "name": "...", "path": [...]}
+    {"type": "route", "id": 3, "name": "...", "background": {"name": "...", "image": "backgrounds/..."}}
+    {"type": "points", "route": 3, "start": 0, "coords": [x0, y0, x1, y1, ...]}
+    {"type": "pairs", "route": 3, "coords": [x1, y1, x2, y2, ...]}
+    {"type": "end", "counts": {"boards": 1, "dots": 4, ...}}
+
+Dots, points and pairs are packed up to RECORD_SIZE per line. Ids are the
+exporting database's and are remapped on import; backgrounds are matched by
+image path (the image files themselves are not archived). Paths are those the
+user drew on their own boards. Gzipping the file gives the compact form; the
+management commands do so for *.gz names.
+
+Imports run in batches, each committed together with an ArchiveImport
+checkpoint, so importing the same archive again after an interruption
+continues after the last committed batch, and importing a finished one does
+nothing.
+"""
+import json
+import uuid
+from itertools import groupby, islice, repeat
+from operator import itemgetter
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .boards import DOT_FIELDS, check_dots
+from .models import MAX_BOARD_SIDE, SEQ_GAP, ArchiveImport, BackgroundImage, Dot, GameBoard, Pair, Point, Route, UserPath
+from .renderers import dumps
+from .streaming import buffered
+from .validation import BoardIndex
+
+FORMAT = 'planer-archive'
+VERSION = 1
+RECORD_SIZE = 1000  # dots, points or pairs per record
+CHUNK_SIZE = 2000  # rows per export query chunk
+BATCH_SIZE = 100  # records per import transaction, each up to RECORD_SIZE rows
+FLUSH_SIZE = 5000  # rows held before a bulk insert
+COUNTED = ('boards', 'dots', 'paths', 'routes', 'points', 'pairs')
+
+
+class ArchiveError(Exception):
+    """The archive is malformed; `position` is the 1-based record it failed at."""
+
+    def __init__(self, message, position=None):
+        super().__init__(message if position is None else f"Record {position}: {message}")
+        self.position = position
+
+
+# Export
+
+def _floats(values):
+    # Finite floats: repr() equals json's output and is much faster
+    if all(v - v == 0 for v in values):
+        return '[' + ','.join(map(repr, values)) + ']'
+    return dumps(values)
+
+
+def _line(record):
+    return (dumps(record) + '\n').encode()
+
+
+def _coords_line(kind, route_id, coords, start=None):
+    head = f'{{"type":"{kind}","route":{route_id},'
+    if start is not None:
+        head += f'"start":{start},'
+    return (head + '"coords":' + _floats(coords) + '}\n').encode()
+
+
+def export_archive(user, chunk_size=CHUNK_SIZE):
+    """Yield the user's archive as bytes, in writes of about streaming.BUFFER_SIZE."""
+    return buffered(_export_lines(user, chunk_size))
+
+
+def _export_lines(user, chunk_size):
+    counts = dict.fromkeys(COUNTED, 0)
+    yield _line({'type': FORMAT, 'version': VERSION, 'id': str(uuid.uuid4()), 'created': timezone.now().isoformat()})
+
+    boards = GameBoard.objects.filter(user=user).order_by('id')
+    for board_id, name, rows, cols in boards.values_list('id', 'name', 'rows', 'cols').iterator(chunk_size):
+        counts['boards'] += 1
+        yield _line({'type': 'board', 'id': board_id, 'name': name, 'rows': rows, 'cols': cols})
+
+    dots = Dot.objects.filter(board__user=user).order_by('board_id', 'id').values_list('board_id', 'row', 'col', 'color')
+    for board_id, group in groupby(dots.iterator(chunk_size), key=itemgetter(0)):
+        for batch in iter(lambda: list(islice(group, RECORD_SIZE)), []):
+            counts['dots'] += len(batch)
+            yield _line({'type': 'dots', 'board': board_id, 'dots': [[row, col, color] for _, row, col, color in batch]})
+
+    paths = UserPath.objects.filter(user=user, board__user=user).order_by('id').values_list('board_id', 'name', 'path')
+    for board_id, name, path in paths.iterator(chunk_size):
+        counts['paths'] += 1
+        yield _line({'type': 'path', 'board': board_id, 'name': name, 'path': path})
+
+    routes = Route.objects.filter(user=user).order_by('id').values_list('id', 'name', 'background__name', 'background__image')
+    for route_id, name, background_name, image in routes.iterator(chunk_size):
+        counts['routes'] += 1
+        yield _line({'type': 'route', 'id': route_id, 'name': name, 'background': {'name': background_name, 'image': image}})
+
+    points = Point.objects.filter(route__user=user).order_by('route_id', 'seq', 'id').values_list('route_id', 'x', 'y')
+    for route_id, group in groupby(points.iterator(chunk_size), key=itemgetter(0)):
+        start = 0
+        for batch in iter(lambda: list(islice(group, RECORD_SIZE)), []):
+            yield _coords_line('points', route_id, [v for _, x, y in batch for v in (x, y)], start)
+            start += len(batch)
+        counts['points'] += start
+
+    pairs = Pair.objects.filter(route__user=user).order_by('route_id', 'id').values_list('route_id', 'x1', 'y1', 'x2', 'y2')
+    for route_id, group in groupby(pairs.iterator(chunk_size), key=itemgetter(0)):
+        for batch in iter(lambda: list(islice(group, RECORD_SIZE)), []):
+            counts['pairs'] += len(batch)
+            yield _coords_line('pairs', route_id, [v for row in batch for v in row[1:]])
+
+    yield _line({'type': 'end', 'counts': counts})
+
+
+# Import
+
+def read_records(lines):
+    """Parse an iterable of NDJSON lines (bytes or str), skipping blank ones."""
+    position = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        position += 1
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ArchiveError(f"Invalid JSON: {e}", position)
+
+
+_FIELDS = {
+    'board': {'id': int, 'name': str, 'rows': int, 'cols': int},
+    'dots': {'board': int, 'dots': list},
+    'path': {'board': int, 'name': str, 'path': list},
+    'route': {'id': int, 'name': str, 'background': dict},
+    'points': {'route': int, 'start': int, 'coords': list},
+    'pairs': {'route': int, 'coords': list},
+    'end': {'counts': dict},
+}
+
+
+def _check(record):
+    if not isinstance(record, dict) or record.get('type') not in _FIELDS:
+        raise ValueError("Unknown record type.")
+    for key, kind in _FIELDS[record['type']].items():
+        if not isinstance(record.get(key), kind) or isinstance(record[key], bool):
+            raise ValueError(f'"{key}" must be {"an integer" if kind is int else "a " + kind.__name__}.')
+
+
+# Dots, points and pairs skip model instances: rows of these columns go straight to executemany()
+_COLUMNS = {
+    Dot: ('board_id', 'row', 'col', 'color'),
+    Point: ('route_id', 'seq', 'x', 'y'),
+    Pair: ('route_id', 'x1', 'y1', 'x2', 'y2'),
+}
+
+
+def _insert_rows(model, rows):
+    quote = connection.ops.quote_name
+    columns = _COLUMNS[model]
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        quote(model._meta.db_table), ', '.join(map(quote, columns)), ', '.join(['%s'] * len(columns)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def _dots(data, rows, cols, taken):
+    """{(row, col): color} of a dots record, checked against the board and the cells `taken` by earlier records."""
+    if not all(isinstance(dot, list) and len(dot) == 3 for dot in data):
+        raise ValueError("Dots must be [row, col, color] lists.")
+    try:
+        dots = check_dots([dict(zip(DOT_FIELDS, dot)) for dot in data], rows, cols)
+    except ValidationError as e:
+        raise ValueError(e.messages[0])
+    for row, col in taken.intersection(dots):
+        raise ValueError(f"Two dots at ({row}, {col}).")
+    return dots
+
+
+class _Importer:
+    """Writes records for one ArchiveImport; flushes each model's rows in bulk, in record order."""
+
+    def __init__(self, checkpoint):
+        self.checkpoint = checkpoint
+        self.user = checkpoint.user
+        self.ids = checkpoint.id_map
+        self.ids.setdefault('boards', {})
+        self.ids.setdefault('routes', {})
+        self.counts = checkpoint.counts
+        for key in COUNTED:
+            self.counts.setdefault(key, 0)
+        self.backgrounds = {}
+        self.pending_model = None
+        self.pending = []
+        self.pending_ids = []
+        self.complete = checkpoint.completed_at is not None
+        self.index = None  # (board id, BoardIndex) of the board paths were last checked on
+        self.cells = None  # (board id, rows, cols, cells with a dot) of the board dots were last added to
+
+    def _target(self, table, old_id):
+        if self.pending_model is (GameBoard if table == 'boards' else Route):
+            self.flush()  # for the ids
+        try:
+            return self.ids[table][str(old_id)]
+        except KeyError:
+            raise ValueError(f"Refers to {table[:-1]} {old_id}, which is not earlier in the archive.")
+
+    def _queue(self, model, instances, old_ids=()):
+        if model is not self.pending_model:
+            self.flush()
+            self.pending_model = model
+        self.pending += instances
+        self.pending_ids += old_ids
+        if len(self.pending) >= FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        model = self.pending_model
+        if model in _COLUMNS:
+            _insert_rows(model, self.pending)
+        else:
+            model.objects.bulk_create(self.pending, batch_size=RECORD_SIZE)
+        if model in (GameBoard, Route):
+            table = 'boards' if model is GameBoard else 'routes'
+            self.ids[table].update((str(old), obj.pk) for old, obj in zip(self.pending_ids, self.pending))
+        self.pending, self.pending_ids = [], []
+
+    def _board_index(self, board_id):
+        if self.index is None or self.index[0] != board_id:
+            self.flush()  # the board's dots may still be queued
+            rows, cols = GameBoard.objects.filter(pk=board_id).values_list('rows', 'cols').get()
+            dots = Dot.objects.filter(board_id=board_id).order_by('id').values('row', 'col', 'color')
+            self.index = (board_id, BoardIndex(rows, cols, list(dots)))
+        return self.index[1]
+
+    def _board_cells(self, board_id):
+        if self.cells is None or self.cells[0] != board_id:
+            self.flush()  # a resumed import may have committed dots of this board already
+            rows, cols = GameBoard.objects.filter(pk=board_id).values_list('rows', 'cols').get()
+            taken = set(Dot.objects.filter(board_id=board_id).values_list('row', 'col'))
+            self.cells = (board_id, rows, cols, taken)
+        return self.cells[1:]
+
+    def _background(self, data):
+        key = (str(data.get('name', '')), str(data.get('image', '')))
+        if key not in self.backgrounds:
+            name, image = key
+            background = BackgroundImage.objects.filter(image=image).order_by('id').first()
+            if background is None:
+                background = BackgroundImage.objects.create(name=name[:100], image=image)
+            self.backgrounds[key] = background.pk
+        return self.backgrounds[key]
+
+    def add(self, record):
+        if self.complete:
+            raise ValueError("Records after the end of the archive.")
+        _check(record)
+        kind = record['type']
+        if kind == 'board':
+            if not (1 <= record['rows'] <= MAX_BOARD_SIDE and 1 <= record['cols'] <= MAX_BOARD_SIDE):
+                raise ValueError(f"Boards need 1 to {MAX_BOARD_SIDE} rows and columns.")
+            board = GameBoard(user=self.user, name=record['name'], rows=record['rows'], cols=record['cols'])
+            self._queue(GameBoard, [board], [record['id']])
+            self.counts['boards'] += 1
+        elif kind == 'dots':
+            board_id = self._target('boards', record['board'])
+            rows, cols, taken = self._board_cells(board_id)
+            dots = _dots(record['dots'], rows, cols, taken)
+            taken.update(dots)
+            self._queue(Dot, [(board_id, row, col, color) for (row, col), color in dots.items()])
+            self.counts['dots'] += len(dots)
+            if self.index is not None and self.index[0] == board_id:
+                self.index = None
+        elif kind == 'path':
+            board_id = self._target('boards', record['board'])
+            path = record['path']
+            errors = self._board_index(board_id).validate(path)
+            if errors:
+                raise ValueError(f"Invalid path at point #{errors[0]['index']}: {errors[0]['message']}")
+            self._queue(UserPath, [UserPath(board_id=board_id, user=self.user, name=record['name'], path=path,
+                                            step_count=len(path))])
+            self.counts['paths'] += 1
+        elif kind == 'route':
+            route = Route(user=self.user, name=record['name'], background_id=self._background(record['background']))
+            self._queue(Route, [route], [record['id']])
+            self.counts['routes'] += 1
+        elif kind == 'points':
+            route_id, coords, start = self._target('routes', record['route']), record['coords'], record['start']
+            if len(coords) % 2:
+                raise ValueError("Points need an even number of coordinates.")
+            coords = list(map(float, coords))
+            seqs = range(SEQ_GAP * (start + 1), SEQ_GAP * (start + len(coords) // 2 + 1), SEQ_GAP)
+            self._queue(Point, list(zip(repeat(route_id), seqs, coords[::2], coords[1::2])))
+            self.counts['points'] += len(coords) // 2
+        elif kind == 'pairs':
+            route_id, c = self._target('routes', record['route']), record['coords']
+            if len(c) % 4:
+                raise ValueError("Pairs need four coordinates each.")
+            c = list(map(float, c))
+            self._queue(Pair, list(zip(repeat(route_id), c[::4], c[1::4], c[2::4], c[3::4])))
+            self.counts['pairs'] += len(c) // 4
+        else:
+            self.flush()
+            expected = {key: record['counts'].get(key) for key in COUNTED}
+            if expected != self.counts:
+                raise ValueError(f"Imported {self.counts}, but the archive lists {expected}.")
+            self.complete = True
+
+
+def import_archive(user, records, batch_size=BATCH_SIZE, restart=False):
+    """
+    Import parsed archive records (see read_records) for `user`.
+
+    Returns {"archive", "resumed_from", "position", "complete", "counts"},
+    where counts are the rows imported from this archive so far. An archive
+    that ends early leaves its checkpoint for the next attempt; a malformed
+    record raises ArchiveError, keeping the batches committed before it.
+    `restart` forgets an earlier import of the same archive (its rows stay).
+    """
+    records = iter(records)
+    header = next(records, None)
+    if not isinstance(header, dict) or header.get('type') != FORMAT:
+        raise ArchiveError("Not a planer archive.", 1)
+    if header.get('version') != VERSION:
+        raise ArchiveError(f"Unsupported archive version {header.get('version')!r}.", 1)
+    archive_id = header.get('id')
+    if not isinstance(archive_id, str) or not 0 < len(archive_id) <= 36:
+        raise ArchiveError("Missing archive id.", 1)
+
+    checkpoint, created = ArchiveImport.objects.get_or_create(user=user, archive_id=archive_id)
+    if restart and not created:
+        checkpoint.position, checkpoint.id_map, checkpoint.counts, checkpoint.completed_at = 0, {}, {}, None
+        checkpoint.save()
+    resumed_from = checkpoint.position
+    importer = _Importer(checkpoint)
+    if importer.complete:
+        return _report(checkpoint, resumed_from)
+    position = 1  # the header
+    skip = resumed_from
+    while not importer.complete:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        done = min(len(batch), max(0, skip - position))
+        position += done
+        if done == len(batch):
+            continue
+        with transaction.atomic():
+            try:
+                for record in batch[done:]:
+                    position += 1
+                    importer.add(record)
+                importer.flush()
+            except (ValueError, TypeError, IndexError, DatabaseError) as e:
+                raise ArchiveError(str(e), position)
+            checkpoint.position = position
+            if importer.complete:
+                checkpoint.completed_at = timezone.now()
+            checkpoint.save()
+
+    if importer.complete and next(records, None) is not None:
+        raise ArchiveError("Records after the end of the archive.", position + 1)
+    return _report(checkpoint, resumed_from)
+
+
+def _report(checkpoint, resumed_from):
+    return {
+        'archive': checkpoint.archive_id,
+        'resumed_from': resumed_from,
+        'position': checkpoint.position,
+        'complete': checkpoint.completed_at is not None,
+        'counts': dict(checkpoint.counts),
+    }
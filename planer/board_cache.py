@@ -0,0 +1,97 @@
+"""
+Per-board snapshot of the dots as the board views need them: the dot list in
+id order, the color -> pair map and the dot list pre-serialized to JSON.
+
+Snapshots live in a process-local LRU keyed by (board id, GameBoard.version).
+Anything that changes a board's dots calls mark_dirty(), which bumps the
+version, so a stale snapshot is never looked up again.
+"""
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import GameBoard
+
+
+class BoardSnapshot:
+    __slots__ = ('dots', 'pairs', 'dots_json')
+
+    def __init__(self, dots):
+        self.dots = dots
+        by_color = {}
+        for dot in dots:
+            by_color.setdefault(dot['color'], []).append(dot)
+        # Only colors with exactly two dots form a pair
+        self.pairs = {color: group for color, group in by_color.items() if len(group) == 2}
+        self.dots_json = json.dumps(dots)
+
+
+EMPTY_SNAPSHOT = BoardSnapshot([])
+
+
+class BoardCache:
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, board):
+        key = (board.id, board.version)
+        with self._lock:
+            snapshot = self._entries.get(key)
+            if snapshot is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+        snapshot = BoardSnapshot(list(board.dots.order_by('id').values('row', 'col', 'color')))
+        with self._lock:
+            self._entries[key] = snapshot
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return snapshot
+
+    def discard(self, board_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == board_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+board_cache = BoardCache(getattr(settings, 'PLANER_BOARD_CACHE_SIZE', 256))
+
+
+def get_snapshot(board):
+    return board_cache.get(board)
+
+
+def mark_dirty(board_id):
+    """
+    Record that the board's dots changed. The bump runs in the caller's
+    transaction, so a rollback takes it back too; bulk writers call this once
+    rather than per dot.
+    """
+    GameBoard.objects.filter(id=board_id).update(version=F('version') + 1, updated_at=timezone.now())
+    board_cache.discard(board_id)
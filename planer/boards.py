@@ -0,0 +1,147 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .board_cache import mark_dirty
+from .models import Dot
+
+# Keeps every IN (...) list and multi-row INSERT under SQLite's variable limit.
+BATCH_SIZE = 500
+
+# Dot layouts of the API (see dots_layout): per-dot objects, parallel arrays, or a grid string
+OBJECTS = 'objects'
+COLUMNS = 'columns'
+GRID = 'grid'
+LAYOUTS = (OBJECTS, COLUMNS, GRID)
+DOT_FIELDS = ('row', 'col', 'color')
+# One character per cell in the grid layout: EMPTY_CELL, or the color's index in the palette
+EMPTY_CELL = '.'
+GRID_SYMBOLS = '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+# The grid layout spells out every cell, so it is only offered for boards up to this size
+GRID_MAX_CELLS = getattr(settings, 'PLANER_GRID_MAX_CELLS', 250 * 250)
+
+
+def parse_dots(dots_json, rows, cols):
+    """
+    Validate the `dots_json` posted by the board editor in a single pass.
+
+    Returns a dict mapping (row, col) to color; raises ValidationError for
+    malformed JSON, cells outside the rows x cols grid or two dots on one cell.
+    """
+    if not dots_json:
+        return {}
+    try:
+        data = json.loads(dots_json)
+    except ValueError:
+        raise ValidationError("Nieprawidłowe dane kropek (JSON).")
+    return check_dots(data, rows, cols)
+
+
+def check_dots(data, rows, cols):
+    """parse_dots() for already decoded data: a list of {"row", "col", "color"} objects."""
+    if not isinstance(data, list):
+        raise ValidationError("Dane kropek muszą być listą.")
+
+    dots = {}
+    for i, dot in enumerate(data):
+        try:
+            row, col, color = dot['row'], dot['col'], dot['color']
+        except (TypeError, KeyError):
+            raise ValidationError(f"Kropka #{i} musi mieć pola row, col i color.")
+        if type(row) is not int or type(col) is not int:
+            raise ValidationError(f"Kropka #{i}: row i col muszą być liczbami całkowitymi.")
+        if not (0 <= row < rows and 0 <= col < cols):
+            raise ValidationError(f"Kropka #{i} ({row}, {col}) leży poza planszą {rows} x {cols}.")
+        if not isinstance(color, str) or not color or len(color) > 7:
+            raise ValidationError(f"Kropka #{i}: nieprawidłowy kolor.")
+        if (row, col) in dots:
+            raise ValidationError(f"Dwie kropki na polu ({row}, {col}).")
+        dots[(row, col)] = color
+    return dots
+
+
+def save_board_dots(board, dots):
+    """
+    Make the board's stored dots equal to `dots` ({(row, col): color}).
+
+    Only the difference against the current rows is written: new cells are
+    bulk-inserted, vanished cells bulk-deleted and changed colors updated per color,
+    all in one transaction. Returns (inserted, removed, recolored) counts.
+    """
+    with transaction.atomic():
+        remaining = dict(dots)
+        removed = []
+        recolored = {}
+        for dot_id, row, col, old_color in board.dots.values_list('id', 'row', 'col', 'color'):
+            color = remaining.pop((row, col), None)
+            if color is None:
+                # Gone from the new set (or a duplicate left by older saves).
+                removed.append(dot_id)
+            elif color != old_color:
+                recolored.setdefault(color, []).append(dot_id)
+
+        for start in range(0, len(removed), BATCH_SIZE):
+            Dot.objects.filter(id__in=removed[start:start + BATCH_SIZE]).delete()
+        # Boards use a handful of colors, so one UPDATE per color beats a CASE-per-row bulk_update.
+        for color, ids in recolored.items():
+            for start in range(0, len(ids), BATCH_SIZE):
+                Dot.objects.filter(id__in=ids[start:start + BATCH_SIZE]).update(color=color)
+        if remaining:
+            Dot.objects.bulk_create(
+                [Dot(board=board, row=row, col=col, color=color) for (row, col), color in remaining.items()],
+                batch_size=BATCH_SIZE,
+            )
+        if remaining or removed or recolored:
+            mark_dirty(board.id)
+    return len(remaining), len(removed), sum(len(ids) for ids in recolored.values())
+
+
+def check_grid(rows, cols, dots):
+    """
+    Raise ValueError if the grid layout can't hold the board: more than
+    GRID_MAX_CELLS cells or more than len(GRID_SYMBOLS) colors.
+    """
+    if rows * cols > GRID_MAX_CELLS:
+        raise ValueError(f"The grid layout takes boards of at most {GRID_MAX_CELLS} cells.")
+    if len({dot['color'] for dot in dots}) > len(GRID_SYMBOLS):
+        raise ValueError(f"The grid layout takes at most {len(GRID_SYMBOLS)} colors.")
+
+
+def dots_layout(dots, rows, cols, layout=OBJECTS):
+    """
+    A board's dots ({"row", "col", "color"} dicts in id order) in one of the
+    LAYOUTS: the list itself; {"row": [...], "col": [...], "color": [...]}
+    with one entry per dot; or {"palette": [colors], "grid": "..."} with one
+    row of cols characters per board row, joined by newlines. Colors get
+    palette indexes in order of first appearance; boards check_grid() rejects
+    raise ValueError in the grid layout.
+    """
+    if layout == COLUMNS:
+        return to_columns(dots, DOT_FIELDS)
+    if layout == GRID:
+        check_grid(rows, cols, dots)
+        palette = list(dict.fromkeys(dot['color'] for dot in dots))
+        symbols = {color: ord(symbol) for color, symbol in zip(palette, GRID_SYMBOLS)}
+        # One byte per cell plus a newline per row, instead of a list of one-character strings
+        width = cols + 1
+        cells = bytearray((EMPTY_CELL * cols + '\n').encode() * rows)
+        for dot in dots:
+            cells[dot['row'] * width + dot['col']] = symbols[dot['color']]
+        return {'palette': palette, 'grid': cells[:-1].decode()}
+    return dots
+
+
+def to_columns(items, fields):
+    """{field: [value of each item]} for a list of dicts; values missing from an item are None."""
+    return {field: [item.get(field) if isinstance(item, dict) else None for item in items] for field in fields}
+
+
+def from_columns(data, fields):
+    """The list of dicts to_columns() was given; ValidationError if `data` is not columns of equal length."""
+    if not isinstance(data, dict) or not all(isinstance(data.get(field), list) for field in fields):
+        raise ValidationError(f"Kolumny muszą być listami: {', '.join(fields)}.")
+    if len({len(data[field]) for field in fields}) > 1:
+        raise ValidationError("Kolumny muszą mieć tę samą długość.")
+    return [dict(zip(fields, values)) for values in zip(*(data[field] for field in fields))]
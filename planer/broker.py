@@ -0,0 +1,306 @@
+import asyncio
+import itertools
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+
+# Every event is published to GLOBAL and to the board and user topics it concerns
+GLOBAL = 'global'
+_TOPIC = re.compile(r'global|(?:board|user):[1-9]\d{0,18}')
+
+
+def board_topic(board_id):
+    return f'board:{board_id}'
+
+
+def user_topic(user_id):
+    return f'user:{user_id}'
+
+
+def parse_topics(values):
+    """The topics named in `values` ("global", "board:<id>", "user:<id>"), GLOBAL if none; ValueError if malformed."""
+    topics = frozenset(values) or frozenset((GLOBAL,))
+    for topic in topics:
+        if not _TOPIC.fullmatch(topic):
+            raise ValueError(f"Unknown topic {topic!r}")
+    return topics
+
+
+class Event:
+    """A single notification; the SSE payload is formatted and encoded once and shared by all subscribers."""
+    __slots__ = ('id', 'name', 'data', 'topics', 'payload')
+
+    def __init__(self, id, name, data, topics=(GLOBAL,)):
+        self.id = id
+        self.name = name
+        self.data = data
+        self.topics = topics
+        self.payload = f"id: {id}\nevent: {name}\ndata: {data}\n\n".encode()
+
+    def __repr__(self):
+        return f"Event({self.id}, {self.name!r})"
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class Subscription:
+    """Bounded per-client queue. When full, slow consumers lose events according to `policy`."""
+
+    def __init__(self, maxsize=1000, policy=DROP_OLDEST, topics=frozenset((GLOBAL,))):
+        self.topics = topics
+        self.queue = deque()
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._waiter = None  # (loop, future) of a pending get_async()
+
+    def put(self, event):
+        with self._cond:
+            if len(self.queue) >= self.maxsize:
+                self.dropped += 1
+                if self.policy == DROP_NEWEST:
+                    return
+                self.queue.popleft()
+            self.queue.append(event)
+            self._cond.notify()
+            waiter, self._waiter = self._waiter, None
+        if waiter is not None:
+            loop, future = waiter
+            # Skip the self-pipe write when publishing from the listener's own loop.
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                loop.call_soon(_wake, future)
+            else:
+                loop.call_soon_threadsafe(_wake, future)
+
+    def get(self, timeout=None):
+        """Return every queued event, waiting up to `timeout` seconds if there are none."""
+        with self._cond:
+            if not self.queue:
+                self._cond.wait(timeout)
+            events = list(self.queue)
+            self.queue.clear()
+        return events
+
+    async def get_async(self, timeout=None):
+        """Like get(), but parks the coroutine instead of a thread while waiting."""
+        future = None
+        with self._cond:
+            if not self.queue:
+                loop = asyncio.get_running_loop()
+                future = loop.create_future()
+                self._waiter = (loop, future)
+        if future is not None:
+            try:
+                await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._cond:
+                    if self._waiter is not None and self._waiter[1] is future:
+                        self._waiter = None
+        with self._cond:
+            events = list(self.queue)
+            self.queue.clear()
+        return events
+
+    def __len__(self):
+        return len(self.queue)
+
+
+class FanoutHub:
+    """
+    Local (per-process) subscriptions, indexed by topic: a delivered event is
+    copied to the subscribers of its topics only, so its cost follows the
+    number of interested subscribers rather than all of them.
+    """
+
+    def __init__(self, maxsize=1000, policy=DROP_OLDEST):
+        self.maxsize = maxsize
+        self.policy = policy
+        self._index = defaultdict(set)  # topic -> subscriptions
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics=frozenset((GLOBAL,))):
+        subscription = Subscription(self.maxsize, self.policy, frozenset(topics))
+        with self._lock:
+            for topic in topics:
+                self._index[topic].add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            removed = False
+            for topic in subscription.topics:
+                subscribers = self._index.get(topic)
+                if subscribers is not None and subscription in subscribers:
+                    subscribers.remove(subscription)
+                    removed = True
+                    if not subscribers:
+                        del self._index[topic]
+            if removed:
+                self._count -= 1
+
+    def deliver(self, event):
+        with self._lock:
+            groups = [self._index[topic] for topic in event.topics if topic in self._index]
+            if len(groups) == 1:
+                subscribers = tuple(groups[0])
+            else:
+                # A subscriber of several of the event's topics still gets it once
+                subscribers = set().union(*groups)
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def __len__(self):
+        return self._count
+
+
+class InMemoryBroker:
+    """Broker for a single process: publishing delivers straight to the local hub."""
+
+    def __init__(self, maxsize=1000, policy=DROP_OLDEST, replay=100):
+        self.hub = FanoutHub(maxsize, policy)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        # Recent events kept so reconnecting clients can resume from Last-Event-ID.
+        self._replay = deque(maxlen=replay)
+
+    def publish(self, name, data, topics=(GLOBAL,)):
+        # Ids are assigned and delivered under one lock so concurrent publishers keep order.
+        with self._lock:
+            event = Event(next(self._ids), name, json.dumps(data), tuple(topics))
+            self._deliver(event)
+        return event
+
+    def _deliver(self, event):
+        self._replay.append(event)
+        self.hub.deliver(event)
+
+    def subscribe(self, last_event_id=None, topics=frozenset((GLOBAL,))):
+        """
+        Subscribe to `topics`; with `last_event_id`, first queue the buffered
+        events of those topics published after it.
+        """
+        topics = frozenset(topics)
+        with self._lock:
+            subscription = self.hub.subscribe(topics)
+            if last_event_id is not None:
+                for event in self._replay:
+                    if event.id > last_event_id and not topics.isdisjoint(event.topics):
+                        subscription.put(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.hub.unsubscribe(subscription)
+
+
+class SQLiteBroker(InMemoryBroker):
+    """
+    Broker shared by every worker process on one host.
+
+    Events are appended to a small SQLite log; each process runs one poller thread
+    that tails the log and hands new rows to its local hub, so all subscribers see
+    events in log order no matter which process published them.
+    """
+
+    def __init__(self, path, poll_interval=0.1, retain=10000, maxsize=1000, policy=DROP_OLDEST, replay=100):
+        super().__init__(maxsize, policy, replay)
+        self.path = str(path)
+        self.poll_interval = poll_interval
+        self.retain = retain
+        self._published = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS events ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, data TEXT NOT NULL, '
+            "topics TEXT NOT NULL DEFAULT 'global')"
+        )
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(events)')]
+        if 'topics' not in columns:  # log created before topics existed
+            self._conn.execute("ALTER TABLE events ADD COLUMN topics TEXT NOT NULL DEFAULT 'global'")
+        self._conn.commit()
+        self._poller = None
+        self._stopped = threading.Event()
+
+    def publish(self, name, data, topics=(GLOBAL,)):
+        data, topics = json.dumps(data), tuple(topics)
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT INTO events (name, data, topics) VALUES (?, ?, ?)', (name, data, ' '.join(topics))
+            )
+            event_id = cursor.lastrowid
+            self._published += 1
+            if self.retain and self._published % 1000 == 0:
+                self._conn.execute('DELETE FROM events WHERE id <= ?', (event_id - self.retain,))
+            self._conn.commit()
+        return Event(event_id, name, data, topics)
+
+    def subscribe(self, last_event_id=None, topics=frozenset((GLOBAL,))):
+        self._start_poller()
+        return super().subscribe(last_event_id, topics)
+
+    def _start_poller(self):
+        with self._lock:
+            if self._poller is not None:
+                return
+            row = self._conn.execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()
+            self._poller = threading.Thread(target=self._poll, args=(row[0],), daemon=True)
+            self._poller.start()
+
+    def _poll(self, last_id):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            while not self._stopped.is_set():
+                rows = conn.execute(
+                    'SELECT id, name, data, topics FROM events WHERE id > ? ORDER BY id LIMIT 1000', (last_id,)
+                ).fetchall()
+                with self._lock:
+                    for event_id, name, data, topics in rows:
+                        self._deliver(Event(event_id, name, data, tuple(topics.split())))
+                        last_id = event_id
+                if not rows:
+                    time.sleep(self.poll_interval)
+        finally:
+            conn.close()
+
+    def close(self):
+        self._stopped.set()
+        if self._poller is not None:
+            self._poller.join()
+        self._conn.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker configured by `settings.PLANER_SSE_BROKER`."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                config = getattr(settings, 'PLANER_SSE_BROKER', {})
+                backend = import_string(config.get('BACKEND', 'planer.broker.InMemoryBroker'))
+                _broker = backend(**config.get('OPTIONS', {}))
+    return _broker
@@ -0,0 +1,39 @@
+"""
+Conditional GETs from version stamps.
+
+A page or API response is stamped with the version fields of the rows it is
+built from (GameBoard.version/updated_at, Route.revision/updated_at,
+UserPath.updated_at), read with one narrow query before any rendering. The
+ETag is a hash of those stamps, so a client repeating a GET gets a 304
+without the view doing its work, and the same stamps key the server-side
+cache of rendered data (for routes, only up to ROUTE_CACHE_MAX_POINTS points).
+
+HTML pages embed the user's name and a CSRF token, so their ETag also covers
+the user and the CSRF cookie: a page is only reused by the browser that
+received it, and never after its token's secret has changed.
+"""
+import hashlib
+
+from django.conf import settings
+
+FRAGMENT_TIMEOUT = getattr(settings, 'PLANER_FRAGMENT_CACHE_TIMEOUT', 3600)
+# Longer routes are served with an ETag but never cached whole
+ROUTE_CACHE_MAX_POINTS = getattr(settings, 'PLANER_ROUTE_CACHE_MAX_POINTS', 1000)
+
+
+def make_etag(*parts):
+    return hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+
+
+def page_etag(request, *parts):
+    """
+    ETag for an HTML page rendered for request.user, or None (no conditional
+    handling) for unsafe methods, for a missing stamp or while the browser
+    has no CSRF cookie yet, since rendering the page is what sets it.
+    """
+    if request.method not in ('GET', 'HEAD') or any(part is None for part in parts):
+        return None
+    csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+    if not csrf_cookie:
+        return None
+    return make_etag(request.user.pk, csrf_cookie, *parts)
@@ -0,0 +1,291 @@
+"""
+Incremental edits of a route's points and pairs, and of a UserPath's cells.
+
+A delta is {"revision": n, "ops": [...]}, where `revision` is the one the
+client last saw. The ops apply in order, each to the result of the ones
+before it. Indexes count from 0 in route order (points), id order (pairs) or
+list order (path cells); ranges are [start, stop).
+
+    {"op": "append", "value": [...]}
+    {"op": "insert", "index": i, "value": [...]}     points and cells
+    {"op": "replace", "index": i, "value": [...]}    overwrite len(value) items from i
+    {"op": "delete", "start": i, "stop": j}
+    {"op": "recolor", "from": "#f00", "to": "#0f0"}  path cells only
+
+Route ops pick their rows with "target": "points" (the default) or "pairs".
+Points are {"x", "y"}, pairs {"x1", "y1", "x2", "y2"} and cells are shaped
+as in UserPath.path.
+
+Everything runs in one transaction that starts with the revision check, so a
+stale client gets RevisionConflict and nothing is written. Route ops touch
+only the rows they name. Inserted points take Point.seq values between their
+neighbours, and nearby points are respaced only when the neighbours have no
+room left. A path is a single packed row, rewritten once and validated
+against its board.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import SEQ_GAP, Pair, Point, Route, UserPath
+from .packing import invalidate_route_geometry
+from .serializers import PairSerializer, PointSerializer
+from .validation import validate_path
+
+MAX_OPS = 1000
+BATCH_SIZE = 1000
+
+
+class DeltaError(Exception):
+    """The delta is malformed or does not apply; `errors` is a list of {"op": index, "message": ...}."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+class RevisionConflict(Exception):
+    """The object changed since the client's revision; `revision` is the current one."""
+
+    def __init__(self, revision):
+        super().__init__(revision)
+        self.revision = revision
+
+
+def _error(index, message):
+    return DeltaError([{'op': index, 'message': message}])
+
+
+def _index(op, i, name):
+    value = op.get(name)
+    if type(value) is not int or value < 0:
+        raise _error(i, f'"{name}" must be a non-negative integer.')
+    return value
+
+
+def _parse(data, allowed):
+    """(revision, ops) from a delta body, with every op's shape checked and its positions read."""
+    if not isinstance(data, dict):
+        raise _error(None, 'Expected an object with "revision" and "ops".')
+    revision = data.get('revision')
+    if type(revision) is not int or revision < 0:
+        raise _error(None, '"revision" must be a non-negative integer.')
+    ops = data.get('ops')
+    if not isinstance(ops, list) or not ops or len(ops) > MAX_OPS:
+        raise _error(None, f'"ops" must be a list of 1 to {MAX_OPS} operations.')
+
+    parsed = []
+    for i, op in enumerate(ops):
+        if not isinstance(op, dict):
+            raise _error(i, 'Each operation must be an object.')
+        target = op.get('target', 'points')
+        name = op.get('op')
+        if (name, target) not in allowed:
+            raise _error(i, f'Unsupported operation {name!r} on {target!r}.')
+        entry = {'op': name, 'target': target}
+        if name in ('append', 'insert', 'replace'):
+            if not isinstance(op.get('value'), list) or not op['value']:
+                raise _error(i, '"value" must be a non-empty list.')
+            entry['value'] = op['value']
+        if name in ('insert', 'replace'):
+            entry['index'] = _index(op, i, 'index')
+        elif name == 'delete':
+            entry['start'], entry['stop'] = _index(op, i, 'start'), _index(op, i, 'stop')
+            if entry['start'] > entry['stop']:
+                raise _error(i, '"start" must not be greater than "stop".')
+        elif name == 'recolor':
+            if not isinstance(op.get('from'), str) or not isinstance(op.get('to'), str):
+                raise _error(i, '"from" and "to" must be colors.')
+            entry['from'], entry['to'] = op['from'], op['to']
+        parsed.append(entry)
+    return revision, parsed
+
+
+# Routes
+
+ROUTE_OPS = {
+    ('append', 'points'), ('insert', 'points'), ('replace', 'points'), ('delete', 'points'),
+    ('append', 'pairs'), ('replace', 'pairs'), ('delete', 'pairs'),
+}
+_SERIALIZERS = {'points': PointSerializer, 'pairs': PairSerializer}
+
+
+def _validated(i, op):
+    serializer = _SERIALIZERS[op['target']](data=op['value'], many=True)
+    if not serializer.is_valid():
+        errors = [
+            {'op': i, 'message': f'Item {j}: {item_errors}'}
+            for j, item_errors in enumerate(serializer.errors) if item_errors
+        ]
+        raise DeltaError(errors)
+    return serializer.validated_data
+
+
+def _ids(queryset, start, stop, *fields):
+    """Rows start..stop-1 of the ordered queryset; IndexError unless all of them exist."""
+    rows = list(queryset.values_list('id', *fields)[start:stop]) if stop > start else []
+    if len(rows) != stop - start:
+        raise IndexError(f'Range {start}:{stop} is past the end.')
+    return rows
+
+
+def make_room(points, index, count, total):
+    """
+    `count` increasing seq values that sort between point index-1 and point
+    index of `points` (ordered by seq, id; `total` long, 0 < index < total
+    or index == 0 < total).
+
+    Uses the gap between the two neighbours when it is wide enough. Otherwise
+    the window of points around `index` is widened until its seq range has
+    room for its points plus the new ones, and the window is respaced evenly;
+    only points whose seq changes are written.
+    """
+    width = 0
+    while True:
+        lo, hi = max(0, index - width), min(total, index + width)
+        span = list(points.values_list('id', 'seq')[max(0, lo - 1):hi + 1])
+        floor = span.pop(0)[1] if lo > 0 else None
+        ceiling = span.pop()[1] if hi < total else None
+        rows = span
+        slots = len(rows) + count
+        if floor is None:
+            floor = (rows[0][1] if rows else ceiling) - SEQ_GAP * (slots + 1)
+        if ceiling is None:
+            ceiling = (rows[-1][1] if rows else floor) + SEQ_GAP * (slots + 1)
+        if ceiling - floor > slots:
+            step = (ceiling - floor) // (slots + 1)
+            seqs = [floor + step * (k + 1) for k in range(slots)]
+            before = index - lo
+            moved = [
+                Point(id=point_id, seq=seq)
+                for (point_id, old), seq in zip(rows, seqs[:before] + seqs[before + count:])
+                if old != seq
+            ]
+            Point.objects.bulk_update(moved, ['seq'], batch_size=BATCH_SIZE)
+            return seqs[before:before + count]
+        width = max(1, width * 2)
+
+
+def _append_points(route_id, values):
+    last = Point.objects.filter(route_id=route_id).aggregate(last=Max('seq'))['last'] or 0
+    Point.objects.bulk_create(
+        [Point(route_id=route_id, seq=last + SEQ_GAP * (k + 1), **value) for k, value in enumerate(values)],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def _apply_route_op(route_id, op, values):
+    target = op['target']
+    if target == 'points':
+        queryset = Point.objects.filter(route_id=route_id).order_by('seq', 'id')
+        model = Point
+    else:
+        queryset = Pair.objects.filter(route_id=route_id).order_by('id')
+        model = Pair
+    name = op['op']
+
+    if name == 'append':
+        if target == 'points':
+            _append_points(route_id, values)
+        else:
+            Pair.objects.bulk_create([Pair(route_id=route_id, **value) for value in values], batch_size=BATCH_SIZE)
+    elif name == 'insert':
+        total = queryset.count()
+        index = op['index']
+        if index > total:
+            raise IndexError(f'Index {index} is past the end ({total} points).')
+        if index == total:
+            _append_points(route_id, values)
+        else:
+            seqs = make_room(queryset, index, len(values), total)
+            Point.objects.bulk_create(
+                [Point(route_id=route_id, seq=seq, **value) for seq, value in zip(seqs, values)],
+                batch_size=BATCH_SIZE,
+            )
+    elif name == 'replace':
+        fields = list(values[0])
+        rows = _ids(queryset, op['index'], op['index'] + len(values), *fields)
+        changed = [
+            model(id=row[0], **value)
+            for row, value in zip(rows, values)
+            if list(row[1:]) != [value[field] for field in fields]
+        ]
+        model.objects.bulk_update(changed, fields, batch_size=BATCH_SIZE)
+    elif name == 'delete':
+        ids = [row[0] for row in _ids(queryset, op['start'], op['stop'])]
+        for start in range(0, len(ids), BATCH_SIZE):
+            model.objects.filter(id__in=ids[start:start + BATCH_SIZE]).delete()
+
+
+def apply_route_delta(route_id, data):
+    """Apply a route delta; returns {"revision", "points", "pairs"} after it."""
+    revision, ops = _parse(data, ROUTE_OPS)
+    values = [_validated(i, op) if 'value' in op else None for i, op in enumerate(ops)]
+    with transaction.atomic():
+        # Matching the revision takes the row's write lock for the rest of the transaction
+        if not Route.objects.filter(id=route_id, revision=revision).update(updated_at=timezone.now()):
+            raise RevisionConflict(Route.objects.filter(id=route_id).values_list('revision', flat=True).first())
+        for i, (op, value) in enumerate(zip(ops, values)):
+            try:
+                _apply_route_op(route_id, op, value)
+            except IndexError as e:
+                raise _error(i, str(e))
+        invalidate_route_geometry(route_id)  # bumps the revision
+    return {
+        'revision': revision + 1,
+        'points': Point.objects.filter(route_id=route_id).count(),
+        'pairs': Pair.objects.filter(route_id=route_id).count(),
+    }
+
+
+# Paths
+
+PATH_OPS = {(name, 'points') for name in ('append', 'insert', 'replace', 'delete', 'recolor')}
+
+
+def _apply_path_op(path, op):
+    name = op['op']
+    if name == 'append':
+        path.extend(op['value'])
+    elif name == 'insert':
+        if op['index'] > len(path):
+            raise IndexError(f"Index {op['index']} is past the end ({len(path)} cells).")
+        path[op['index']:op['index']] = op['value']
+    elif name == 'replace':
+        stop = op['index'] + len(op['value'])
+        if stop > len(path):
+            raise IndexError(f"Range {op['index']}:{stop} is past the end ({len(path)} cells).")
+        path[op['index']:stop] = op['value']
+    elif name == 'delete':
+        if op['stop'] > len(path):
+            raise IndexError(f"Range {op['start']}:{op['stop']} is past the end ({len(path)} cells).")
+        del path[op['start']:op['stop']]
+    elif name == 'recolor':
+        for k, cell in enumerate(path):
+            if isinstance(cell, dict) and cell.get('color') == op['from']:
+                path[k] = {**cell, 'color': op['to']}
+
+
+def apply_path_delta(user_path, data):
+    """Apply a path delta to `user_path` (with its board); returns {"revision", "steps"} after it."""
+    revision, ops = _parse(data, PATH_OPS)
+    if user_path.revision != revision:
+        raise RevisionConflict(user_path.revision)
+    path = list(user_path.path) if isinstance(user_path.path, list) else []
+    for i, op in enumerate(ops):
+        try:
+            _apply_path_op(path, op)
+        except IndexError as e:
+            raise _error(i, str(e))
+    try:
+        validate_path(user_path.board, path)
+    except ValidationError as e:
+        raise DeltaError([{'op': None, 'message': message} for message in e.messages])
+    with transaction.atomic():
+        updated = UserPath.objects.filter(id=user_path.id, revision=revision).update(
+            path=path, step_count=len(path), revision=F('revision') + 1, updated_at=timezone.now(),
+        )
+        if not updated:
+            raise RevisionConflict(UserPath.objects.filter(id=user_path.id).values_list('revision', flat=True).first())
+    return {'revision': revision + 1, 'steps': len(path)}
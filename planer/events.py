@@ -0,0 +1,186 @@
+"""
+Server-sent events for new boards and paths, sent after the data commits.
+
+The post_save handlers in planer.signals only record ids and the fields the
+instance already has in memory, and queue them with transaction.on_commit,
+so a rolled-back save sends nothing and a save costs no extra queries. The
+dispatcher collects what commits within PLANER_SSE_COALESCE_WINDOW seconds
+on a background thread and publishes it in one go: names of boards and users
+are looked up with one query each for the whole batch, and several paths by
+one user on one board (or boards by one user) become a single newPaths
+(newBoards) event. A lone path or board is still published as newPath
+(newBoard) with the same fields as before. The broker formats each event once
+and shares the payload with every subscriber.
+
+Events go to the GLOBAL topic and to the topics of the board and the user
+they concern, so a coalesced event always belongs to one board and one user.
+
+A window of 0 publishes each event inline as its transaction commits, without
+coalescing.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, connection, transaction
+
+from .broker import GLOBAL, board_topic, get_broker, user_topic
+from .models import GameBoard
+
+logger = logging.getLogger(__name__)
+
+BOARD = 'board'
+PATH = 'path'
+
+# board_name / username are None when the instance did not have them cached
+Pending = namedtuple('Pending', 'kind id name board_id board_name user_id username')
+
+
+def _cached(instance, field):
+    """The related object if the instance already holds it, else None."""
+    field = instance._meta.get_field(field)
+    return field.get_cached_value(instance) if field.is_cached(instance) else None
+
+
+def board_created(board):
+    user = _cached(board, 'user')
+    _enqueue(Pending(BOARD, board.id, board.name, board.id, board.name, board.user_id, user and user.username))
+
+
+def path_created(user_path):
+    board, user = _cached(user_path, 'board'), _cached(user_path, 'user')
+    _enqueue(Pending(
+        PATH, user_path.id, user_path.name, user_path.board_id, board and board.name,
+        user_path.user_id, user and user.username,
+    ))
+
+
+def _enqueue(event):
+    transaction.on_commit(lambda: get_dispatcher().add(event))
+
+
+def _names(batch):
+    """({board_id: name}, {user_id: username}) for every board and user in the batch, one query each."""
+    boards = {e.board_id: e.board_name for e in batch if e.board_name is not None}
+    users = {e.user_id: e.username for e in batch if e.username is not None}
+    missing = {e.board_id for e in batch} - boards.keys()
+    if missing:
+        boards.update(GameBoard.objects.filter(id__in=missing).values_list('id', 'name'))
+    missing = {e.user_id for e in batch} - users.keys()
+    if missing:
+        users.update(User.objects.filter(id__in=missing).values_list('id', 'username'))
+    return boards, users
+
+
+def messages(batch):
+    """[(event name, data, topics)] for a batch of Pending events, grouped in order of first appearance."""
+    boards, users = _names(batch)
+    groups = {}
+    for event in batch:
+        key = (event.kind, None if event.kind == BOARD else event.board_id, event.user_id)
+        groups.setdefault(key, []).append(event)
+
+    result = []
+    for (kind, _, _), events in groups.items():
+        first = events[0]
+        topics = [GLOBAL, user_topic(first.user_id)]
+        topics += [board_topic(e.board_id) for e in events] if kind == BOARD else [board_topic(first.board_id)]
+        if kind == BOARD and len(events) == 1:
+            result.append(('newBoard', {
+                'board_id': first.id,
+                'board_name': first.name,
+                'creator_username': users.get(first.user_id, ''),
+            }, topics))
+        elif kind == BOARD:
+            result.append(('newBoards', {
+                'count': len(events),
+                'board_ids': [e.id for e in events],
+                'creator_username': users.get(first.user_id, ''),
+            }, topics))
+        elif len(events) == 1:
+            result.append(('newPath', {
+                'path_id': first.id,
+                'board_id': first.board_id,
+                'board_name': boards.get(first.board_id, ''),
+                'user_username': users.get(first.user_id, ''),
+                'path_name': first.name,
+            }, topics))
+        else:
+            result.append(('newPaths', {
+                'count': len(events),
+                'path_ids': [e.id for e in events],
+                'board_id': first.board_id,
+                'board_name': boards.get(first.board_id, ''),
+                'user_username': users.get(first.user_id, ''),
+            }, topics))
+    return result
+
+
+def publish(batch):
+    broker = get_broker()
+    for name, data, topics in messages(batch):
+        broker.publish(name, data, topics)
+
+
+class Dispatcher:
+    """Collects committed events and publishes them every `window` seconds from a daemon thread."""
+
+    def __init__(self, window):
+        self.window = window
+        self._pending = []
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+
+    def add(self, event):
+        if self.window <= 0:
+            return publish([event])
+        with self._lock:
+            self._pending.append(event)
+            self._ready.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='planer-events', daemon=True)
+                self._thread.start()
+
+    def _take(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._ready.clear()
+        return batch
+
+    def flush(self):
+        """Publish whatever is pending now, on the calling thread."""
+        batch = self._take()
+        if batch:
+            publish(batch)
+
+    def _run(self):
+        while True:
+            self._ready.wait()
+            time.sleep(self.window)  # let the rest of a burst arrive
+            batch = self._take()
+            if not batch:
+                continue  # taken by flush()
+            close_old_connections()
+            try:
+                publish(batch)
+            except Exception:
+                logger.exception("Publishing %d events failed", len(batch))
+            finally:
+                connection.close()
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = Dispatcher(getattr(settings, 'PLANER_SSE_COALESCE_WINDOW', 0.25))
+    return _dispatcher
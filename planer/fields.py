@@ -0,0 +1,163 @@
+"""
+Compact binary storage for UserPath.path.
+
+draw_path posts a list of {"row", "col", "color", "route"} cells and most of
+that JSON is repeated key names and color strings. PackedPathField stores the
+same list as:
+
+    version byte (1)
+    palette:  varint count, then per color varint length + UTF-8 bytes
+    segments: varint count, then per segment
+              varint palette_index << 1 | route, varint row, varint col,
+              varint steps, ceil(steps / 4) bytes of 2-bit directions
+
+A segment is a run of consecutive cells of one color and route where each cell
+is orthogonally next to the one before, so a stroke of n cells costs a few
+header bytes plus n / 4 bytes. Lists that do not fit that shape (extra keys,
+non-integer coordinates, ...) are stored as version 0 followed by the JSON, so
+any value round-trips unchanged.
+"""
+import json
+
+from django.db import models
+
+PACKED = 1
+JSON = 0
+
+# 2-bit direction codes: (row delta, col delta)
+DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+_CODES = {delta: code for code, delta in enumerate(DIRECTIONS)}
+_KEYS = {'row', 'col', 'color', 'route'}
+# direction byte -> its four (row delta, col delta) steps, lowest bits first
+_UNPACKED = [tuple(DIRECTIONS[byte >> shift & 3] for shift in (0, 2, 4, 6)) for byte in range(256)]
+
+
+def _varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _packable(cell):
+    return (
+        type(cell) is dict and cell.keys() == _KEYS
+        and type(cell['row']) is int and cell['row'] >= 0
+        and type(cell['col']) is int and cell['col'] >= 0
+        and type(cell['color']) is str and cell['route'] in (0, 1) and type(cell['route']) is int
+    )
+
+
+def encode_path(path):
+    if not isinstance(path, list) or not all(_packable(cell) for cell in path):
+        return bytes([JSON]) + json.dumps(path, separators=(',', ':')).encode()
+
+    palette = {}
+    segments = []  # [key, row, col, [direction codes]]
+    last = None
+    for cell in path:
+        color, route, row, col = cell['color'], cell['route'], cell['row'], cell['col']
+        index = palette.setdefault(color, len(palette))
+        key = index << 1 | route
+        if last is not None and last[0] == key:
+            code = _CODES.get((row - last[1], col - last[2]))
+            if code is not None:
+                segments[-1][3].append(code)
+                last = (key, row, col)
+                continue
+        segments.append([key, row, col, []])
+        last = (key, row, col)
+
+    out = bytearray([PACKED])
+    _varint(out, len(palette))
+    for color in palette:
+        raw = color.encode()
+        _varint(out, len(raw))
+        out += raw
+    _varint(out, len(segments))
+    for key, row, col, codes in segments:
+        _varint(out, key)
+        _varint(out, row)
+        _varint(out, col)
+        _varint(out, len(codes))
+        for start in range(0, len(codes), 4):
+            byte = 0
+            for shift, code in enumerate(codes[start:start + 4]):
+                byte |= code << (2 * shift)
+            out.append(byte)
+    return bytes(out)
+
+
+def decode_path(data):
+    data = bytes(data)
+    if not data:
+        return []
+    if data[0] == JSON:
+        return json.loads(data[1:])
+    if data[0] != PACKED:
+        raise ValueError(f"Unknown packed path version {data[0]}")
+
+    pos = 1
+    count, pos = _read_varint(data, pos)
+    palette = []
+    for _ in range(count):
+        size, pos = _read_varint(data, pos)
+        palette.append(data[pos:pos + size].decode())
+        pos += size
+    count, pos = _read_varint(data, pos)
+    path = []
+    append = path.append
+    for _ in range(count):
+        key, pos = _read_varint(data, pos)
+        row, pos = _read_varint(data, pos)
+        col, pos = _read_varint(data, pos)
+        steps, pos = _read_varint(data, pos)
+        color, route = palette[key >> 1], key & 1
+        append({'row': row, 'col': col, 'color': color, 'route': route})
+        end = pos + (steps + 3) // 4
+        for byte in data[pos:end]:
+            for dr, dc in _UNPACKED[byte]:
+                if not steps:
+                    break
+                row += dr
+                col += dc
+                append({'row': row, 'col': col, 'color': color, 'route': route})
+                steps -= 1
+        pos = end
+    return path
+
+
+class PackedPathField(models.BinaryField):
+    """A path list stored with encode_path(); reads back as the same list."""
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return decode_path(value)
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return decode_path(value)
+        if isinstance(value, str):
+            # value_to_string() output, e.g. from a fixture
+            return json.loads(value)
+        return value
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        return encode_path(value)
+
+    def value_to_string(self, obj):
+        return json.dumps(self.value_from_object(obj))
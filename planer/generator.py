@@ -0,0 +1,143 @@
+"""
+Random boards that are solvable by construction.
+
+A layout is made by laying `pairs` random self-avoiding walks on an empty
+rows x cols grid, none crossing another, and keeping only each walk's two
+ends as a pair of dots. The walks themselves are a solution, so every
+generated board can be solved (the exact solver may find a different one).
+Walks are at least MIN_WALK cells long and their ends are not neighbours,
+so no pair is trivial. When the walks run out of room the layout is started
+over, up to ATTEMPTS times.
+
+Layouts are pure data, so generate_layouts() can spread them over a process
+pool, each task with its own seed. create_boards() writes them with one
+bulk_create for the boards and one per batch of dots.
+"""
+import random
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.db import transaction
+
+from .models import Dot, GameBoard
+
+ATTEMPTS = 200
+MIN_WALK = 3
+TASK_SIZE = 25  # layouts per pool task
+BATCH_SIZE = 500  # boards per bulk_create
+
+# The board editor's palette first, then evenly spread hues
+PALETTE = [
+    '#e41a1c', '#377eb8', '#4daf4a', '#984ea3', '#ff7f00', '#a65628', '#ffd700', '#00ced1', '#ff69b4', '#228b22',
+    '#8b4513', '#4682b4', '#b22222', '#00ff7f', '#ff1493', '#ffa500', '#800080', '#00bfff', '#c71585', '#f5a623',
+]
+
+
+class GeneratorError(ValueError):
+    pass
+
+
+def color(k):
+    if k < len(PALETTE):
+        return PALETTE[k]
+    hue = (k * 0.618033988749895) % 1  # golden-ratio steps keep neighbouring indexes apart
+    sector, f = divmod(hue * 6, 1)
+    rgb = [(1, f, 0), (1 - f, 1, 0), (0, 1, f), (0, 1 - f, 1), (f, 0, 1), (1, 0, 1 - f)][int(sector)]
+    return '#' + ''.join(f'{round(55 + 200 * v):02x}' for v in rgb)
+
+
+def check_size(rows, cols, pairs):
+    if rows < 1 or cols < 1 or pairs < 1:
+        raise GeneratorError("Rows, columns and pairs must be positive.")
+    if pairs * MIN_WALK > rows * cols:
+        raise GeneratorError(f"{pairs} pairs do not fit on a {rows} x {cols} board.")
+
+
+def _walk(rng, rows, cols, taken, length):
+    start = rng.randrange(rows * cols)
+    if taken[start]:
+        return None
+    walk = [start]
+    taken[start] = 1
+    while len(walk) < length:
+        i = walk[-1]
+        r, c = divmod(i, cols)
+        options = [
+            j for j, ok in ((i - cols, r > 0), (i + cols, r < rows - 1), (i - 1, c > 0), (i + 1, c < cols - 1))
+            if ok and not taken[j]
+        ]
+        if not options:
+            break
+        walk.append(rng.choice(options))
+        taken[walk[-1]] = 1
+    a, b = walk[0], walk[-1]
+    if len(walk) < MIN_WALK or abs(a // cols - b // cols) + abs(a % cols - b % cols) < 2:
+        for i in walk:
+            taken[i] = 0
+        return None
+    return walk
+
+
+def generate_layout(rows, cols, pairs, rng):
+    """[(color, (row, col), (row, col))] for one solvable board, in the form planer.solver takes."""
+    check_size(rows, cols, pairs)
+    # Longer walks fill more of the board, but leave less room for later ones
+    longest = max(MIN_WALK, 2 * rows * cols // pairs)
+    for _ in range(ATTEMPTS):
+        taken = bytearray(rows * cols)
+        walks = []
+        for _ in range(pairs * 20):
+            walk = _walk(rng, rows, cols, taken, rng.randint(MIN_WALK, longest))
+            if walk is not None:
+                walks.append(walk)
+                if len(walks) == pairs:
+                    return [(color(k), divmod(w[0], cols), divmod(w[-1], cols)) for k, w in enumerate(walks)]
+    raise GeneratorError(f"Could not place {pairs} pairs on a {rows} x {cols} board.")
+
+
+def _task(rows, cols, pairs, seed, count):
+    rng = random.Random(seed)
+    return [generate_layout(rows, cols, pairs, rng) for _ in range(count)]
+
+
+def generate_layouts(rows, cols, pairs, count, seed=None, workers=1):
+    """
+    Yield `count` layouts. With workers > 1 they are made in a process pool,
+    TASK_SIZE per task; the seed makes the output repeatable for a given
+    seed regardless of the number of workers.
+    """
+    check_size(rows, cols, pairs)
+    base = random.randrange(2**32) if seed is None else seed
+    sizes = [min(TASK_SIZE, count - start) for start in range(0, count, TASK_SIZE)]
+    args = [(rows, cols, pairs, base * 1000003 + k, size) for k, size in enumerate(sizes)]
+    if workers <= 1:
+        for task in args:
+            yield from _task(*task)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for layouts in executor.map(_task, *zip(*args)):
+            yield from layouts
+
+
+def create_boards(user, rows, cols, layouts, name=None):
+    """Store layouts as the user's GameBoards with their Dots; returns the new board ids."""
+    name = name or f"Losowa {rows}x{cols}"
+    ids = []
+    layouts = iter(layouts)
+    for batch in iter(lambda: list(islice(layouts, BATCH_SIZE)), []):
+        with transaction.atomic():
+            boards = GameBoard.objects.bulk_create([
+                GameBoard(user=user, name=f"{name} #{len(ids) + k + 1}", rows=rows, cols=cols)
+                for k in range(len(batch))
+            ])
+            Dot.objects.bulk_create(
+                [
+                    Dot(board=board, row=row, col=col, color=pair_color)
+                    for board, layout in zip(boards, batch)
+                    for pair_color, a, b in layout
+                    for row, col in (a, b)
+                ],
+                batch_size=BATCH_SIZE * 2,
+            )
+        ids += [board.pk for board in boards]
+    return ids
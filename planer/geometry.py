@@ -0,0 +1,151 @@
+"""
+Route geometry analytics on NumPy arrays.
+
+A route's points are taken from the packed copy (planer.packing) as one
+contiguous (n, 2) float64 array, so nothing here builds Point objects:
+length and segment statistics, Douglas-Peucker simplification and uniform
+resampling along the route.
+
+Simplified geometry is kept in Django's cache under the route's revision,
+which planer.packing bumps in the database whenever the route's points
+change, so every process sees the same keys.
+"""
+import math
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Route
+from .packing import route_coords
+
+MAX_RESAMPLE = 100000
+# Routes with more points than this are simplified before edit_and_view_route draws them
+RENDER_MIN_POINTS = getattr(settings, 'PLANER_RENDER_MIN_POINTS', 2000)
+RENDER_TOLERANCE = getattr(settings, 'PLANER_RENDER_TOLERANCE', 0.05)
+# simplify() measures runs up to this many points in plain Python
+SHORT_RUN = 64
+
+
+def route_array(route_id):
+    """The route's points as an (n, 2) float64 array, in point order."""
+    return np.frombuffer(route_coords(route_id), dtype=np.float64).reshape(-1, 2)
+
+
+def segment_lengths(points):
+    return np.hypot(*np.diff(points, axis=0).T)
+
+
+def stats(points):
+    """Point and segment counts, total length, segment length statistics and bounding box."""
+    lengths = segment_lengths(points)
+    result = {
+        'points': len(points),
+        'segments': len(lengths),
+        'length': float(lengths.sum()),
+        'segment': None,
+        'bbox': None,
+    }
+    if len(lengths):
+        result['segment'] = {
+            'min': float(lengths.min()),
+            'max': float(lengths.max()),
+            'mean': float(lengths.mean()),
+            'median': float(np.median(lengths)),
+            'std': float(lengths.std()),
+        }
+    if len(points):
+        result['bbox'] = [*map(float, points.min(axis=0)), *map(float, points.max(axis=0))]
+    return result
+
+
+def _farthest(coords, start, end):
+    """simplify() helper for short runs, where NumPy's per-call overhead dominates."""
+    ax, ay = coords[start]
+    bx, by = coords[end]
+    dx, dy = bx - ax, by - ay
+    norm = math.hypot(dx, dy)
+    best, best_i = -1.0, start
+    for i in range(start + 1, end):
+        px, py = coords[i]
+        if norm == 0:
+            d = math.hypot(px - ax, py - ay)
+        else:
+            d = abs(dx * (py - ay) - dy * (px - ax)) / norm
+        if d > best:
+            best, best_i = d, i
+    return best_i, best
+
+
+def simplify(points, tolerance):
+    """
+    Douglas-Peucker: drop every point closer than `tolerance` to the chord of
+    the run it lies in. The ends are always kept. Long runs get their distances
+    in one vectorized pass; runs are processed from an explicit stack, so long
+    routes cannot hit the recursion limit.
+    """
+    n = len(points)
+    if n < 3:
+        return points.copy()
+    coords = points.tolist()
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        if end - start <= SHORT_RUN:
+            split, distance = _farthest(coords, start, end)
+        else:
+            a, b = points[start], points[end]
+            inner = points[start + 1:end]
+            chord = b - a
+            norm = np.hypot(*chord)
+            if norm == 0:
+                distances = np.hypot(*(inner - a).T)
+            else:
+                distances = np.abs(chord[0] * (inner[:, 1] - a[1]) - chord[1] * (inner[:, 0] - a[0])) / norm
+            i = int(distances.argmax())
+            split, distance = start + 1 + i, distances[i]
+        if distance > tolerance:
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return points[keep]
+
+
+def resample(points, count):
+    """`count` points spaced evenly along the route, from its first point to its last."""
+    if not len(points) or count < 1:
+        return np.empty((0, 2))
+    if len(points) == 1:
+        return np.repeat(points, count, axis=0)
+    distance = np.concatenate(([0.0], np.cumsum(segment_lengths(points))))
+    targets = np.linspace(0.0, distance[-1], count)
+    return np.column_stack((np.interp(targets, distance, points[:, 0]), np.interp(targets, distance, points[:, 1])))
+
+
+def simplified_route(route_id, tolerance, revision=None):
+    """
+    simplify() of the route, served from the cache while the route's revision
+    is unchanged. Pass the revision if the Route was just loaded; it must be
+    read before the points, so an entry is never older than its key.
+    """
+    if revision is None:
+        revision = Route.objects.filter(pk=route_id).values_list('revision', flat=True).first()
+    key = f'planer:simplified:{route_id}:{revision}:{tolerance!r}'
+    data = cache.get(key)
+    if data is not None:
+        return np.frombuffer(data, dtype='<f8').reshape(-1, 2)
+    points = simplify(route_array(route_id), tolerance)
+    cache.set(key, points.astype('<f8').tobytes(), timeout=None)
+    return points
+
+
+def render_coords(route):
+    """[[x, y], ...] for drawing a just-loaded Route; large routes are simplified first."""
+    points = route_array(route.pk)
+    if len(points) > RENDER_MIN_POINTS:
+        points = simplified_route(route.pk, RENDER_TOLERANCE, route.revision)
+    return points.tolist()
@@ -0,0 +1,202 @@
+"""
+Thumbnails and a zoomable tile pyramid for BackgroundImage.
+
+Saving a BackgroundImage queues process_background() on a small worker pool
+once the transaction commits, so uploads return without waiting for Pillow.
+The worker hashes the original and writes everything derived from it under
+PLANER_DERIVED_ROOT/<sha256>/:
+
+    manifest.json           size, tile size, level count, format
+    thumb-<name>.<ext>      one per PLANER_THUMBNAIL_SIZES entry, fitted in a square
+    tiles/<z>/<x>_<y>.<ext> level z is the image scaled by 2 ** (z - top level),
+                            so level 0 fits in one tile and the top level is full size
+
+The directory is built aside and renamed into place with the manifest already
+in it, so a directory that exists is complete. Identical uploads share it.
+Derived files never change under their hash, which is what lets
+views.background_file serve them as immutable.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.urls import reverse
+from PIL import Image
+
+from .models import BackgroundImage
+
+logger = logging.getLogger(__name__)
+
+TILE_SIZE = getattr(settings, 'PLANER_TILE_SIZE', 256)
+THUMBNAIL_SIZES = getattr(settings, 'PLANER_THUMBNAIL_SIZES', {'small': 160, 'medium': 640})
+JPEG_QUALITY = 85
+MANIFEST = 'manifest.json'
+
+
+def derived_root():
+    return Path(getattr(settings, 'PLANER_DERIVED_ROOT', Path(settings.MEDIA_ROOT) / 'derived'))
+
+
+def file_hash(field_file):
+    digest = hashlib.sha256()
+    with field_file.open('rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _prepare(image):
+    """The image in a mode the output format takes, and that format."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        return image.convert('RGBA'), 'png'
+    return image.convert('RGB'), 'jpg'
+
+
+def _save(image, path, ext):
+    if ext == 'jpg':
+        image.save(path, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+    else:
+        image.save(path, 'PNG', optimize=True)
+
+
+def tile_levels(width, height, tile_size=TILE_SIZE):
+    """Pyramid depth: halve until the image fits in one tile."""
+    return max(0, math.ceil(math.log2(max(width, height, 1) / tile_size))) + 1
+
+
+def build_derivatives(source, target):
+    """Write thumbnails, tiles and the manifest for the image file `source` into directory `target`."""
+    with Image.open(source) as original:
+        original.load()
+        image, ext = _prepare(original)
+    width, height = image.size
+    levels = tile_levels(width, height)
+
+    thumbnails = {}
+    for name, size in THUMBNAIL_SIZES.items():
+        thumb = image.copy()
+        thumb.thumbnail((size, size), Image.Resampling.LANCZOS)
+        _save(thumb, target / f'thumb-{name}.{ext}', ext)
+        thumbnails[name] = [*thumb.size]
+
+    # Top level down, each level a 2x box reduction of the one above
+    level = image
+    for z in range(levels - 1, -1, -1):
+        directory = target / 'tiles' / str(z)
+        directory.mkdir(parents=True)
+        w, h = level.size
+        for x in range(math.ceil(w / TILE_SIZE)):
+            for y in range(math.ceil(h / TILE_SIZE)):
+                box = (x * TILE_SIZE, y * TILE_SIZE, min(w, (x + 1) * TILE_SIZE), min(h, (y + 1) * TILE_SIZE))
+                _save(level.crop(box), directory / f'{x}_{y}.{ext}', ext)
+        if z:
+            level = level.resize((math.ceil(w / 2), math.ceil(h / 2)), Image.Resampling.BOX)
+
+    manifest = {
+        'width': width,
+        'height': height,
+        'tile_size': TILE_SIZE,
+        'levels': levels,
+        'format': ext,
+        'thumbnails': thumbnails,
+    }
+    (target / MANIFEST).write_text(json.dumps(manifest))
+    return manifest
+
+
+def ensure_derivatives(field_file):
+    """(content hash, manifest) for the file, building the derived files unless they exist."""
+    digest = file_hash(field_file)
+    root = derived_root()
+    target = root / digest
+    if (target / MANIFEST).exists():
+        return digest, json.loads((target / MANIFEST).read_text())
+
+    root.mkdir(parents=True, exist_ok=True)
+    scratch = root / f'.tmp-{digest}-{uuid.uuid4().hex}'
+    scratch.mkdir()
+    try:
+        with field_file.open('rb') as source:
+            manifest = build_derivatives(source, scratch)
+        try:
+            os.rename(scratch, target)
+        except OSError:
+            if not (target / MANIFEST).exists():
+                raise
+            # Another worker finished the same content first
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return digest, manifest
+
+
+def process_background(image_id):
+    """Build (or reuse) the derived files of one BackgroundImage and record them on the row."""
+    background = BackgroundImage.objects.filter(id=image_id).first()
+    if background is None or not background.image:
+        return None
+    name = background.image.name
+    if not background.image.storage.exists(name):
+        logger.warning("Background %s has no file %s", image_id, name)
+        return None
+    digest, manifest = ensure_derivatives(background.image)
+    # Only if the image was not replaced meanwhile; that save queued its own run
+    BackgroundImage.objects.filter(id=image_id, image=name).update(
+        content_hash=digest,
+        width=manifest['width'],
+        height=manifest['height'],
+        tile_levels=manifest['levels'],
+        derived_format=manifest['format'],
+    )
+    return digest
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _run(image_id):
+    close_old_connections()
+    try:
+        process_background(image_id)
+    except Exception:
+        logger.exception("Building derived images for background %s failed", image_id)
+    finally:
+        connection.close()
+
+
+def submit(image_id):
+    """Queue process_background() on the worker pool; PLANER_IMAGE_WORKERS = 0 runs it inline."""
+    global _executor
+    workers = getattr(settings, 'PLANER_IMAGE_WORKERS', 2)
+    if not workers:
+        return process_background(image_id)
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='planer-imaging')
+    return _executor.submit(_run, image_id)
+
+
+def schedule(background):
+    """Process the image after the surrounding transaction commits."""
+    transaction.on_commit(lambda: submit(background.id))
+
+
+def derived_url(digest, name, request=None):
+    url = reverse('background_file', args=[digest, name])
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def tile_url_template(digest, ext, request=None):
+    """URL with {z}, {x} and {y} placeholders, as map viewers expect."""
+    base = derived_url(digest, MANIFEST, request)[:-len(MANIFEST)]
+    return f'{base}tiles/{{z}}/{{x}}_{{y}}.{ext}'
@@ -0,0 +1,56 @@
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Max
+
+from .models import SEQ_GAP, Point
+from .packing import invalidate_route_geometry
+from .serializers import PointSerializer
+
+CHUNK_SIZE = 1000
+
+
+def ingest_points(route, items, chunk_size=CHUNK_SIZE):
+    """
+    Validate and insert an iterable of {"x", "y"} dicts as points of `route`.
+
+    Items are consumed lazily in chunks, so an NDJSON stream never has to be held
+    in memory. Each chunk is validated with PointSerializer(many=True) and
+    bulk-inserted; everything runs in one transaction and is rolled back if any
+    chunk is invalid. Returns a report: {"created": n, "errors": [...]} where each
+    error entry names the chunk and the offending items by absolute index.
+    """
+    items = iter(items)
+    created = 0
+    errors = []
+    with transaction.atomic():
+        # New points go after the route's current last one, in item order
+        last = Point.objects.filter(route=route).aggregate(last=Max('seq'))['last'] or 0
+        for chunk_index, chunk in enumerate(iter(lambda: list(islice(items, chunk_size)), [])):
+            offset = chunk_index * chunk_size
+            serializer = PointSerializer(data=chunk, many=True)
+            if not serializer.is_valid():
+                errors.append({
+                    'chunk': chunk_index,
+                    'items': [
+                        {'index': offset + i, 'errors': item_errors}
+                        for i, item_errors in enumerate(serializer.errors) if item_errors
+                    ],
+                })
+            if errors:
+                # Keep validating the rest for a complete report, but stop writing.
+                continue
+            Point.objects.bulk_create(
+                [
+                    Point(route=route, seq=last + SEQ_GAP * (created + i + 1), **data)
+                    for i, data in enumerate(serializer.validated_data)
+                ],
+                batch_size=chunk_size,
+            )
+            created += len(chunk)
+        if errors:
+            transaction.set_rollback(True)
+            created = 0
+        elif created:
+            invalidate_route_geometry(route.pk)
+    return {'created': created, 'errors': errors}
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from planer import geometry
+from planer.models import Route
+
+
+class Command(BaseCommand):
+    help = "Print length and segment statistics of every route; optionally precompute simplified geometry."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only routes of this username.")
+        parser.add_argument('--simplify', type=float, metavar='TOLERANCE',
+                            help="Also simplify each route with this tolerance and store the result in the cache.")
+
+    def handle(self, *args, **options):
+        routes = Route.objects.order_by('id')
+        if options['user']:
+            routes = routes.filter(user__username=options['user'])
+        total_points = total_length = 0
+        count = 0
+        for route_id, name in routes.values_list('id', 'name').iterator():
+            points = geometry.route_array(route_id)
+            stats = geometry.stats(points)
+            line = (f"{route_id:>6} {name[:30]:<30} {stats['points']:>8} points "
+                    f"length {stats['length']:12.2f}")
+            if stats['segment']:
+                line += f"  segment mean {stats['segment']['mean']:.3f} max {stats['segment']['max']:.3f}"
+            if options['simplify'] is not None:
+                simplified = geometry.simplified_route(route_id, options['simplify'])
+                line += f"  -> {len(simplified)} points"
+            self.stdout.write(line)
+            total_points += stats['points']
+            total_length += stats['length']
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"{count} routes, {total_points} points, total length {total_length:.2f}"))
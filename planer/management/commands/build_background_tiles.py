@@ -0,0 +1,40 @@
+import shutil
+
+from django.core.management.base import BaseCommand
+
+from planer.imaging import derived_root, process_background
+from planer.models import BackgroundImage
+
+
+class Command(BaseCommand):
+    help = "Build thumbnails and tile pyramids for background images, e.g. those uploaded before the pipeline existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Recheck every image, not only unprocessed ones.")
+        parser.add_argument('--prune', action='store_true',
+                            help="Delete derived directories no background image refers to.")
+
+    def handle(self, *args, **options):
+        queryset = BackgroundImage.objects.order_by('id')
+        if not options['all']:
+            queryset = queryset.filter(tile_levels__isnull=True)
+        built = 0
+        for image_id, name in queryset.values_list('id', 'name'):
+            digest = process_background(image_id)
+            if digest is None:
+                self.stderr.write(f"Background {image_id} ({name!r}): no image file, skipped.")
+            else:
+                built += 1
+                self.stdout.write(f"Background {image_id} ({name!r}): {digest}")
+        self.stdout.write(self.style.SUCCESS(f"{built} background images processed."))
+
+        if options['prune']:
+            root = derived_root()
+            used = set(BackgroundImage.objects.exclude(content_hash='').values_list('content_hash', flat=True))
+            removed = 0
+            for directory in (root.iterdir() if root.is_dir() else ()):
+                # .tmp-* directories belong to builds still running
+                if directory.is_dir() and directory.name not in used and not directory.name.startswith('.tmp-'):
+                    shutil.rmtree(directory)
+                    removed += 1
+            self.stdout.write(f"Removed {removed} unused derived directories.")
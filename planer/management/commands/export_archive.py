@@ -0,0 +1,36 @@
+import gzip
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from planer.archive import export_archive
+
+
+class Command(BaseCommand):
+    help = "Write a user's boards, paths and routes to an NDJSON archive (gzipped for *.gz names)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help="Archive file to write, or - for standard output.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user {options['username']!r}.")
+        path = options['path']
+        if path == '-':
+            out = sys.stdout.buffer
+        else:
+            out = gzip.open(path, 'wb', compresslevel=6) if path.endswith('.gz') else open(path, 'wb')
+        size = 0
+        try:
+            for chunk in export_archive(user):
+                out.write(chunk)
+                size += len(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+        if path != '-':
+            self.stdout.write(self.style.SUCCESS(f"Wrote {size} bytes of archive to {path}."))
@@ -0,0 +1,41 @@
+import os
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from planer.generator import GeneratorError, create_boards, generate_layouts
+
+
+class Command(BaseCommand):
+    help = "Generate random solvable boards for a user, laying them out on a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--rows', type=int, default=7)
+        parser.add_argument('--cols', type=int, default=7)
+        parser.add_argument('--pairs', type=int, default=5)
+        parser.add_argument('--count', type=int, default=100)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Generator processes; 1 generates in this process.")
+        parser.add_argument('--seed', type=int, help="Repeatable output for the same seed and sizes.")
+        parser.add_argument('--name', help="Board name prefix.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user {options['username']!r}.")
+        rows, cols = options['rows'], options['cols']
+        start = time.perf_counter()
+        try:
+            layouts = generate_layouts(rows, cols, options['pairs'], options['count'],
+                                       seed=options['seed'], workers=options['workers'])
+            ids = create_boards(user, rows, cols, layouts, name=options['name'])
+        except GeneratorError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(ids)} {rows}x{cols} boards with {options['pairs']} pairs "
+            f"in {elapsed:.2f} s ({len(ids) / elapsed:.0f} boards/s, {options['workers']} workers)."
+        ))
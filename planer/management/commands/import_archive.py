@@ -0,0 +1,50 @@
+import gzip
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from planer.archive import BATCH_SIZE, ArchiveError, import_archive, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Import an archive written by export_archive for a user. Run it again after an "
+        "interruption to continue where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help="Archive file (*.gz is gunzipped), or - for standard input.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Records per transaction.")
+        parser.add_argument('--restart', action='store_true',
+                            help="Import from the start even if this archive was (partly) imported before.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user {options['username']!r}.")
+        path = options['path']
+        if path == '-':
+            source = sys.stdin.buffer
+        else:
+            source = gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+        try:
+            report = import_archive(user, read_records(source), options['batch_size'], restart=options['restart'])
+        except ArchiveError as e:
+            raise CommandError(str(e))
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+
+        counts = ', '.join(f"{n} {name}" for name, n in report['counts'].items())
+        if report['complete'] and report['resumed_from'] == report['position']:
+            self.stdout.write(f"Archive {report['archive']} was already imported ({counts}).")
+            return
+        if report['resumed_from']:
+            self.stdout.write(f"Resumed after record {report['resumed_from']}.")
+        if not report['complete']:
+            raise CommandError(f"Archive ended early at record {report['position']} ({counts}); "
+                               "run the import again with the complete file to finish it.")
+        self.stdout.write(self.style.SUCCESS(f"Imported archive {report['archive']}: {counts}."))
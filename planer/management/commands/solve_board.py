@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from planer.models import GameBoard, UserPath
+from planer.solver import DEFAULT_NODE_LIMIT, SolverError, solve_board
+
+
+class Command(BaseCommand):
+    help = "Find non-crossing paths connecting every dot pair of a board."
+
+    def add_arguments(self, parser):
+        parser.add_argument('board_id', type=int)
+        parser.add_argument('--fill', action='store_true', help="Require the paths to cover every cell.")
+        parser.add_argument('--node-limit', type=int, default=DEFAULT_NODE_LIMIT)
+        parser.add_argument('--save-as', metavar='NAME', help="Store the solution as a path of the board's owner.")
+
+    def handle(self, *args, **options):
+        try:
+            board = GameBoard.objects.get(pk=options['board_id'])
+        except GameBoard.DoesNotExist:
+            raise CommandError(f"Board {options['board_id']} does not exist.")
+        start = time.perf_counter()
+        try:
+            solution = solve_board(board, fill=options['fill'], node_limit=options['node_limit'])
+        except SolverError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"{board.name} ({board.rows} x {board.cols}): {solution.status} "
+                          f"in {elapsed:.3f}s, {solution.nodes} search nodes")
+        if not solution.solved:
+            return
+        labels = {color: chr(ord('A') + i % 26) for i, color in enumerate(solution.paths)}
+        grid = [['.'] * board.cols for _ in range(board.rows)]
+        for color, cells in solution.paths.items():
+            for row, col in cells:
+                grid[row][col] = labels[color]
+        self.stdout.write('\n'.join(''.join(line) for line in grid))
+        for color, label in labels.items():
+            self.stdout.write(f"  {label} = {color}")
+        if options['save_as']:
+            user_path = UserPath.objects.create(
+                board=board, user=board.user, path=solution.as_user_path(), name=options['save_as'],
+            )
+            self.stdout.write(self.style.SUCCESS(f"Saved as path {user_path.id}."))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from planer.models import UserPath
+from planer.validation import validate_stored_paths
+
+
+class Command(BaseCommand):
+    help = "Check stored user paths against their boards' dots and report every invalid one."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--board', type=int, help="Only check paths drawn on this board.")
+
+    def handle(self, *args, **options):
+        queryset = UserPath.objects.all()
+        if options['board'] is not None:
+            queryset = queryset.filter(board_id=options['board'])
+        invalid = 0
+        for user_path, errors in validate_stored_paths(queryset):
+            invalid += 1
+            self.stdout.write(f"Path {user_path.id} ({user_path.name!r}) on board {user_path.board_id}:")
+            for error in errors:
+                self.stdout.write(f"  #{error['index']} [{error['code']}] {error['message']}")
+        total = queryset.count()
+        if invalid:
+            raise CommandError(f"{invalid} of {total} paths are invalid.")
+        self.stdout.write(self.style.SUCCESS(f"All {total} paths are valid."))
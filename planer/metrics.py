@@ -0,0 +1,241 @@
+"""
+Opt-in request instrumentation for the planer views.
+
+MetricsMiddleware, enabled with PLANER_METRICS['ENABLED'], counts every
+request and records its latency and response size per URL name. A sampled
+share of requests (SAMPLE_RATE) also has its database queries recorded
+through an execute wrapper on each connection: how many there were, how long
+they took, and which statements ran DUPLICATE_QUERY_THRESHOLD or more times
+with the same SQL, the usual sign of an N+1 loop. Those are counted and
+logged. Sampled responses carry a Server-Timing header with the app and db
+time, which shows up in the browser's network panel.
+
+Totals are kept per process and served in the Prometheus text format by
+metrics_view, along with the board cache's counters; with several workers
+each reports its own. For streaming responses the latency is the time to the
+first byte, and the queries made while streaming are not counted. Under ASGI
+the views' queries run on other threads than the middleware, so only
+requests, latency and sizes are recorded there.
+
+metrics_view serves staff users, and scrapers that send TOKEN as a bearer
+token; the client address is not trusted, since behind a reverse proxy every
+request comes from the proxy.
+"""
+import logging
+import random
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from .board_cache import board_cache
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+DEFAULTS = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.1,
+    'DUPLICATE_QUERY_THRESHOLD': 5,
+    'SERVER_TIMING': True,
+    'TOKEN': None,
+}
+
+
+def metrics_settings():
+    return {**DEFAULTS, **getattr(settings, 'PLANER_METRICS', {})}
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense; one slot past the last bucket for +Inf."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        """(le, cumulative count) pairs, ending with +Inf."""
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            yield bound, total
+
+
+class Registry:
+    """Per-process totals, labelled by view name; thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.requests = defaultdict(int)  # (view, method, status) -> count
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.sizes = defaultdict(lambda: Histogram(SIZE_BUCKETS))
+        self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))  # sampled requests only
+        self.query_seconds = defaultdict(float)
+        self.duplicates = defaultdict(int)
+
+    def record(self, view, method, status, seconds, size=None, recorder=None):
+        with self._lock:
+            self.requests[(view, method, status)] += 1
+            self.latency[view].observe(seconds)
+            if size is not None:
+                self.sizes[view].observe(size)
+            if recorder is not None:
+                self.queries[view].observe(recorder.count)
+                self.query_seconds[view] += recorder.seconds
+                self.duplicates[view] += len(recorder.duplicates)
+
+    def render(self):
+        """The totals in the Prometheus text exposition format."""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def histogram(name, histograms):
+            for view, hist in sorted(histograms.items()):
+                for bound, total in hist.samples():
+                    lines.append(f'{name}_bucket{{view="{_escape(view)}",le="{bound}"}} {total}')
+                lines.append(f'{name}_sum{{view="{_escape(view)}"}} {hist.sum}')
+                lines.append(f'{name}_count{{view="{_escape(view)}"}} {hist.count}')
+
+        with self._lock:
+            family('planer_requests_total', 'counter', 'Requests by view, method and status.')
+            for (view, method, status), count in sorted(self.requests.items()):
+                lines.append(
+                    f'planer_requests_total{{view="{_escape(view)}",method="{method}",status="{status}"}} {count}'
+                )
+            family('planer_request_duration_seconds', 'histogram', 'Time to the response, by view.')
+            histogram('planer_request_duration_seconds', self.latency)
+            family('planer_response_size_bytes', 'histogram', 'Size of non-streaming responses, by view.')
+            histogram('planer_response_size_bytes', self.sizes)
+            family('planer_db_queries', 'histogram', 'Database queries per sampled request, by view.')
+            histogram('planer_db_queries', self.queries)
+            family('planer_db_query_seconds_total', 'counter', 'Time spent in queries of sampled requests.')
+            for view, seconds in sorted(self.query_seconds.items()):
+                lines.append(f'planer_db_query_seconds_total{{view="{_escape(view)}"}} {seconds}')
+            family('planer_duplicate_queries_total', 'counter',
+                   'Statements repeated at least the duplicate threshold within one sampled request.')
+            for view, count in sorted(self.duplicates.items()):
+                lines.append(f'planer_duplicate_queries_total{{view="{_escape(view)}"}} {count}')
+
+        for key, value in board_cache.stats().items():
+            kind = 'gauge' if key in ('size', 'maxsize') else 'counter'
+            name = f'planer_board_cache_{key}' + ('_total' if kind == 'counter' else '')
+            family(name, kind, f'Board snapshot cache {key}.')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+class QueryRecorder:
+    """Execute wrapper counting the queries of one request, and how often each SQL statement ran."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1  # parameters are separate, so the SQL is already a template
+
+    @property
+    def duplicates(self):
+        return {sql: n for sql, n in self.statements.items() if n >= self.threshold}
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = metrics_settings()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config['SAMPLE_RATE']
+        self.threshold = config['DUPLICATE_QUERY_THRESHOLD']
+        self.server_timing = config['SERVER_TIMING']
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder(self.threshold) if random.random() < self.sample_rate else None
+        start = perf_counter()
+        if recorder is None:
+            response = self.get_response(request)
+        else:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(recorder))
+                response = self.get_response(request)
+        return self._record(request, response, perf_counter() - start, recorder)
+
+    async def __acall__(self, request):
+        start = perf_counter()
+        response = await self.get_response(request)
+        return self._record(request, response, perf_counter() - start, None)
+
+    def _record(self, request, response, elapsed, recorder):
+        match = request.resolver_match
+        view = match.view_name if match is not None else '<unresolved>'
+        size = None if response.streaming else len(response.content)
+        registry.record(view, request.method, response.status_code, elapsed, size, recorder)
+        if recorder is not None:
+            for sql, count in recorder.duplicates.items():
+                logger.warning("%s ran the same query %d times: %s", view, count, sql[:300])
+            if self.server_timing:
+                response['Server-Timing'] = (
+                    f'app;dur={(elapsed - recorder.seconds) * 1000:.1f}, '
+                    f'db;dur={recorder.seconds * 1000:.1f};desc="{recorder.count} queries"'
+                )
+        return response
+
+
+def _has_token(request, token):
+    scheme, _, value = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    return bool(token) and scheme.lower() == 'bearer' and constant_time_compare(value, token)
+
+
+def metrics_view(request):
+    config = metrics_settings()
+    if not config['ENABLED']:
+        raise Http404
+    if not (request.user.is_staff or _has_token(request, config['TOKEN'])):
+        raise PermissionDenied
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-18 08:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planer', '0005_alter_userpath_unique_together_userpath_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteGeometry',
+            fields=[
+                ('route', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='geometry', serialize=False, to='planer.route')),
+                ('points', models.BinaryField()),
+            ],
+        ),
+    ]
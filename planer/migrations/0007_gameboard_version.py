@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planer', '0006_routegeometry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameboard',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
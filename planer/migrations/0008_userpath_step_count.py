@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-18 09:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_step_count(apps, schema_editor):
+    UserPath = apps.get_model('planer', 'UserPath')
+    batch = []
+    for user_path in UserPath.objects.only('id', 'path').iterator(chunk_size=2000):
+        user_path.step_count = len(user_path.path) if isinstance(user_path.path, list) else 0
+        batch.append(user_path)
+        if len(batch) == 2000:
+            UserPath.objects.bulk_update(batch, ['step_count'])
+            batch = []
+    if batch:
+        UserPath.objects.bulk_update(batch, ['step_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planer', '0007_gameboard_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userpath',
+            name='step_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_step_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='userpath',
+            index=models.Index(fields=['user', 'created_at'], name='planer_path_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userpath',
+            index=models.Index(fields=['board', 'user'], name='planer_path_board_user_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+from django.db import migrations, models
+
+import planer.fields
+
+BATCH_SIZE = 1000
+
+
+def pack_paths(apps, schema_editor):
+    UserPath = apps.get_model('planer', 'UserPath')
+    batch = []
+    for user_path in UserPath.objects.only('id', 'path').iterator(chunk_size=BATCH_SIZE):
+        user_path.path_packed = user_path.path
+        batch.append(user_path)
+        if len(batch) == BATCH_SIZE:
+            UserPath.objects.bulk_update(batch, ['path_packed'])
+            batch = []
+    if batch:
+        UserPath.objects.bulk_update(batch, ['path_packed'])
+
+
+def unpack_paths(apps, schema_editor):
+    UserPath = apps.get_model('planer', 'UserPath')
+    batch = []
+    for user_path in UserPath.objects.only('id', 'path_packed').iterator(chunk_size=BATCH_SIZE):
+        user_path.path = user_path.path_packed
+        batch.append(user_path)
+        if len(batch) == BATCH_SIZE:
+            UserPath.objects.bulk_update(batch, ['path'])
+            batch = []
+    if batch:
+        UserPath.objects.bulk_update(batch, ['path'])
+
+
+class Migration(migrations.Migration):
+    """Move UserPath.path from JSON to PackedPathField: add a column, convert, swap names."""
+
+    dependencies = [
+        ('planer', '0008_userpath_step_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userpath',
+            name='path_packed',
+            field=planer.fields.PackedPathField(null=True),
+        ),
+        # Nullable, so that reversing can re-add the JSON column before unpacking into it
+        migrations.AlterField(
+            model_name='userpath',
+            name='path',
+            field=models.JSONField(null=True),
+        ),
+        migrations.RunPython(pack_paths, unpack_paths),
+        migrations.RemoveField(
+            model_name='userpath',
+            name='path',
+        ),
+        migrations.RenameField(
+            model_name='userpath',
+            old_name='path_packed',
+            new_name='path',
+        ),
+        migrations.AlterField(
+            model_name='userpath',
+            name='path',
+            field=planer.fields.PackedPathField(),
+        ),
+    ]
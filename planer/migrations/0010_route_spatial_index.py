@@ -0,0 +1,53 @@
+# Generated by Django 5.2 on 2026-10-18 09:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def drop_packed_geometry(apps, schema_editor):
+    # Existing copies have no bounding box or cells; they are rebuilt, indexed, on next read
+    apps.get_model('planer', 'RouteGeometry').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planer', '0009_userpath_packed_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='routegeometry',
+            name='max_x',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='routegeometry',
+            name='max_y',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='routegeometry',
+            name='min_x',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='routegeometry',
+            name='min_y',
+            field=models.FloatField(null=True),
+        ),
+        migrations.CreateModel(
+            name='RouteCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cx', models.IntegerField()),
+                ('cy', models.IntegerField()),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cells', to='planer.route')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cx', 'cy'], name='planer_routecell_cell_idx')],
+                'constraints': [models.UniqueConstraint(fields=('route', 'cx', 'cy'), name='planer_routecell_unique')],
+            },
+        ),
+        migrations.RunPython(drop_packed_geometry, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 09:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planer', '0011_backgroundimage_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameboard',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='route',
+            name='revision',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='route',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='userpath',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
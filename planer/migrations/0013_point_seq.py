@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-18 09:35
+
+from django.db import migrations, models
+from django.db.models import F
+
+SEQ_GAP = 1024
+
+
+def number_points(apps, schema_editor):
+    # Keep today's id order, with room between neighbours for inserts
+    Point = apps.get_model('planer', 'Point')
+    Point.objects.update(seq=F('id') * SEQ_GAP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planer', '0012_version_stamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='point',
+            name='seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(number_points, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='userpath',
+            name='revision',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='point',
+            index=models.Index(fields=['route', 'seq'], name='planer_point_route_seq_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planer', '0014_archive_import'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='routegeometry',
+            name='long_segments',
+            field=models.BooleanField(default=False),
+        ),
+    ]
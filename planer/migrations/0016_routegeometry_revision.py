@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 10:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planer', '0015_routegeometry_long_segments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='routegeometry',
+            name='revision',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 11:25
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planer', '0016_routegeometry_revision'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gameboard',
+            name='cols',
+            field=models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(250)]),
+        ),
+        migrations.AlterField(
+            model_name='gameboard',
+            name='rows',
+            field=models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(250)]),
+        ),
+    ]
@@ -1,29 +1,113 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+
+from .fields import PackedPathField
 from django.contrib.auth.models import User
 
 class BackgroundImage(models.Model):
     name = models.CharField(max_length=100)
     image = models.ImageField(upload_to='backgrounds/')
+    # Filled in by planer.imaging once the thumbnails and tile pyramid are built;
+    # derived files live under PLANER_DERIVED_ROOT/<content_hash>/
+    content_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    width = models.PositiveIntegerField(null=True, editable=False)
+    height = models.PositiveIntegerField(null=True, editable=False)
+    tile_levels = models.PositiveSmallIntegerField(null=True, editable=False)
+    derived_format = models.CharField(max_length=4, blank=True, default='', editable=False)  # jpg or png
 
     def __str__(self):
         return self.name
 
+def _save_without(instance, counter, kwargs):
+    """
+    Leave `counter` out of a full save of an existing row. It is only moved
+    with F() updates, so the value loaded with the instance may be stale.
+    """
+    if not instance._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+        kwargs['update_fields'] = [
+            f.name for f in instance._meta.concrete_fields if not f.primary_key and f.name != counter
+        ]
+    return kwargs
+
 class Route(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     background = models.ForeignKey(BackgroundImage, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
+    # Bumped whenever the route's points or pairs change (see packing.invalidate_route_geometry);
+    # with updated_at it stamps the route for ETags and cached responses
+    revision = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **_save_without(self, 'revision', kwargs))
 
     def __str__(self):
         return self.name
 
+# Spacing of Point.seq values, leaving room to insert points between neighbours (see planer.deltas)
+SEQ_GAP = 1024
+
 class Point(models.Model):
     route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name='points')
     x = models.FloatField()
     y = models.FloatField()
+    # Position in the route: points are ordered by (seq, id). A new point saved
+    # with seq 0 goes after the route's last one; bulk writers assign seq themselves.
+    seq = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['route', 'seq'], name='planer_point_route_seq_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.seq:
+            last = Point.objects.filter(route_id=self.route_id).aggregate(last=models.Max('seq'))['last']
+            self.seq = (last or 0) + SEQ_GAP
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Point ({self.x}, {self.y})"
 
+class RouteGeometry(models.Model):
+    # Packed copy of a route's points as little-endian float64 x,y pairs in point order.
+    # Kept in a side table so Route queries never drag the blob along; a missing row,
+    # or one of another revision, means the copy is stale and is rebuilt on the next
+    # read (see planer.packing).
+    route = models.OneToOneField(Route, on_delete=models.CASCADE, primary_key=True, related_name='geometry')
+    points = models.BinaryField()
+    # Route.revision the copy was built from
+    revision = models.PositiveIntegerField(default=0)
+    # Bounding box of the points and pairs, built together with the RouteCell rows;
+    # null while the route has neither
+    min_x = models.FloatField(null=True)
+    min_y = models.FloatField(null=True)
+    max_x = models.FloatField(null=True)
+    max_y = models.FloatField(null=True)
+    # Some segment crosses too many cells to be stored as RouteCell rows (see planer.spatial)
+    long_segments = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"Geometry of {self.route_id} ({len(self.points) // 16} points)"
+
+class RouteCell(models.Model):
+    # Grid-hash entry: a segment of the route (between consecutive points, or a Pair)
+    # crosses grid cell (cx, cy). Rebuilt with RouteGeometry; see planer.spatial.
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name='cells')
+    cx = models.IntegerField()
+    cy = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['route', 'cx', 'cy'], name='planer_routecell_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['cx', 'cy'], name='planer_routecell_cell_idx'),
+        ]
+
+    def __str__(self):
+        return f"Cell ({self.cx}, {self.cy}) of {self.route_id}"
+
 class Pair(models.Model):
     route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name='pairs')
     x1 = models.FloatField()
@@ -34,11 +118,21 @@ class Pair(models.Model):
     def __str__(self):
         return f"Pair (({self.x1}, {self.y1}), ({self.x2}, {self.y2}))"
 
+# Largest number of rows or columns; validation and the grid layout build arrays of rows x cols
+MAX_BOARD_SIDE = 250
+
 class GameBoard(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
-    rows = models.PositiveIntegerField()
-    cols = models.PositiveIntegerField()
+    rows = models.PositiveIntegerField(validators=[MinValueValidator(1), MaxValueValidator(MAX_BOARD_SIDE)])
+    cols = models.PositiveIntegerField(validators=[MinValueValidator(1), MaxValueValidator(MAX_BOARD_SIDE)])
+    # Bumped whenever the board's dots change; keys the cached snapshot in board_cache
+    version = models.PositiveIntegerField(default=0, editable=False)
+    # Touched by saves and by mark_dirty(), so board pages can be revalidated with an ETag
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **_save_without(self, 'version', kwargs))
 
     def __str__(self):
         return self.name
@@ -55,13 +149,59 @@ class Dot(models.Model):
 class UserPath(models.Model):
     board = models.ForeignKey(GameBoard, on_delete=models.CASCADE, related_name='paths')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    path = models.JSONField()  # List of {"row": int, "col": int}
+    path = PackedPathField()  # List of {"row", "col", "color", "route"}, stored packed (see fields.py)
     name = models.CharField(max_length=100, default="")
     created_at = models.DateTimeField(auto_now_add=True)
+    # len(path), so listings can show it without loading the path itself
+    step_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Bumped on every change of path, for the expected-revision check of planer.deltas
+    revision = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         # Remove unique_together so user can have many paths per board
-        pass
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='planer_path_user_created_idx'),
+            models.Index(fields=['board', 'user'], name='planer_path_board_user_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.step_count = len(self.path) if isinstance(self.path, list) else 0
+        kwargs = _save_without(self, 'revision', kwargs)
+        update_fields = kwargs.get('update_fields')
+        bump = update_fields is not None and 'path' in update_fields
+        if update_fields is not None:
+            # Any partial save still moves updated_at, which stamps the path for ETags
+            update_fields = {*update_fields, 'updated_at'}
+            if bump:
+                update_fields |= {'step_count', 'revision'}
+            kwargs['update_fields'] = update_fields
+        if bump:
+            # Counted in the database, so a stale instance can't reuse a revision a delta already took
+            self.revision = models.F('revision') + 1
+        super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(fields=['revision'])
+
+    def __str__(self):
+        return f"Path '{self.name}' for {self.user.username} on {self.board.name}"
+
+class ArchiveImport(models.Model):
+    # Progress of importing one archive for one user (see planer.archive): records
+    # up to `position` are in the database, with the ids they were given in `id_map`.
+    # Saved in the same transaction as each batch, so an interrupted import resumes exactly.
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    archive_id = models.CharField(max_length=36)
+    position = models.PositiveBigIntegerField(default=0)
+    id_map = models.JSONField(default=dict)
+    counts = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'archive_id'], name='planer_archiveimport_unique'),
+        ]
 
     def __str__(self):
-        return f"Path '{self.name}' for {self.user.username} on {self.board.name}"
\ No newline at end of file
+        return f"Import of {self.archive_id} for {self.user.username}"
@@ -0,0 +1,121 @@
+import logging
+import sys
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Point, Route, RouteGeometry
+from .spatial import index_route
+
+logger = logging.getLogger(__name__)
+
+_BIG_ENDIAN = sys.byteorder == 'big'
+
+
+def pack_coords(coords):
+    """Pack a flat [x0, y0, x1, y1, ...] sequence into little-endian float64 bytes."""
+    data = coords if isinstance(coords, array) and coords.typecode == 'd' else array('d', coords)
+    if _BIG_ENDIAN:
+        data = array('d', data)
+        data.byteswap()
+    return data.tobytes()
+
+
+def unpack_coords(data):
+    """Decode packed bytes into a flat array('d') without touching the ORM."""
+    coords = array('d')
+    coords.frombytes(data)
+    if _BIG_ENDIAN:
+        coords.byteswap()
+    return coords
+
+
+def route_coords(route_id):
+    """
+    Return the route's points as a flat array('d') of x,y pairs in point order.
+
+    Served from RouteGeometry when it was built from the route's current
+    revision; otherwise rebuilt from the Point rows with a single
+    values_list() query and stored for the next read, together with the
+    route's spatial index. The revision is read before the points, so a copy
+    built while a change was still uncommitted is stored under the revision
+    it predates and is never served once that change commits.
+    """
+    data = RouteGeometry.objects.filter(
+        route_id=route_id, revision=F('route__revision'),
+    ).values_list('points', flat=True).first()
+    if data is not None:
+        return unpack_coords(data)
+    revision = Route.objects.filter(id=route_id).values_list('revision', flat=True).first()
+    coords = array('d')
+    for x, y in Point.objects.filter(route_id=route_id).order_by('seq', 'id').values_list('x', 'y').iterator(chunk_size=10000):
+        coords.append(x)
+        coords.append(y)
+    if revision is None:
+        return coords  # the route is gone
+    try:
+        with transaction.atomic():
+            RouteGeometry.objects.filter(route_id=route_id).exclude(revision=revision).delete()
+            geometry = RouteGeometry(route_id=route_id, points=pack_coords(coords), revision=revision)
+            index_route(geometry, coords)
+            geometry.save(force_insert=True)
+    except IntegrityError:
+        # Another request rebuilt it first.
+        pass
+    return coords
+
+
+def invalidate_route_geometry(route_id):
+    """
+    Drop the packed copy (and so mark the spatial index stale) and bump the
+    route's revision after its points or pairs changed.
+
+    Single Point saves are covered by a post_save receiver; bulk inserts and
+    deletes (which don't send per-row signals) must call this themselves.
+    """
+    RouteGeometry.objects.filter(route_id=route_id).delete()
+    Route.objects.filter(id=route_id).update(revision=F('revision') + 1, updated_at=timezone.now())
+    transaction.on_commit(lambda: schedule_rebuild(route_id))
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+def _rebuild(route_id):
+    with _executor_lock:
+        _pending.discard(route_id)
+    close_old_connections()
+    try:
+        route_coords(route_id)
+    except Exception:
+        logger.exception("Rebuilding the geometry of route %s failed", route_id)
+    finally:
+        connection.close()
+
+
+def schedule_rebuild(route_id):
+    """
+    Rebuild the packed copy and spatial index of a route on a worker thread,
+    so that requests reading them find them ready. PLANER_GEOMETRY_WORKERS = 0
+    rebuilds inline.
+    """
+    global _executor
+    workers = getattr(settings, 'PLANER_GEOMETRY_WORKERS', 1)
+    if not workers:
+        route_coords(route_id)
+        return
+    with _executor_lock:
+        if route_id in _pending:
+            return
+        _pending.add(route_id)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='planer-geometry')
+    _executor.submit(_rebuild, route_id)
+
@@ -0,0 +1,76 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key: pages stay stable while rows are
+    added and never need a COUNT(*). Page size defaults to REST_FRAMEWORK's
+    PAGE_SIZE and can be lowered or raised with ?page_size= up to max_page_size.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class PointCursorPagination(IdCursorPagination):
+    """A route's points in route order (Point.seq)."""
+    ordering = ('seq', 'id')
+
+
+def _encode_cursor(values):
+    return urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def _decode_cursor(cursor, size):
+    try:
+        values = json.loads(urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def _cursor_values(model, fields, values):
+    """The cursor's values converted by their ordering fields, or None if any does not fit its field."""
+    try:
+        return [model._meta.get_field(name).to_python(value) for name, value in zip(fields, values)]
+    except (ValidationError, TypeError, ValueError):
+        return None
+
+
+def _cursor_value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def keyset_page(queryset, ordering, cursor=None, page_size=20):
+    """
+    Keyset pagination for the HTML views: one page of `queryset` in `ordering`
+    (all ascending or all descending; the last field must be unique, e.g. id),
+    plus an opaque cursor for the next page or None on the last one. A page
+    costs one query reading page_size + 1 rows, however deep it is; a malformed
+    cursor restarts from the first page.
+    """
+    fields = [name.lstrip('-') for name in ordering]
+    lookup = 'lt' if ordering[0].startswith('-') else 'gt'
+    queryset = queryset.order_by(*ordering)
+    values = _decode_cursor(cursor, len(fields)) if cursor else None
+    if values is not None:
+        values = _cursor_values(queryset.model, fields, values)
+    if values is not None:
+        # (f1, f2, ...) beyond the cursor, spelled out for backends without row comparisons
+        after = Q()
+        for i, name in enumerate(fields):
+            after |= Q(**dict(zip(fields[:i], values[:i])), **{f'{name}__{lookup}': values[i]})
+        queryset = queryset.filter(after)
+    items = list(queryset[:page_size + 1])
+    if len(items) <= page_size:
+        return items, None
+    items = items[:page_size]
+    last = items[-1]
+    return items, _encode_cursor([_cursor_value(getattr(last, name)) for name in fields])
@@ -0,0 +1,28 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline-delimited JSON: one compact object per line. Lists render one
+    line per item; large listings bypass this and stream via planer.streaming.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return b''.join(dumps_line(item) for item in items)
+
+
+def dumps(data):
+    # Same compact, non-ASCII-escaping output as DRF's JSONRenderer
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def dumps_line(data):
+    return (dumps(data) + '\n').encode()
@@ -0,0 +1,182 @@
+"""
+Auto-routing of one color on a board: the shortest path of orthogonally
+adjacent free cells between the color's two dots, avoiding the other dots
+and the cells an existing path already uses for other colors.
+
+The search is A* with the Manhattan distance, which is exact on an empty
+grid, so on open boards it walks straight to the goal. Steps all cost one,
+so the open set is a bucket queue indexed by the estimated length rather
+than a heap. Within a bucket the newest cell, the deepest one, goes first.
+Occupancy is a bytearray with one byte
+per cell: the search tests a cell once per neighbour it looks at, and
+indexing a bytearray is several times cheaper than shifting an int bitboard
+of the whole board (as planer.solver keeps) for each test.
+
+Every board size has a Router holding its neighbour table, the search's
+score, parent and generation arrays, and the bucket lists, which grow only
+as far as the highest estimate pushed. Routers of boards up to CACHE_CELLS
+cells are kept per thread and reused, so a search on them allocates little
+beyond the bucket entries; bigger boards get a fresh Router each time, so
+their arrays are not held between requests. Bumping the generation stands in
+for clearing the arrays. Boards of more than MAX_CELLS cells are refused.
+"""
+import threading
+from array import array
+
+from django.conf import settings
+
+from .board_cache import get_snapshot
+from .solver import SolverError
+
+MAX_ROUTERS = 8  # board sizes kept per thread
+CACHE_CELLS = 10000  # largest board whose Router is kept for reuse
+MAX_CELLS = getattr(settings, 'PLANER_ROUTER_MAX_CELLS', 62500)  # 250 x 250
+
+FOUND = 'found'
+BLOCKED = 'blocked'
+
+
+class RouteResult:
+    def __init__(self, color, cells, expanded):
+        self.color = color
+        self.cells = cells  # [(row, col), ...] from the color's first dot to its second, or None
+        self.expanded = expanded
+
+    @property
+    def status(self):
+        return BLOCKED if self.cells is None else FOUND
+
+    def as_user_path(self):
+        """The cells between the dots in the {"row", "col", "color", "route"} shape draw_path stores."""
+        if self.cells is None:
+            return None
+        return [{'row': row, 'col': col, 'color': self.color, 'route': 0} for row, col in self.cells[1:-1]]
+
+
+class Router:
+    """A* search on a rows x cols grid, with buffers reused from one search to the next."""
+
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        n = rows * cols
+        self.row_of = array('l', (i // cols for i in range(n)))
+        self.col_of = array('l', (i % cols for i in range(n)))
+        self.neighbors = [
+            tuple(j for j, ok in ((i - cols, r > 0), (i + cols, r < rows - 1), (i - 1, c > 0), (i + 1, c < cols - 1)) if ok)
+            for i, r, c in zip(range(n), self.row_of, self.col_of)
+        ]
+        self.g = array('l', [0]) * n
+        self.parent = array('l', [0]) * n
+        self.seen = array('L', [0]) * n  # generation in which g and parent were set
+        # Open cells by estimated length, extended as longer estimates turn up
+        self.buckets = [[] for _ in range(rows + cols)]
+        self.generation = 0
+
+    def search(self, start, goal, blocked):
+        """
+        (cell indexes of a shortest path from start to goal, or None; cells
+        expanded). Cells flagged in `blocked` are avoided, except the goal.
+        """
+        self.generation += 1
+        generation = self.generation
+        g, parent, seen, neighbors, buckets = self.g, self.parent, self.seen, self.neighbors, self.buckets
+        row_of, col_of = self.row_of, self.col_of
+        goal_row, goal_col = row_of[goal], col_of[goal]
+
+        g[start] = 0
+        parent[start] = -1
+        seen[start] = generation
+        f = low = abs(row_of[start] - goal_row) + abs(col_of[start] - goal_col)
+        high = f  # highest estimate pushed so far
+        buckets[f].append(start)
+        expanded = 0
+        try:
+            while f <= high:
+                bucket = buckets[f]
+                if not bucket:
+                    f += 1
+                    continue
+                i = bucket.pop()  # last in, first out: the deepest of the equal estimates
+                cost = g[i]
+                if cost + abs(row_of[i] - goal_row) + abs(col_of[i] - goal_col) != f:
+                    continue  # a shorter way here was found after this entry was pushed
+                if i == goal:
+                    path = [i]
+                    while parent[i] >= 0:
+                        i = parent[i]
+                        path.append(i)
+                    path.reverse()
+                    return path, expanded
+                expanded += 1
+                cost += 1
+                for j in neighbors[i]:
+                    if blocked[j] and j != goal:
+                        continue
+                    if seen[j] == generation and g[j] <= cost:
+                        continue
+                    seen[j] = generation
+                    g[j] = cost
+                    parent[j] = i
+                    estimate = cost + abs(row_of[j] - goal_row) + abs(col_of[j] - goal_col)
+                    if estimate > high:
+                        high = estimate
+                        if high >= len(buckets):
+                            buckets.extend([] for _ in range(high + 1 - len(buckets)))
+                    buckets[estimate].append(j)
+            return None, expanded
+        finally:
+            for bucket in buckets[low:high + 1]:
+                bucket.clear()
+
+
+_local = threading.local()
+
+
+def get_router(rows, cols):
+    if rows * cols > CACHE_CELLS:
+        return Router(rows, cols)
+    routers = getattr(_local, 'routers', None)
+    if routers is None:
+        routers = _local.routers = {}
+    router = routers.get((rows, cols))
+    if router is None:
+        if len(routers) >= MAX_ROUTERS:
+            routers.clear()
+        router = routers[(rows, cols)] = Router(rows, cols)
+    return router
+
+
+def route(rows, cols, dots, color, path=()):
+    """
+    Route `color` between its two dots ({"row", "col", "color"} dicts, in id
+    order) around the other dots and the cells of `path` (a UserPath.path
+    list) drawn in other colors. Returns a RouteResult.
+    """
+    if rows * cols > MAX_CELLS:
+        raise SolverError(f"Boards of more than {MAX_CELLS} cells cannot be routed")
+    ends = [dot for dot in dots if dot['color'] == color]
+    if len(ends) != 2:
+        raise SolverError(f"Color {color} does not have exactly two dots")
+    blocked = bytearray(rows * cols)
+    for dot in dots:
+        if not (0 <= dot['row'] < rows and 0 <= dot['col'] < cols):
+            raise SolverError(f"Dot ({dot['row']}, {dot['col']}) outside the {rows} x {cols} board")
+        blocked[dot['row'] * cols + dot['col']] = 1
+    for cell in path:
+        # Cells of this color are being replaced; malformed ones are ignored here (see planer.validation)
+        if not isinstance(cell, dict) or cell.get('color') == color:
+            continue
+        row, col = cell.get('row'), cell.get('col')
+        if type(row) is int and type(col) is int and 0 <= row < rows and 0 <= col < cols:
+            blocked[row * cols + col] = 1
+
+    start, goal = (dot['row'] * cols + dot['col'] for dot in ends)
+    indexes, expanded = get_router(rows, cols).search(start, goal, blocked)
+    cells = None if indexes is None else [divmod(i, cols) for i in indexes]
+    return RouteResult(color, cells, expanded)
+
+
+def route_board(board, color, path=()):
+    """Route `color` on a stored GameBoard."""
+    return route(board.rows, board.cols, get_snapshot(board).dots, color, path)
@@ -1,10 +1,42 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from rest_framework import serializers
-from .models import Route, Point, BackgroundImage
+from . import imaging
+from .board_cache import get_snapshot
+from .boards import (
+    COLUMNS, DOT_FIELDS, GRID, check_dots, check_grid, dots_layout, from_columns, save_board_dots, to_columns,
+)
+from .models import Route, Point, Pair, BackgroundImage, GameBoard, Dot, UserPath
+from .validation import validate_path
+
+PATH_FIELDS = ('row', 'col', 'color', 'route')
 
 class BackgroundImageSerializer(serializers.ModelSerializer):
+    # Null until planer.imaging has built the derived files
+    thumbnails = serializers.SerializerMethodField()
+    tiles = serializers.SerializerMethodField()
+
     class Meta:
         model = BackgroundImage
-        fields = ['id', 'name', 'image']
+        fields = ['id', 'name', 'image', 'width', 'height', 'thumbnails', 'tiles']
+
+    def get_thumbnails(self, obj):
+        if obj.tile_levels is None:
+            return None
+        request = self.context.get('request')
+        return {
+            name: imaging.derived_url(obj.content_hash, f'thumb-{name}.{obj.derived_format}', request)
+            for name in imaging.THUMBNAIL_SIZES
+        }
+
+    def get_tiles(self, obj):
+        if obj.tile_levels is None:
+            return None
+        return {
+            'url': imaging.tile_url_template(obj.content_hash, obj.derived_format, self.context.get('request')),
+            'tile_size': imaging.TILE_SIZE,
+            'levels': obj.tile_levels,
+        }
 
 class PointSerializer(serializers.ModelSerializer):
     x = serializers.FloatField()
@@ -14,6 +46,16 @@ class PointSerializer(serializers.ModelSerializer):
         model = Point
         fields = ['id', 'x', 'y']
 
+class PairSerializer(serializers.ModelSerializer):
+    x1 = serializers.FloatField()
+    y1 = serializers.FloatField()
+    x2 = serializers.FloatField()
+    y2 = serializers.FloatField()
+
+    class Meta:
+        model = Pair
+        fields = ['id', 'x1', 'y1', 'x2', 'y2']
+
 class RouteSerializer(serializers.ModelSerializer):
     points = PointSerializer(many=True, read_only=True)
     background = BackgroundImageSerializer(read_only=True)
@@ -23,4 +65,145 @@ class RouteSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Route
-        fields = ['id', 'name', 'background', 'background_id', 'points']
+        fields = ['id', 'name', 'revision', 'background', 'background_id', 'points']
+
+    def __init__(self, *args, fields=None, **kwargs):
+        # Optional projection, e.g. RouteSerializer(qs, many=True, fields=['id', 'name'])
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields) - {'background_id'}:
+                self.fields.pop(name)
+
+def board_dots(board):
+    """The board's dots as {"row", "col", "color"} dicts in id order, from the prefetch or the board cache."""
+    if 'dots' in getattr(board, '_prefetched_objects_cache', {}):
+        return [{'row': dot.row, 'col': dot.col, 'color': dot.color} for dot in board.dots.all()]
+    return get_snapshot(board).dots
+
+class GameBoardSerializer(serializers.ModelSerializer):
+    """
+    A board with its dots in the layout named by the `dots_layout` context
+    (see boards.dots_layout; None leaves them out). Dots are written as a
+    list of {"row", "col", "color"} objects or in the columns layout, and
+    replace the board's dots as a whole.
+    """
+    owner = serializers.CharField(source='user.username', read_only=True)
+    dots = serializers.JSONField(write_only=True, required=False)
+
+    class Meta:
+        model = GameBoard
+        # rows and cols take the model's bounds (MAX_BOARD_SIDE), which keep boards within boards.GRID_MAX_CELLS
+        fields = ['id', 'name', 'rows', 'cols', 'version', 'owner', 'updated_at', 'dots']
+        read_only_fields = ['version', 'updated_at']
+
+    def validate(self, attrs):
+        rows = attrs.get('rows', getattr(self.instance, 'rows', None))
+        cols = attrs.get('cols', getattr(self.instance, 'cols', None))
+        try:
+            if 'dots' in attrs:
+                dots = attrs['dots']
+                dots = from_columns(dots, DOT_FIELDS) if isinstance(dots, dict) else dots
+                attrs['dots'] = check_dots(dots, rows, cols)
+            elif self.instance is not None:
+                dots = get_snapshot(self.instance).dots
+                check_dots(dots, rows, cols)  # the kept dots must fit a new size
+            else:
+                dots = []
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({'dots': e.messages})
+        if self.context.get('dots_layout') == GRID:
+            # The response must fit the layout it was asked for
+            try:
+                check_grid(rows, cols, dots)
+            except ValueError as e:
+                raise serializers.ValidationError({'dots': str(e)})
+        return attrs
+
+    def create(self, validated_data):
+        dots = validated_data.pop('dots', {})
+        with transaction.atomic():
+            board = super().create(validated_data)
+            save_board_dots(board, dots)
+        board.refresh_from_db(fields=['version', 'updated_at'])
+        return board
+
+    def update(self, instance, validated_data):
+        dots = validated_data.pop('dots', None)
+        with transaction.atomic():
+            board = super().update(instance, validated_data)
+            if dots is not None:
+                save_board_dots(board, dots)
+        board.refresh_from_db(fields=['version', 'updated_at'])
+        return board
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        layout = self.context.get('dots_layout')
+        if layout is not None:
+            # GameBoardViewSet has ruled out boards the grid layout can't hold
+            data['dots'] = dots_layout(board_dots(instance), instance.rows, instance.cols, layout)
+        return data
+
+class DotSerializer(serializers.ModelSerializer):
+    # One dot of the board in the `board` context
+    class Meta:
+        model = Dot
+        fields = ['id', 'row', 'col', 'color']
+
+    def validate(self, attrs):
+        board = self.context['board']
+        row = attrs.get('row', getattr(self.instance, 'row', None))
+        col = attrs.get('col', getattr(self.instance, 'col', None))
+        if not (row < board.rows and col < board.cols):
+            raise serializers.ValidationError(f'({row}, {col}) is outside the {board.rows} x {board.cols} board.')
+        taken = board.dots.filter(row=row, col=col)
+        if self.instance is not None:
+            taken = taken.exclude(id=self.instance.id)
+        if taken.exists():
+            raise serializers.ValidationError(f'There already is a dot at ({row}, {col}).')
+        return attrs
+
+class UserPathSerializer(serializers.ModelSerializer):
+    """
+    A drawn path, with its cells in the layout named by the `path_layout`
+    context: a list of {"row", "col", "color", "route"} objects, the columns
+    layout, or None to leave them out. Written in either form.
+    """
+    board = serializers.PrimaryKeyRelatedField(queryset=GameBoard.objects.all())
+    path = serializers.JSONField(write_only=True)
+
+    class Meta:
+        model = UserPath
+        fields = ['id', 'board', 'name', 'path', 'step_count', 'revision', 'created_at', 'updated_at']
+        read_only_fields = ['step_count', 'revision', 'created_at', 'updated_at']
+
+    def validate(self, attrs):
+        if self.instance is not None and attrs.get('board', self.instance.board) != self.instance.board:
+            raise serializers.ValidationError({'board': 'A path cannot move to another board.'})
+        board = attrs['board'] if self.instance is None else self.instance.board
+        if 'path' in attrs:
+            path = attrs['path']
+            try:
+                path = from_columns(path, PATH_FIELDS) if isinstance(path, dict) else path
+                validate_path(board, path)
+            except DjangoValidationError as e:
+                raise serializers.ValidationError({'path': e.messages})
+            attrs['path'] = path
+        return attrs
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        layout = self.context.get('path_layout')
+        if layout is not None:
+            path = instance.path if isinstance(instance.path, list) else []
+            data['path'] = to_columns(path, PATH_FIELDS) if layout == COLUMNS else path
+        return data
+
+class GenerateBoardsSerializer(serializers.Serializer):
+    # Bounds for boards generated through the API; the generate_boards command has none
+    rows = serializers.IntegerField(min_value=2, max_value=50)
+    cols = serializers.IntegerField(min_value=2, max_value=50)
+    pairs = serializers.IntegerField(min_value=1, max_value=100)
+    count = serializers.IntegerField(min_value=1, max_value=100, default=1)
+    seed = serializers.IntegerField(min_value=0, required=False)
+    name = serializers.CharField(max_length=80, required=False)
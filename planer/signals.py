@@ -1,35 +1,44 @@
-import json
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import GameBoard, UserPath
-from .views import subscribers
+from .models import BackgroundImage, GameBoard, Dot, UserPath, Point
+from .board_cache import board_cache, mark_dirty
+from . import events
+from .imaging import schedule as schedule_imaging
+from .packing import invalidate_route_geometry
 
 @receiver(post_save, sender=GameBoard)
 def gameboard_created(sender, instance, created, **kwargs):
     if created:
-        data = {
-            "board_id": instance.id,
-            "board_name": instance.name,
-            "creator_username": instance.user.username,
-        }
-        msg = f"event: newBoard\ndata: {json.dumps(data)}\n\n"
-        # Wyślij do wszystkich subskrybentów
-        for queue in list(subscribers):
-            queue.append(msg)
+        # Wysłane do subskrybentów po zatwierdzeniu transakcji
+        events.board_created(instance)
+
+@receiver(post_save, sender=GameBoard)
+@receiver(post_delete, sender=GameBoard)
+def gameboard_changed(sender, instance, **kwargs):
+    # Saves leave the version alone (see GameBoard.save), but a rolled-back board's id and
+    # versions can come back with other dots; drop any snapshots kept under them
+    board_cache.discard(instance.id)
+
+@receiver(post_save, sender=Dot)
+def dot_saved(sender, instance, **kwargs):
+    # Bulk changes (save_board_dots, pair deletion) bump the version themselves, once
+    mark_dirty(instance.board_id)
 
 @receiver(post_save, sender=UserPath)
 def userpath_created(sender, instance, created, **kwargs):
     if created:
-        data = {
-            "path_id": instance.id,
-            "board_id": instance.board.id,
-            "board_name": instance.board.name,
-            "user_username": instance.user.username,
-            "path_name": instance.name,
-        }
-        msg = f"event: newPath\ndata: {json.dumps(data)}\n\n"
-        for queue in list(subscribers):
-            queue.append(msg)
+        events.path_created(instance)
+
+@receiver(post_save, sender=BackgroundImage)
+def background_saved(sender, instance, update_fields=None, **kwargs):
+    # Thumbnails and tiles are built off the request thread once the upload commits
+    if update_fields is None or 'image' in update_fields:
+        schedule_imaging(instance)
+
+@receiver(post_save, sender=Point)
+def point_saved(sender, instance, **kwargs):
+    # Packed geometry no longer matches the Point rows; it is rebuilt on next read
+    invalidate_route_geometry(instance.route_id)
 
 # The userpath_created function is not called directly in your code.
 # It is automatically called by Django's signals framework whenever a UserPath object is saved.
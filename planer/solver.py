@@ -0,0 +1,354 @@
+"""
+Solver for Flow-style boards: connect every pair of same-colored dots with a
+path of orthogonally adjacent cells so that no two paths share a cell.
+
+State is kept as bitboards (Python ints, bit i = cell row * cols + col), which
+makes occupancy tests and flood fills a handful of shifts and masks.
+
+Solving runs in two phases. Without fill, a fast rip-up-and-reroute pass first
+routes pairs one by one along shortest paths, promoting any pair that gets
+blocked to the front and retrying; most boards end there. Otherwise (or with
+fill=True) an exact depth-first search grows one path head per step, always
+the most constrained one (fewest legal moves, so forced moves go first), and
+after every step checks that:
+
+* every unfinished path can still reach its target dot through free cells,
+* with fill=True, no free region is stranded and no free cell became a dead end.
+
+States proven to fail are remembered in a transposition table so the search
+never explores the same board twice. The search keeps its own stack, as a
+path may grow across every free cell. Boards of more than MAX_CELLS cells are
+refused.
+"""
+import random
+from collections import defaultdict, deque
+
+from django.conf import settings
+
+from .board_cache import get_snapshot
+
+DEFAULT_NODE_LIMIT = 200000
+REROUTE_ATTEMPTS = 100
+MEMO_LIMIT = 1000000
+MAX_CELLS = getattr(settings, 'PLANER_SOLVER_MAX_CELLS', 2500)  # 50 x 50, the largest generated board
+
+SOLVED = 'solved'
+UNSOLVABLE = 'unsolvable'
+UNKNOWN = 'unknown'  # node limit hit before the search finished
+
+
+class SolverError(ValueError):
+    pass
+
+
+class _NodeLimit(Exception):
+    pass
+
+
+class Solution:
+    def __init__(self, status, paths=None, nodes=0):
+        self.status = status
+        self.paths = paths or {}  # color -> [(row, col), ...] from one dot to the other
+        self.nodes = nodes
+
+    @property
+    def solved(self):
+        return self.status == SOLVED
+
+    def as_user_path(self):
+        """The cells between the dots in the {"row", "col", "color", "route"} shape draw_path stores."""
+        return [
+            {'row': row, 'col': col, 'color': color, 'route': 0}
+            for color, cells in self.paths.items()
+            for row, col in cells[1:-1]
+        ]
+
+
+def pairs_from_dots(dots):
+    """Group {"row", "col", "color"} dots into [(color, (r, c), (r, c))]; every color needs exactly two dots."""
+    by_color = defaultdict(list)
+    for dot in dots:
+        by_color[dot['color']].append((dot['row'], dot['col']))
+    bad = sorted(color for color, cells in by_color.items() if len(cells) != 2)
+    if bad:
+        raise SolverError(f"Colors without exactly two dots: {', '.join(bad)}")
+    return [(color, cells[0], cells[1]) for color, cells in by_color.items()]
+
+
+class Solver:
+    def __init__(self, rows, cols, pairs, fill=False, node_limit=DEFAULT_NODE_LIMIT):
+        if rows * cols > MAX_CELLS:
+            raise SolverError(f"Boards of more than {MAX_CELLS} cells cannot be solved")
+        self.rows = rows
+        self.cols = cols
+        self.fill = fill
+        self.node_limit = node_limit
+        self.nodes = 0
+        n = rows * cols
+        self.full = (1 << n) - 1
+        col0 = sum(1 << (r * cols) for r in range(rows))
+        self.not_first_col = self.full & ~col0
+        self.not_last_col = self.full & ~(col0 << (cols - 1))
+        self.neighbors = []
+        self.nmask = []
+        for i in range(n):
+            r, c = divmod(i, cols)
+            self.neighbors.append([
+                j for j, ok in (
+                    (i - cols, r > 0), (i + cols, r < rows - 1), (i - 1, c > 0), (i + 1, c < cols - 1),
+                ) if ok
+            ])
+            self.nmask.append(sum(1 << j for j in self.neighbors[-1]))
+        self.pairs = []
+        seen = set()
+        for color, a, b in pairs:
+            ia, ib = self._index(a), self._index(b)
+            if ia in seen or ib in seen or ia == ib:
+                raise SolverError(f"Dots overlap at {a} or {b}")
+            seen.update((ia, ib))
+            self.pairs.append((color, ia, ib))
+
+    def _index(self, cell):
+        r, c = cell
+        if not (0 <= r < self.rows and 0 <= c < self.cols):
+            raise SolverError(f"Dot {cell} outside the {self.rows} x {self.cols} board")
+        return r * self.cols + c
+
+    def _grow(self, mask, within):
+        """Flood-fill `mask` through the cells in `within`."""
+        cols = self.cols
+        while True:
+            grown = mask | (
+                ((mask << 1) & self.not_first_col)
+                | ((mask >> 1) & self.not_last_col)
+                | (mask << cols)
+                | (mask >> cols)
+            ) & within
+            if grown == mask:
+                return mask
+            mask = grown
+
+    def _components(self, free):
+        """Split the free cells into connected regions (bitmasks)."""
+        regions = []
+        while free:
+            region = self._grow(free & -free, free)
+            regions.append(region)
+            free &= ~region
+        return regions
+
+    def _connected(self, a, b, regions):
+        if self.nmask[a] >> b & 1:
+            return True
+        na, nb = self.nmask[a], self.nmask[b]
+        return any(na & region and nb & region for region in regions)
+
+    def _order(self):
+        """Most constrained pair first: fewest free neighbors at the dots, then shortest distance."""
+        dots = 0
+        for _, a, b in self.pairs:
+            dots |= (1 << a) | (1 << b)
+
+        def key(pair):
+            _, a, b = pair
+            exits = sum(1 for j in self.neighbors[a] + self.neighbors[b] if not dots >> j & 1)
+            ra, ca = divmod(a, self.cols)
+            rb, cb = divmod(b, self.cols)
+            return exits, abs(ra - rb) + abs(ca - cb)
+
+        return sorted(self.pairs, key=key)
+
+    def _shortest_path(self, a, b, occupied):
+        """Breadth-first shortest path from a to b through cells not in `occupied`."""
+        parent = {a: None}
+        queue = deque([a])
+        while queue:
+            i = queue.popleft()
+            for j in self.neighbors[i]:
+                if j in parent:
+                    continue
+                if j == b:
+                    path = [b, i]
+                    while parent[i] is not None:
+                        i = parent[i]
+                        path.append(i)
+                    path.reverse()
+                    return path
+                if not occupied >> j & 1:
+                    parent[j] = i
+                    queue.append(j)
+        return None
+
+    def _reroute(self, dots):
+        """Rip-up and reroute: fast, but can only ever find solutions, not rule them out."""
+        order = self._order()
+        rng = random.Random(0)
+        for attempt in range(REROUTE_ATTEMPTS):
+            occupied = dots
+            paths = {}
+            for k, (color, a, b) in enumerate(order):
+                path = self._shortest_path(a, b, occupied)
+                if path is None:
+                    order.insert(0, order.pop(k))
+                    break
+                paths[color] = path
+                for i in path:
+                    occupied |= 1 << i
+            else:
+                return paths
+            if attempt % 10 == 9:
+                # Promotion can cycle; shake the order up now and then.
+                rng.shuffle(order)
+        return None
+
+    def solve(self):
+        occupied = 0
+        for _, a, b in self.pairs:
+            occupied |= (1 << a) | (1 << b)
+        paths = None if self.fill else self._reroute(occupied)
+        if paths is None:
+            order = self._order()
+            self.failed = set()
+            self.targets = [b for _, _, b in order]
+            self.paths = [[a] for _, a, _ in order]
+            heads = [a for _, a, _ in order]
+            masks = [1 << a for _, a, _ in order]
+            try:
+                found = self._search(heads, masks, occupied, [False] * len(order))
+            except _NodeLimit:
+                return Solution(UNKNOWN, nodes=self.nodes)
+            if not found:
+                return Solution(UNSOLVABLE, nodes=self.nodes)
+            paths = {color: self.paths[k] for k, (color, _, _) in enumerate(order)}
+        cols = self.cols
+        return Solution(SOLVED, {
+            color: [divmod(i, cols) for i in paths[color]] for color, _, _ in self.pairs
+        }, self.nodes)
+
+    def _moves(self, k, heads, masks, occupied):
+        head, target = heads[k], self.targets[k]
+        if not self.fill and self.nmask[head] >> target & 1:
+            # Connecting right away never hurts the other pairs when the board needn't be filled.
+            return [target]
+        moves = []
+        for nxt in self.neighbors[head]:
+            if nxt == target:
+                moves.append(nxt)
+            elif not occupied >> nxt & 1:
+                # Without fill a path never needs to touch itself; such detours only waste search.
+                if not self.fill and self.nmask[nxt] & masks[k] & ~(1 << head):
+                    continue
+                moves.append(nxt)
+        return moves
+
+    def _feasible(self, free, heads, done):
+        """Cheap checks that the partial state can still be completed."""
+        regions = self._components(free)
+        nmask = self.nmask
+        open_pairs = [(heads[k], self.targets[k]) for k in range(len(heads)) if not done[k]]
+        for head, target in open_pairs:
+            if not self._connected(head, target, regions):
+                return False
+        if self.fill:
+            ends = 0
+            for head, target in open_pairs:
+                ends |= (1 << head) | (1 << target)
+            # Every free region must touch both ends of some pair that can fill it.
+            for region in regions:
+                if not any(nmask[h] & region and nmask[t] & region for h, t in open_pairs):
+                    return False
+            # A free cell needs two ways in and out; fewer means a dead end nobody can fill.
+            open_cells = free | ends
+            cells = free
+            while cells:
+                low = cells & -cells
+                cells ^= low
+                if bin(nmask[low.bit_length() - 1] & open_cells).count('1') < 2:
+                    return False
+        return True
+
+    def _remember(self, key):
+        if len(self.failed) >= MEMO_LIMIT:
+            self.failed.clear()
+        self.failed.add(key)
+
+    def _expand(self, heads, masks, occupied, done):
+        """
+        Enter a search state: True if it is a solution, None if it fails, else
+        the frame [key, k, moves, next move, head, mask, occupied] to explore.
+        """
+        if all(done):
+            return True if not self.fill or occupied == self.full else None
+        key = (tuple(heads), tuple(masks), tuple(done))
+        if key in self.failed:
+            return None
+        self.nodes += 1
+        if self.nodes > self.node_limit:
+            raise _NodeLimit
+
+        # Grow the most constrained path: fewest legal moves, so forced moves go first.
+        best, best_moves = None, None
+        for k in range(len(heads)):
+            if done[k]:
+                continue
+            moves = self._moves(k, heads, masks, occupied)
+            if not moves:
+                self._remember(key)
+                return None
+            if best_moves is None or len(moves) < len(best_moves):
+                best, best_moves = k, moves
+                if len(moves) == 1:
+                    break
+
+        k = best
+        tr, tc = divmod(self.targets[k], self.cols)
+        best_moves.sort(key=lambda i: abs(i // self.cols - tr) + abs(i % self.cols - tc))
+        return [key, k, best_moves, 0, heads[k], masks[k], occupied]
+
+    def _search(self, heads, masks, occupied, done):
+        # Depth-first with an explicit stack: a path grows one cell per level, so the
+        # depth follows the board's free cells and would overflow Python's recursion.
+        frame = self._expand(heads, masks, occupied, done)
+        if frame is True:
+            return True
+        stack = [frame] if frame is not None else []
+        while stack:
+            frame = stack[-1]
+            key, k, moves, i, head, mask, occupied = frame
+            if i:
+                # Take back the move tried last from this state
+                self.paths[k].pop()
+                if moves[i - 1] == self.targets[k]:
+                    done[k] = False
+                else:
+                    heads[k], masks[k] = head, mask
+            if i == len(moves):
+                self._remember(key)
+                stack.pop()
+                continue
+            frame[3] = i + 1
+            nxt = moves[i]
+            self.paths[k].append(nxt)
+            if nxt == self.targets[k]:
+                done[k] = True
+            else:
+                heads[k], masks[k] = nxt, mask | 1 << nxt
+                occupied |= 1 << nxt
+            if not self._feasible(self.full & ~occupied, heads, done):
+                continue
+            child = self._expand(heads, masks, occupied, done)
+            if child is True:
+                return True
+            if child is not None:
+                stack.append(child)
+        return False
+
+def solve(rows, cols, pairs, fill=False, node_limit=DEFAULT_NODE_LIMIT):
+    """Solve a board given as [(color, (row, col), (row, col))]; returns a Solution."""
+    return Solver(rows, cols, pairs, fill=fill, node_limit=node_limit).solve()
+
+
+def solve_board(board, fill=False, node_limit=DEFAULT_NODE_LIMIT):
+    """Solve a stored GameBoard."""
+    pairs = pairs_from_dots(get_snapshot(board).dots)
+    return solve(board.rows, board.cols, pairs, fill=fill, node_limit=node_limit)
@@ -0,0 +1,274 @@
+"""
+Spatial index over routes: which routes pass through a region?
+
+A route's geometry is its polyline (consecutive points in route order) plus its
+Pair segments. Each segment is rasterized onto a square grid of CELL_SIZE
+units and the cells it crosses are stored as RouteCell rows, next to a
+bounding box on RouteGeometry. Both are rebuilt together with the packed
+coordinates (see planer.packing), so they go stale and come back with them.
+
+Segments are walked cell by cell (Amanatides-Woo), so indexing costs the
+number of cells crossed. A segment crossing more than MAX_SEGMENT_CELLS cells
+is not rasterized; its route is flagged long_segments instead and tested
+exactly by every query its bounding box overlaps.
+
+A query reads the RouteCell rows under the query's bounding box. A cell lying
+wholly inside the query shape proves a hit, because the segment that marked it
+really crosses it. Routes seen only in border cells are confirmed by testing
+their segments exactly against the shape. Routes whose index is stale are
+tested exactly from their Point rows; their index is rebuilt off the request
+(planer.packing.schedule_rebuild).
+"""
+import math
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
+
+from .models import Pair, RouteCell, RouteGeometry
+
+# Changing this needs every index rebuilt: RouteGeometry.objects.all().delete()
+CELL_SIZE = float(getattr(settings, 'PLANER_SPATIAL_CELL_SIZE', 8.0))
+BATCH_SIZE = 1000
+MAX_SEGMENT_CELLS = 4096
+
+
+def segment_hits_box(ax, ay, bx, by, x0, y0, x1, y1):
+    """Does segment a-b touch the closed box [x0, x1] x [y0, y1]? (Liang-Barsky clipping)"""
+    t0, t1 = 0.0, 1.0
+    dx, dy = bx - ax, by - ay
+    for p, q in ((-dx, ax - x0), (dx, x1 - ax), (-dy, ay - y0), (dy, y1 - ay)):
+        if p == 0:
+            if q < 0:
+                return False
+        else:
+            t = q / p
+            if p < 0:
+                if t > t1:
+                    return False
+                t0 = max(t0, t)
+            else:
+                if t < t0:
+                    return False
+                t1 = min(t1, t)
+    return True
+
+
+def segment_distance(px, py, ax, ay, bx, by):
+    """Distance from point p to segment a-b."""
+    dx, dy = bx - ax, by - ay
+    length = dx * dx + dy * dy
+    t = 0.0 if length == 0 else max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length))
+    return math.hypot(px - ax - t * dx, py - ay - t * dy)
+
+
+def route_segments(coords, pairs):
+    """(ax, ay, bx, by) for the polyline through flat coords and for every pair; a lone point is a zero-length segment."""
+    n = len(coords)
+    if n == 2:
+        yield coords[0], coords[1], coords[0], coords[1]
+    for i in range(0, n - 2, 2):
+        yield coords[i], coords[i + 1], coords[i + 2], coords[i + 3]
+    yield from pairs
+
+
+def _cell(value):
+    return math.floor(value / CELL_SIZE)
+
+
+def segment_cell_count(ax, ay, bx, by):
+    """How many cells segment_cells() visits, at most; without walking them."""
+    return abs(_cell(bx) - _cell(ax)) + abs(_cell(by) - _cell(ay)) + 1
+
+
+def segment_cells(ax, ay, bx, by):
+    """Grid cells the segment actually crosses, walked from a to b."""
+    cx, cy, ex, ey = _cell(ax), _cell(ay), _cell(bx), _cell(by)
+    if cx == ex or cy == ey:
+        # Axis-aligned run of cells: all of them are crossed
+        for x in range(min(cx, ex), max(cx, ex) + 1):
+            for y in range(min(cy, ey), max(cy, ey) + 1):
+                yield x, y
+        return
+    dx, dy = bx - ax, by - ay
+    step_x, step_y = (1 if dx > 0 else -1), (1 if dy > 0 else -1)
+    # Parameter t along a-b at which the next vertical / horizontal grid line is crossed
+    next_x = ((cx + (step_x > 0)) * CELL_SIZE - ax) / dx
+    next_y = ((cy + (step_y > 0)) * CELL_SIZE - ay) / dy
+    delta_x, delta_y = CELL_SIZE / abs(dx), CELL_SIZE / abs(dy)
+    yield cx, cy
+    while cx != ex or cy != ey:
+        if cy == ey or (cx != ex and next_x < next_y):
+            cx += step_x
+            next_x += delta_x
+        elif cx == ex or next_y < next_x:
+            cy += step_y
+            next_y += delta_y
+        else:
+            # Through a grid corner: the two cells beside it are touched too
+            yield cx + step_x, cy
+            yield cx, cy + step_y
+            cx += step_x
+            cy += step_y
+            next_x += delta_x
+            next_y += delta_y
+        yield cx, cy
+
+
+def index_route(geometry, coords):
+    """
+    Fill in geometry's bounding box and replace the route's RouteCell rows.
+    Called by planer.packing when it rebuilds the packed copy; the caller saves
+    `geometry` in the same transaction.
+    """
+    route_id = geometry.route_id
+    pairs = list(Pair.objects.filter(route_id=route_id).values_list('x1', 'y1', 'x2', 'y2'))
+    cells = set()
+    min_x = min_y = math.inf
+    max_x = max_y = -math.inf
+    geometry.long_segments = False
+    for ax, ay, bx, by in route_segments(coords, pairs):
+        min_x, max_x = min(min_x, ax, bx), max(max_x, ax, bx)
+        min_y, max_y = min(min_y, ay, by), max(max_y, ay, by)
+        if segment_cell_count(ax, ay, bx, by) > MAX_SEGMENT_CELLS:
+            geometry.long_segments = True
+        else:
+            cells.update(segment_cells(ax, ay, bx, by))
+    if min_x != math.inf:
+        geometry.min_x, geometry.min_y, geometry.max_x, geometry.max_y = min_x, min_y, max_x, max_y
+    RouteCell.objects.filter(route_id=route_id).delete()
+    RouteCell.objects.bulk_create(
+        [RouteCell(route_id=route_id, cx=cx, cy=cy) for cx, cy in cells], batch_size=BATCH_SIZE,
+    )
+
+
+class BBox:
+    def __init__(self, x0, y0, x1, y1):
+        self.bounds = (x0, y0, x1, y1)
+
+    def contains_cell(self, cx, cy):
+        x0, y0, x1, y1 = self.bounds
+        return (x0 <= cx * CELL_SIZE and (cx + 1) * CELL_SIZE <= x1
+                and y0 <= cy * CELL_SIZE and (cy + 1) * CELL_SIZE <= y1)
+
+    def hits(self, ax, ay, bx, by):
+        return segment_hits_box(ax, ay, bx, by, *self.bounds)
+
+
+class Circle:
+    def __init__(self, x, y, radius):
+        self.x, self.y, self.radius = x, y, radius
+        self.bounds = (x - radius, y - radius, x + radius, y + radius)
+
+    def contains_cell(self, cx, cy):
+        # Inside iff the farthest corner is
+        dx = max(abs(cx * CELL_SIZE - self.x), abs((cx + 1) * CELL_SIZE - self.x))
+        dy = max(abs(cy * CELL_SIZE - self.y), abs((cy + 1) * CELL_SIZE - self.y))
+        return math.hypot(dx, dy) <= self.radius
+
+    def hits(self, ax, ay, bx, by):
+        return segment_distance(self.x, self.y, ax, ay, bx, by) <= self.radius
+
+
+def _floats(value, count, name):
+    try:
+        numbers = [float(part) for part in value.split(',')]
+    except ValueError:
+        numbers = []
+    if len(numbers) != count or not all(math.isfinite(v) for v in numbers):
+        raise ValidationError({name: f'Expected {count} comma-separated numbers.'})
+    return numbers
+
+
+def parse_shape(params):
+    """The query shape from ?bbox=x0,y0,x1,y1 or ?near=x,y&radius=r, or None."""
+    if params.get('bbox'):
+        x0, y0, x1, y1 = _floats(params['bbox'], 4, 'bbox')
+        if x0 > x1 or y0 > y1:
+            raise ValidationError({'bbox': 'Expected min_x,min_y,max_x,max_y.'})
+        return BBox(x0, y0, x1, y1)
+    if params.get('near'):
+        x, y = _floats(params['near'], 2, 'near')
+        (radius,) = _floats(params.get('radius', ''), 1, 'radius')
+        if radius < 0:
+            raise ValidationError({'radius': 'Must not be negative.'})
+        return Circle(x, y, radius)
+    return None
+
+
+def _stale_segments(route_ids):
+    """(route id, segments) for routes without an up-to-date index, read from their Point and Pair rows."""
+    from .models import Point
+
+    for start in range(0, len(route_ids), BATCH_SIZE):
+        batch = route_ids[start:start + BATCH_SIZE]
+        pairs, coords = {}, {}
+        for route_id, *pair in Pair.objects.filter(route_id__in=batch).values_list('route_id', 'x1', 'y1', 'x2', 'y2'):
+            pairs.setdefault(route_id, []).append(pair)
+        points = Point.objects.filter(route_id__in=batch).order_by('route_id', 'seq', 'id').values_list('route_id', 'x', 'y')
+        for route_id, x, y in points.iterator(chunk_size=10000):
+            coords.setdefault(route_id, []).extend((x, y))
+        for route_id in batch:
+            yield route_id, route_segments(coords.get(route_id, []), pairs.get(route_id, ()))
+
+
+def _indexed_segments(route_ids):
+    """(route id, segments) for routes with an up-to-date packed copy."""
+    from .packing import unpack_coords
+
+    for start in range(0, len(route_ids), BATCH_SIZE):
+        batch = route_ids[start:start + BATCH_SIZE]
+        pairs = {}
+        for route_id, *pair in Pair.objects.filter(route_id__in=batch).values_list('route_id', 'x1', 'y1', 'x2', 'y2'):
+            pairs.setdefault(route_id, []).append(pair)
+        geometries = RouteGeometry.objects.filter(route_id__in=batch).values_list('route_id', 'points')
+        for route_id, data in geometries.iterator(chunk_size=100):
+            yield route_id, route_segments(unpack_coords(data), pairs.get(route_id, ()))
+
+
+def _exact_hits(routes, shape):
+    x0, y0, x1, y1 = shape.bounds
+    for route_id, segments in routes:
+        for ax, ay, bx, by in segments:
+            # Cheap bounding-box rejection before the exact test
+            if max(ax, bx) < x0 or min(ax, bx) > x1 or max(ay, by) < y0 or min(ay, by) > y1:
+                continue
+            if shape.hits(ax, ay, bx, by):
+                yield route_id
+                break
+
+
+def matching_route_ids(queryset, shape):
+    """Ids of the routes in `queryset` with a point or segment touching `shape`."""
+    from .packing import schedule_rebuild
+
+    stale = sorted(queryset.exclude(geometry__revision=F('revision')).values_list('id', flat=True))
+    for route_id in stale:
+        transaction.on_commit(lambda route_id=route_id: schedule_rebuild(route_id))
+    x0, y0, x1, y1 = shape.bounds
+    hits, border = set(), set()
+    cells = RouteCell.objects.filter(
+        route__in=queryset.values('id'),
+        cx__range=(_cell(x0), _cell(x1)),
+        cy__range=(_cell(y0), _cell(y1)),
+    ).values_list('route_id', 'cx', 'cy')
+    for route_id, cx, cy in cells.iterator(chunk_size=10000):
+        if route_id in hits:
+            continue
+        if shape.contains_cell(cx, cy):
+            hits.add(route_id)
+        else:
+            border.add(route_id)
+    # Routes with segments too long to rasterize, wherever their bounding box overlaps the shape
+    border.update(RouteGeometry.objects.filter(
+        route__in=queryset.values('id'), long_segments=True,
+        min_x__lte=x1, max_x__gte=x0, min_y__lte=y1, max_y__gte=y0,
+    ).values_list('route_id', flat=True))
+    # Cells of a stale route may be left from before its change
+    hits.difference_update(stale)
+    border -= hits
+    border.difference_update(stale)
+    hits.update(_exact_hits(_indexed_segments(sorted(border)), shape))
+    hits.update(_exact_hits(_stale_segments(stale), shape))
+    return hits
@@ -0,0 +1,133 @@
+from itertools import groupby, islice
+from operator import itemgetter
+
+from rest_framework.exceptions import ValidationError
+
+from .models import BackgroundImage, Point
+from .renderers import dumps
+from .serializers import BackgroundImageSerializer
+
+ROUTE_FIELDS = ('id', 'name', 'revision', 'background', 'points')
+CHUNK_SIZE = 100  # routes per query
+POINT_BATCH = 1000  # points encoded per string join
+BUFFER_SIZE = 64 * 1024  # bytes handed to the server per write
+POINT_TEMPLATE = '{"id":%d,"x":%r,"y":%r}'
+
+
+def parse_fields(value, allowed=ROUTE_FIELDS):
+    """Parse a ?fields=a,b projection; None (all fields) when absent."""
+    if not value:
+        return None
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = sorted(set(fields) - set(allowed))
+    if unknown:
+        raise ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}."})
+    return fields
+
+
+def stream_routes(queryset, fields=None, request=None, ndjson=False, chunk_size=CHUNK_SIZE):
+    """
+    Encode routes shaped like RouteSerializer output as a JSON array, or one
+    route per line with `ndjson`, yielding bytes as they are produced.
+
+    Routes are read with a chunked iterator and each chunk's points with one
+    values_list() iterator, so neither model instances nor a whole route's
+    point list are ever held in memory. Points are not queried at all when
+    the `fields` projection leaves them out.
+    """
+    fields = list(fields or ROUTE_FIELDS)
+    backgrounds = {}
+
+    def parts():
+        if not ndjson:
+            yield b'['
+        for i, (row, points) in enumerate(_route_rows(queryset, 'points' in fields, chunk_size)):
+            if i and not ndjson:
+                yield b','
+            yield from _encode_route(row, points, fields, backgrounds, request)
+            if ndjson:
+                yield b'\n'
+        if not ndjson:
+            yield b']'
+
+    return buffered(parts())
+
+
+def _route_rows(queryset, with_points, chunk_size):
+    queryset = queryset.select_related(None).prefetch_related(None)
+    rows = queryset.order_by('id').values_list('id', 'name', 'revision', 'background_id').iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        if not with_points:
+            for row in chunk:
+                yield row, iter(())
+            continue
+        point_rows = (
+            Point.objects.filter(route_id__in=[row[0] for row in chunk])
+            .order_by('route_id', 'seq', 'id')
+            .values_list('route_id', 'id', 'x', 'y')
+            .iterator(chunk_size=2000)
+        )
+        # Both sides are ordered by route id; the consumer drains each group before we advance.
+        groups = groupby(point_rows, key=itemgetter(0))
+        current = next(groups, None)
+        for row in chunk:
+            if current is not None and current[0] == row[0]:
+                yield row, current[1]
+                current = next(groups, None)
+            else:
+                yield row, iter(())
+
+
+def _encode_route(row, points, fields, backgrounds, request):
+    route_id, name, revision, background_id = row
+    yield b'{'
+    for i, field in enumerate(fields):
+        prefix = (',' if i else '') + dumps(field) + ':'
+        if field == 'points':
+            yield (prefix + '[').encode()
+            yield from _encode_points(points)
+            yield b']'
+            continue
+        if field == 'id':
+            value = route_id
+        elif field == 'name':
+            value = name
+        elif field == 'revision':
+            value = revision
+        else:
+            if background_id not in backgrounds:
+                backgrounds[background_id] = BackgroundImageSerializer(
+                    BackgroundImage.objects.get(pk=background_id), context={'request': request}
+                ).data
+            value = backgrounds[background_id]
+        yield (prefix + dumps(value)).encode()
+    yield b'}'
+
+
+def _encode_points(points):
+    separator = ''
+    while True:
+        batch = list(islice(points, POINT_BATCH))
+        if not batch:
+            return
+        yield (separator + ','.join(
+            POINT_TEMPLATE % (pid, x, y) if x - x == 0 and y - y == 0  # finite: repr() equals json's output
+            else dumps({'id': pid, 'x': x, 'y': y})
+            for _, pid, x, y in batch
+        )).encode()
+        separator = ','
+
+
+def buffered(parts, size=BUFFER_SIZE):
+    """Join small byte strings into writes of about `size` bytes."""
+    buffer = bytearray()
+    for part in parts:
+        buffer += part
+        if len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
@@ -27,8 +27,8 @@ class ApiAuthTestCase(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + token)
         resp = self.client.get('/planer/api/trasy/')
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(resp.data), 1)
-        self.assertEqual(resp.data[0]['name'], 'Route1')
+        self.assertEqual(len(resp.data['results']), 1)
+        self.assertEqual(resp.data['results'][0]['name'], 'Route1')
 
     def test_user_cannot_access_others_route(self):
         token = self.get_token('user1', 'pass1')
@@ -52,8 +52,8 @@ class ApiAuthTestCase(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + token)
         resp = self.client.get(f'/planer/api/trasy/{self.route1.id}/points/')
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(resp.data), 1)
-        self.assertEqual(resp.data[0]['x'], self.point1.x)
+        self.assertEqual(len(resp.data['results']), 1)
+        self.assertEqual(resp.data['results'][0]['x'], self.point1.x)
         # Try to access other's points
         resp = self.client.get(f'/planer/api/trasy/{self.route2.id}/points/')
         self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,168 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from planer.boards import save_board_dots
+from planer.models import BackgroundImage, GameBoard, Point, Route, UserPath
+
+
+class GameBoardAPITestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.other = User.objects.create_user(username='other', password='pass')
+        self.board = GameBoard.objects.create(user=self.user, name='B', rows=2, cols=3)
+        save_board_dots(self.board, {(0, 0): 'red', (1, 2): 'red', (0, 2): 'blue'})
+        self.client.force_authenticate(self.user)
+        self.url = f'/planer/api/plansze/{self.board.id}/'
+
+    def test_dot_layouts(self):
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.data['owner'], 'user')
+        self.assertEqual(resp.data['dots'], [
+            {'row': 0, 'col': 0, 'color': 'red'}, {'row': 1, 'col': 2, 'color': 'red'},
+            {'row': 0, 'col': 2, 'color': 'blue'},
+        ])  # in id order, as the editors expect
+        resp = self.client.get(self.url, {'dots': 'columns'})
+        self.assertEqual(resp.data['dots'], {'row': [0, 1, 0], 'col': [0, 2, 2], 'color': ['red', 'red', 'blue']})
+        resp = self.client.get(self.url, {'dots': 'grid'})
+        self.assertEqual(resp.data['dots'], {'palette': ['red', 'blue'], 'grid': '0.1\n..0'})
+        self.assertNotIn('dots', self.client.get(self.url, {'dots': 'none'}).data)
+        self.assertEqual(self.client.get(self.url, {'dots': 'xml'}).status_code, 400)
+
+    def test_grid_refused_up_front(self):
+        crowded = GameBoard.objects.create(user=self.other, name='C', rows=8, cols=8)
+        save_board_dots(crowded, {(i // 8, i % 8): f'#{i:06x}' for i in range(63)})
+        for url in (f'/planer/api/plansze/{crowded.id}/', '/planer/api/plansze/'):
+            resp = self.client.get(url, {'dots': 'grid'})
+            self.assertEqual(resp.status_code, 400, url)
+            self.assertIn('62 colors', str(resp.data['dots']))
+            self.assertEqual(self.client.get(url, {'dots': 'columns'}).status_code, 200)
+        with mock.patch('planer.boards.GRID_MAX_CELLS', 5):
+            self.assertEqual(self.client.get(self.url, {'dots': 'grid'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'dots': 'grid'}).status_code, 200)
+        resp = self.client.post('/planer/api/plansze/', {'name': 'N', 'rows': 251, 'cols': 2}, format='json')
+        self.assertEqual(resp.status_code, 400)
+
+    def test_detail_is_conditional(self):
+        resp = self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=resp['ETag']).status_code, 304)
+        self.assertNotEqual(self.client.get(self.url, {'dots': 'grid'})['ETag'], resp['ETag'])
+        save_board_dots(self.board, {(0, 0): 'red'})
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual((resp.status_code, len(resp.data['dots'])), (200, 1))
+
+    def test_list_constant_queries(self):
+        for i in range(5):
+            board = GameBoard.objects.create(user=self.other, name=f'O{i}', rows=3, cols=3)
+            save_board_dots(board, {(0, 0): 'red', (2, 2): 'red'})
+        with self.assertNumQueries(2):  # boards with owners, dots of the page
+            resp = self.client.get('/planer/api/plansze/', {'dots': 'columns'})
+        self.assertEqual(len(resp.data['results']), 6)
+        self.assertEqual(resp.data['results'][1]['dots']['col'], [0, 2])
+        with self.assertNumQueries(1):
+            resp = self.client.get('/planer/api/plansze/', {'dots': 'none', 'mine': '1'})
+        self.assertEqual([b['name'] for b in resp.data['results']], ['B'])
+
+    def test_create_and_update(self):
+        resp = self.client.post('/planer/api/plansze/', {
+            'name': 'N', 'rows': 3, 'cols': 3, 'dots': {'row': [0, 2], 'col': [0, 2], 'color': ['red', 'red']},
+        }, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(len(resp.data['dots']), 2)
+        board = GameBoard.objects.get(id=resp.data['id'])
+        self.assertEqual((board.user, board.dots.count()), (self.user, 2))
+
+        url = f'/planer/api/plansze/{board.id}/'
+        resp = self.client.patch(url, {'dots': [{'row': 1, 'col': 1, 'color': 'blue'}]}, format='json')
+        self.assertEqual(resp.data['dots'], [{'row': 1, 'col': 1, 'color': 'blue'}])
+        self.assertEqual(self.client.patch(url, {'rows': 1}, format='json').status_code, 400)  # dot (1, 1) would be off
+        bad = {'dots': [{'row': 0, 'col': 0, 'color': 'red'}, {'row': 0, 'col': 0, 'color': 'blue'}]}
+        self.assertIn('dots', self.client.patch(url, bad, format='json').data)
+        self.assertEqual(self.client.patch(url, {'dots': {'row': [0]}}, format='json').status_code, 400)
+
+    def test_only_the_owner_changes_a_board(self):
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.client.patch(self.url, {'name': 'X'}, format='json').status_code, 404)
+        self.assertEqual(self.client.delete(self.url).status_code, 404)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+
+
+class DotAPITestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.board = GameBoard.objects.create(user=self.user, name='B', rows=2, cols=2)
+        self.client.force_authenticate(self.user)
+        self.url = f'/planer/api/plansze/{self.board.id}/kropki/'
+
+    def test_dots_keep_the_board_version_current(self):
+        resp = self.client.post(self.url, {'row': 0, 'col': 1, 'color': 'red'}, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(self.client.post(self.url, {'row': 0, 'col': 1, 'color': 'blue'}).status_code, 400)
+        self.assertEqual(self.client.post(self.url, {'row': 2, 'col': 0, 'color': 'blue'}).status_code, 400)
+        dot_url = f'{self.url}{resp.data["id"]}/'
+        self.client.patch(dot_url, {'row': 1}, format='json')
+        self.assertEqual(self.client.get(f'/planer/api/plansze/{self.board.id}/').data['dots'],
+                         [{'row': 1, 'col': 1, 'color': 'red'}])
+        version = GameBoard.objects.get(id=self.board.id).version
+        self.assertEqual(self.client.delete(dot_url).status_code, 204)
+        self.assertEqual(GameBoard.objects.get(id=self.board.id).version, version + 1)
+        self.assertEqual(self.client.get(self.url).data, [])
+
+        other = User.objects.create_user(username='other', password='pass')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.client.post(self.url, {'row': 0, 'col': 0, 'color': 'red'}).status_code, 404)
+
+
+class UserPathAPITestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.board = GameBoard.objects.create(user=self.user, name='B', rows=1, cols=4)
+        save_board_dots(self.board, {(0, 0): 'red', (0, 3): 'red'})
+        self.client.force_authenticate(self.user)
+        self.cells = [{'row': 0, 'col': c, 'color': 'red', 'route': 0} for c in (1, 2)]
+
+    def test_create_list_and_layouts(self):
+        resp = self.client.post('/planer/api/sciezki/', {
+            'board': self.board.id, 'name': 'p', 'path': {'row': [0, 0], 'col': [1, 2], 'color': ['red'] * 2, 'route': [0, 0]},
+        }, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data['path'], self.cells)
+        url = f'/planer/api/sciezki/{resp.data["id"]}/'
+        self.assertEqual(self.client.get(url, {'path': 'columns'}).data['path']['col'], [1, 2])
+
+        with self.assertNumQueries(1):
+            listing = self.client.get('/planer/api/sciezki/', {'board': self.board.id}).data['results']
+        self.assertEqual([(p['name'], p['step_count']) for p in listing], [('p', 2)])
+        self.assertNotIn('path', listing[0])
+
+        bad = [{'row': 0, 'col': 1, 'color': 'blue', 'route': 0}]
+        self.assertIn('path', self.client.patch(url, {'path': bad}, format='json').data)
+        resp = self.client.patch(url, {'path': self.cells[:1], 'name': 'q'}, format='json')
+        self.assertEqual((resp.data['revision'], resp.data['step_count']), (1, 1))
+
+    def test_paths_are_private(self):
+        user_path = UserPath.objects.create(board=self.board, user=self.user, name='p', path=self.cells)
+        other = User.objects.create_user(username='other', password='pass')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(f'/planer/api/sciezki/{user_path.id}/').status_code, 404)
+        self.assertEqual(self.client.get('/planer/api/sciezki/').data['results'], [])
+
+
+class PointViewSetTestCase(APITestCase):
+    def test_points_of_own_routes(self):
+        user = User.objects.create_user(username='user', password='pass')
+        other = User.objects.create_user(username='other', password='pass')
+        route = Route.objects.create(user=user, name='R', background=BackgroundImage.objects.create(name='bg', image='t.jpg'))
+        self.client.force_authenticate(user)
+        url = f'/planer/api/trasy/{route.id}/punkty/'
+        resp = self.client.post(url, {'x': 1, 'y': 2}, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(self.client.patch(f'{url}{resp.data["id"]}/', {'x': 5}, format='json').data['x'], 5)
+        self.assertEqual(Point.objects.get().x, 5)
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.post(url, {'x': 1, 'y': 2}, format='json').status_code, 404)
+        self.assertEqual(self.client.get(f'{url}{resp.data["id"]}/').status_code, 404)
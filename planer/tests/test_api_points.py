@@ -28,7 +28,7 @@ class ApiPointsTestCase(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + token)
         resp = self.client.get(f'/planer/api/trasy/{self.route.id}/points/')
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
-        self.assertTrue(isinstance(resp.data, list))
-        self.assertGreaterEqual(len(resp.data), 1)
-        self.assertEqual(resp.data[0]['x'], self.point.x)
-        self.assertEqual(resp.data[0]['y'], self.point.y)
+        self.assertTrue(isinstance(resp.data['results'], list))
+        self.assertGreaterEqual(len(resp.data['results']), 1)
+        self.assertEqual(resp.data['results'][0]['x'], self.point.x)
+        self.assertEqual(resp.data['results'][0]['y'], self.point.y)
@@ -0,0 +1,54 @@
+import json
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+from rest_framework import status
+from planer.ingest import ingest_points
+from planer.models import Route, Point, BackgroundImage
+
+class ApiPointsBatchTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.bg = BackgroundImage.objects.create(name='bg', image='test.jpg')
+        self.route = Route.objects.create(user=self.user, background=self.bg, name='Route1')
+        self.client.force_authenticate(self.user)
+        self.url = f'/planer/api/trasy/{self.route.id}/points/batch/'
+
+    def test_batch_json_array(self):
+        data = [{'x': i, 'y': i * 2} for i in range(50)]
+        resp = self.client.post(self.url, data, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(resp.data, {'created': 50, 'errors': []})
+        self.assertEqual(list(self.route.points.order_by('id').values_list('x', 'y'))[-1], (49.0, 98.0))
+
+    def test_batch_ndjson_stream(self):
+        body = '\n'.join(json.dumps({'x': i, 'y': 0}) for i in range(10)) + '\n'
+        resp = self.client.post(self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.route.points.count(), 10)
+
+    def test_malformed_ndjson_line(self):
+        resp = self.client.post(self.url, '{"x": 1, "y": 1}\n{oops\n', content_type='application/x-ndjson')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.route.points.count(), 0)
+
+    def test_invalid_item_rolls_back_everything(self):
+        data = [{'x': 1, 'y': 1}, {'x': 'bad', 'y': 1}, {'x': 2, 'y': 2}]
+        resp = self.client.post(self.url, data, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(resp.data['created'], 0)
+        self.assertEqual(resp.data['errors'][0]['items'][0]['index'], 1)
+        self.assertIn('x', resp.data['errors'][0]['items'][0]['errors'])
+        self.assertEqual(self.route.points.count(), 0)
+
+    def test_batch_requires_list(self):
+        resp = self.client.post(self.url, {'x': 1, 'y': 1}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_chunks_report_their_own_errors(self):
+        items = [{'x': i, 'y': i} for i in range(10)]
+        items[3] = {'x': 1}
+        items[8] = {'y': 1}
+        report = ingest_points(self.route, items, chunk_size=4)
+        self.assertEqual([e['chunk'] for e in report['errors']], [0, 2])
+        self.assertEqual([e['items'][0]['index'] for e in report['errors']], [3, 8])
+        self.assertFalse(Point.objects.exists())
@@ -0,0 +1,75 @@
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+from rest_framework import status
+from planer.models import Route, Point, BackgroundImage
+
+class ApiQueryCountTestCase(APITestCase):
+    """A page must cost the same number of queries no matter how many routes or points it holds."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.force_authenticate(self.user)
+
+    def make_routes(self, count, points=3):
+        for i in range(count):
+            bg = BackgroundImage.objects.create(name=f'bg{i}', image='test.jpg')
+            route = Route.objects.create(user=self.user, background=bg, name=f'R{i}')
+            Point.objects.bulk_create([Point(route=route, x=j, y=j) for j in range(points)])
+
+    def test_route_list_constant_queries(self):
+        self.make_routes(1)
+        with self.assertNumQueries(2):
+            resp = self.client.get('/planer/api/trasy/')
+        self.assertEqual(len(resp.data['results']), 1)
+        self.make_routes(20, points=10)
+        with self.assertNumQueries(2):
+            resp = self.client.get('/planer/api/trasy/')
+        self.assertEqual(len(resp.data['results']), 21)
+
+    def test_route_list_without_points_single_query(self):
+        self.make_routes(5)
+        with self.assertNumQueries(1):
+            resp = self.client.get('/planer/api/trasy/', {'fields': 'id,name,background'})
+        self.assertNotIn('points', resp.data['results'][0])
+
+    def test_route_detail_constant_queries(self):
+        self.make_routes(1, points=50)
+        route = Route.objects.get()
+        with self.assertNumQueries(3):  # ETag stamp, route with background, points
+            self.client.get(f'/planer/api/trasy/{route.id}/')
+
+    def test_points_constant_queries(self):
+        self.make_routes(1, points=200)
+        route = Route.objects.get()
+        with self.assertNumQueries(2):
+            resp = self.client.get(f'/planer/api/trasy/{route.id}/points/')
+        self.assertEqual(len(resp.data['results']), 50)
+
+class ApiCursorPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.bg = BackgroundImage.objects.create(name='bg', image='test.jpg')
+        self.client.force_authenticate(self.user)
+
+    def test_walk_pages_in_id_order(self):
+        routes = [Route.objects.create(user=self.user, background=self.bg, name=f'R{i}') for i in range(7)]
+        seen = []
+        url = '/planer/api/trasy/?page_size=3'
+        while url:
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            seen += [r['id'] for r in resp.data['results']]
+            # A route created mid-walk must not shift later pages
+            if len(seen) == 3:
+                Route.objects.create(user=self.user, background=self.bg, name='late')
+            url = resp.data['next']
+        self.assertEqual(seen[:7], [r.id for r in routes])
+        self.assertEqual(len(seen), 8)
+
+    def test_points_pages(self):
+        route = Route.objects.create(user=self.user, background=self.bg, name='R')
+        Point.objects.bulk_create([Point(route=route, x=i, y=i) for i in range(5)])
+        resp = self.client.get(f'/planer/api/trasy/{route.id}/points/', {'page_size': 2})
+        self.assertEqual([p['x'] for p in resp.data['results']], [0, 1])
+        resp = self.client.get(resp.data['next'])
+        self.assertEqual([p['x'] for p in resp.data['results']], [2, 3])
@@ -0,0 +1,48 @@
+import json
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+from rest_framework import status
+from planer.models import Route, Point, BackgroundImage
+from planer.streaming import stream_routes
+
+class ApiRouteStreamingTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        other = User.objects.create_user(username='other', password='pass')
+        self.bg = BackgroundImage.objects.create(name='bg', image='test.jpg')
+        self.routes = [Route.objects.create(user=self.user, background=self.bg, name=f'R{i}') for i in range(3)]
+        Route.objects.create(user=other, background=self.bg, name='Foreign')
+        for i, route in enumerate(self.routes):
+            for j in range(i * 2):
+                Point.objects.create(route=route, x=j, y=i)
+        self.client.force_authenticate(self.user)
+
+    def body(self, resp):
+        return b''.join(resp.streaming_content).decode()
+
+    def test_ndjson_matches_serializer_output(self):
+        expected = self.client.get('/planer/api/trasy/', {'stream': 1})
+        resp = self.client.get('/planer/api/trasy/', {'format': 'ndjson'})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in self.body(resp).splitlines()]
+        self.assertEqual(lines, json.loads(self.body(expected)))
+        self.assertEqual([r['name'] for r in lines], ['R0', 'R1', 'R2'])
+        self.assertEqual(lines[2]['points'][-1]['x'], 3.0)
+        self.assertEqual(lines[1]['background']['id'], self.bg.id)
+
+    def test_streamed_json_equals_regular_list(self):
+        regular = self.client.get('/planer/api/trasy/').json()['results']
+        streamed = json.loads(self.body(self.client.get('/planer/api/trasy/', {'stream': 1})))
+        self.assertEqual(streamed, regular)
+
+    def test_fields_projection_skips_points_query(self):
+        with self.assertNumQueries(1):
+            rows = list(stream_routes(Route.objects.filter(user=self.user), ['id', 'name']))
+        self.assertEqual(json.loads(b''.join(rows)), [{'id': r.id, 'name': r.name} for r in self.routes])
+        resp = self.client.get('/planer/api/trasy/', {'fields': 'name'})
+        self.assertEqual(resp.data['results'][0], {'name': 'R0'})
+
+    def test_unknown_field_rejected(self):
+        resp = self.client.get('/planer/api/trasy/', {'format': 'ndjson', 'fields': 'id,secret'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
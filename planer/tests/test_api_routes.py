@@ -32,9 +32,9 @@ class ApiRoutesTestCase(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + token)
         resp = self.client.get('/planer/api/trasy/')
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(resp.data), 1)
-        self.assertEqual(resp.data[0]['name'], 'Route2')
-        self.assertEqual(resp.data[0]['id'], self.route2.id)
+        self.assertEqual(len(resp.data['results']), 1)
+        self.assertEqual(resp.data['results'][0]['name'], 'Route2')
+        self.assertEqual(resp.data['results'][0]['id'], self.route2.id)
 
     def test_get_route_detail(self):
         token = self.get_token('user1', 'pass1')
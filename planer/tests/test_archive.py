@@ -0,0 +1,146 @@
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from planer.archive import ArchiveError, export_archive, import_archive, read_records
+from planer.boards import save_board_dots
+from planer.models import ArchiveImport, BackgroundImage, Dot, GameBoard, Pair, Point, Route, UserPath
+
+
+def make_data(user):
+    board = GameBoard.objects.create(user=user, name='B', rows=3, cols=4)
+    save_board_dots(board, {(0, 0): 'red', (0, 3): 'red', (2, 0): 'blue', (2, 3): 'blue'})
+    UserPath.objects.create(board=board, user=user, name='p', path=[
+        {'row': 0, 'col': c, 'color': 'red', 'route': 0} for c in (1, 2)
+    ])
+    background = BackgroundImage.objects.create(name='bg', image='backgrounds/a.jpg')
+    route = Route.objects.create(user=user, background=background, name='R')
+    Point.objects.bulk_create(Point(route=route, x=i, y=-i, seq=2500 - i) for i in range(2500))  # reversed order
+    Pair.objects.create(route=route, x1=0, y1=1, x2=2, y2=3)
+    return board, route
+
+
+def snapshot(user):
+    route = Route.objects.get(user=user)
+    board = GameBoard.objects.get(user=user)
+    return {
+        'board': (board.name, board.rows, board.cols),
+        'dots': sorted(Dot.objects.filter(board=board).values_list('row', 'col', 'color')),
+        'paths': [(p.name, p.path, p.step_count) for p in UserPath.objects.filter(board=board)],
+        'route': (route.name, route.background.image.name),
+        'points': list(Point.objects.filter(route=route).order_by('seq', 'id').values_list('x', 'y')),
+        'pairs': list(Pair.objects.filter(route=route).values_list('x1', 'y1', 'x2', 'y2')),
+    }
+
+
+class ArchiveTestCase(TestCase):
+    def setUp(self):
+        self.source = User.objects.create_user(username='source', password='pass')
+        self.target = User.objects.create_user(username='target', password='pass')
+        make_data(self.source)
+        self.lines = b''.join(export_archive(self.source)).splitlines()
+
+    def records(self, lines=None):
+        return read_records(self.lines if lines is None else lines)
+
+    def test_round_trip(self):
+        report = import_archive(self.target, self.records(), batch_size=2)
+        self.assertTrue(report['complete'])
+        self.assertEqual(report['counts'], {'boards': 1, 'dots': 4, 'paths': 1, 'routes': 1, 'points': 2500, 'pairs': 1})
+        self.assertEqual(snapshot(self.target), snapshot(self.source))
+        self.assertEqual(BackgroundImage.objects.count(), 1)  # matched by image path
+        self.assertEqual(json.loads(self.lines[-1])['counts'], report['counts'])
+
+    def test_points_are_packed_per_record(self):
+        kinds = [json.loads(line)['type'] for line in self.lines]
+        self.assertEqual(kinds.count('points'), 3)
+        self.assertEqual(kinds[0], 'planer-archive')
+
+    def test_interrupted_import_resumes(self):
+        report = import_archive(self.target, self.records(self.lines[:6]), batch_size=2)
+        self.assertFalse(report['complete'])
+        self.assertEqual(report['position'], 6)
+        report = import_archive(self.target, self.records(), batch_size=2)
+        self.assertEqual(report['resumed_from'], 6)
+        self.assertTrue(report['complete'])
+        self.assertEqual(snapshot(self.target), snapshot(self.source))
+        # A finished archive is not imported twice
+        import_archive(self.target, self.records())
+        self.assertEqual(Route.objects.filter(user=self.target).count(), 1)
+
+    def test_bad_record_keeps_committed_batches(self):
+        lines = self.lines[:3] + [b'{"type": "path", "board": 99, "name": "x", "path": []}'] + self.lines[3:]
+        with self.assertRaises(ArchiveError) as caught:
+            import_archive(self.target, self.records(lines), batch_size=2)
+        self.assertEqual(caught.exception.position, 4)
+        self.assertEqual(ArchiveImport.objects.get(user=self.target).position, 3)
+        self.assertEqual(GameBoard.objects.filter(user=self.target).count(), 1)
+        with self.assertRaises(ArchiveError):
+            import_archive(self.target, self.records([b'{"type": "board"}']))
+
+    def test_invalid_path_rejected(self):
+        self.assertEqual(json.loads(self.lines[3])['type'], 'path')
+        bad = json.dumps({'type': 'path', 'board': json.loads(self.lines[1])['id'], 'name': 'x',
+                          'path': [{'row': 5, 'col': 0, 'color': 'red', 'route': 0}]}).encode()
+        with self.assertRaises(ArchiveError) as caught:
+            import_archive(self.target, self.records(self.lines[:3] + [bad] + self.lines[4:]))
+        self.assertEqual(caught.exception.position, 4)
+        self.assertIn('#0', str(caught.exception))
+        self.assertFalse(UserPath.objects.filter(user=self.target).exists())
+
+    def test_dots_checked_against_board(self):
+        header = json.dumps({'type': 'planer-archive', 'version': 1, 'id': 'dots'}).encode()
+        board = b'{"type": "board", "id": 1, "name": "B", "rows": 3, "cols": 3}'
+        for dots in ([[50, 50, 'red']], [[1, 5, 'red']], [[0, 0, 'red'], [0, 0, 'blue']], [[0, 0, 'red', 1]]):
+            record = json.dumps({'type': 'dots', 'board': 1, 'dots': dots}).encode()
+            with self.assertRaises(ArchiveError, msg=dots) as caught:
+                import_archive(self.target, self.records([header, board, record]), restart=True)
+            self.assertEqual(caught.exception.position, 3)
+        # A cell taken by a record of an earlier, interrupted import
+        first = b'{"type": "dots", "board": 1, "dots": [[0, 0, "red"]]}'
+        again = b'{"type": "dots", "board": 1, "dots": [[2, 2, "red"], [0, 0, "blue"]]}'
+        import_archive(self.target, self.records([header, board, first]), restart=True)
+        with self.assertRaises(ArchiveError) as caught:
+            import_archive(self.target, self.records([header, board, first, again]))
+        self.assertEqual(caught.exception.position, 4)
+        self.assertIn('(0, 0)', str(caught.exception))
+
+    def test_commands_round_trip_gzip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'archive.ndjson.gz')
+            call_command('export_archive', 'source', path, stdout=StringIO())
+            with gzip.open(path) as f:
+                self.assertEqual(json.loads(f.readline())['type'], 'planer-archive')
+            out = StringIO()
+            call_command('import_archive', 'target', path, stdout=out)
+            self.assertIn('2500 points', out.getvalue())
+            with self.assertRaises(CommandError):
+                call_command('import_archive', 'nobody', path, stdout=StringIO())
+        self.assertEqual(snapshot(self.target), snapshot(self.source))
+
+
+class ArchiveAPITestCase(APITestCase):
+    def test_export_and_import(self):
+        source = User.objects.create_user(username='source', password='pass')
+        make_data(source)
+        self.client.force_authenticate(source)
+        resp = self.client.get('/planer/api/archiwum/')
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+        body = b''.join(resp.streaming_content)
+
+        target = User.objects.create_user(username='target', password='pass')
+        self.client.force_authenticate(target)
+        resp = self.client.post('/planer/api/archiwum/', body, content_type='application/x-ndjson')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(snapshot(target), snapshot(source))
+        resp = self.client.post('/planer/api/archiwum/', b'{"type": "other"}\n', content_type='application/x-ndjson')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.data['record'], 1)
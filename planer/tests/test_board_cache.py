@@ -0,0 +1,75 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+from planer.board_cache import BoardCache, board_cache, get_snapshot
+from planer.boards import save_board_dots
+from planer.models import GameBoard, Dot
+
+class BoardCacheTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.board = GameBoard.objects.create(user=self.user, name='B', rows=4, cols=4)
+        save_board_dots(self.board, {(0, 0): 'red', (3, 3): 'red', (1, 1): 'blue'})
+        self.board.refresh_from_db()
+        board_cache.clear()
+
+    def test_snapshot_contents_and_hits(self):
+        snapshot = get_snapshot(self.board)
+        self.assertEqual([d['color'] for d in snapshot.dots], ['red', 'red', 'blue'])
+        self.assertEqual(list(snapshot.pairs), ['red'])
+        with self.assertNumQueries(0):
+            self.assertIs(get_snapshot(self.board), snapshot)
+        self.assertEqual(board_cache.stats()['hits'], 1)
+        self.assertEqual(board_cache.stats()['misses'], 1)
+
+    def test_dot_changes_bump_version_once(self):
+        version = self.board.version
+        save_board_dots(self.board, {(0, 0): 'red', (3, 3): 'red', (1, 1): 'blue', (2, 1): 'blue'})
+        self.board.refresh_from_db()
+        self.assertEqual(self.board.version, version + 1)
+        self.assertEqual(list(get_snapshot(self.board).pairs), ['red', 'blue'])
+        Dot.objects.create(board=self.board, row=2, col=2, color='green')
+        self.board.refresh_from_db()
+        self.assertEqual(self.board.version, version + 2)
+
+    def test_dot_delete_and_stale_board_save(self):
+        version = self.board.version
+        stale = GameBoard.objects.get(pk=self.board.pk)
+        save_board_dots(self.board, {(0, 0): 'red', (3, 3): 'red'})
+        self.board.refresh_from_db()
+        self.assertEqual(self.board.version, version + 1)
+        self.assertEqual([d['color'] for d in get_snapshot(self.board).dots], ['red', 'red'])
+        # A full save of an instance loaded before the delete doesn't roll the version back
+        stale.name = 'Renamed'
+        stale.save()
+        self.board.refresh_from_db()
+        self.assertEqual((self.board.name, self.board.version), ('Renamed', version + 1))
+
+    def test_rollback_keeps_version(self):
+        version = self.board.version
+        with transaction.atomic():
+            save_board_dots(self.board, {})
+            transaction.set_rollback(True)
+        self.board.refresh_from_db()
+        self.assertEqual(self.board.version, version)
+        self.assertEqual(len(get_snapshot(self.board).dots), 3)
+
+    def test_lru_eviction(self):
+        cache = BoardCache(maxsize=1)
+        other = GameBoard.objects.create(user=self.user, name='C', rows=2, cols=2)
+        cache.get(self.board)
+        cache.get(other)
+        cache.get(other)
+        self.assertEqual(cache.stats(), {'size': 1, 'maxsize': 1, 'hits': 1, 'misses': 2, 'evictions': 1})
+
+    def test_views_reuse_snapshot(self):
+        self.client.login(username='user', password='pass')
+        self.client.get(reverse('draw_path', args=[self.board.id]))
+        misses = board_cache.stats()['misses']
+        resp = self.client.get(reverse('create_route_on_board', args=[self.board.id]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(board_cache.stats()['misses'], misses)
+        resp = self.client.post(reverse('edit_board', args=[self.board.id]), {'delete_pair_color': 'red'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(list(resp.context['pairs']), [])
@@ -0,0 +1,89 @@
+import json
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from planer.boards import parse_dots, save_board_dots
+from planer.models import MAX_BOARD_SIDE, GameBoard, Dot
+
+class ParseDotsTestCase(TestCase):
+    def test_valid_dots(self):
+        dots = parse_dots(json.dumps([
+            {'row': 0, 'col': 0, 'color': '#e41a1c'},
+            {'row': 2, 'col': 3, 'color': '#e41a1c'},
+        ]), 3, 4)
+        self.assertEqual(dots, {(0, 0): '#e41a1c', (2, 3): '#e41a1c'})
+
+    def test_empty_input(self):
+        self.assertEqual(parse_dots('', 3, 3), {})
+        self.assertEqual(parse_dots(None, 3, 3), {})
+
+    def test_rejects_invalid_input(self):
+        for payload in [
+            'not json',
+            '{"row": 0}',
+            '[{"row": 0, "col": 0}]',
+            '[{"row": "0", "col": 0, "color": "#fff"}]',
+            '[{"row": 3, "col": 0, "color": "#fff"}]',
+            '[{"row": 0, "col": -1, "color": "#fff"}]',
+            '[{"row": 0, "col": 0, "color": "#fff"}, {"row": 0, "col": 0, "color": "#000"}]',
+        ]:
+            with self.assertRaises(ValidationError, msg=payload):
+                parse_dots(payload, 3, 3)
+
+class SaveBoardDotsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.board = GameBoard.objects.create(user=self.user, name='B', rows=5, cols=5)
+
+    def stored(self):
+        return {(d.row, d.col): d.color for d in self.board.dots.all()}
+
+    def test_diff_touches_only_changed_rows(self):
+        save_board_dots(self.board, {(0, 0): 'red', (0, 1): 'red', (1, 1): 'blue'})
+        kept_id = self.board.dots.get(row=0, col=0).id
+        result = save_board_dots(self.board, {(0, 0): 'red', (0, 1): 'green', (4, 4): 'blue'})
+        self.assertEqual(result, (1, 1, 1))
+        self.assertEqual(self.stored(), {(0, 0): 'red', (0, 1): 'green', (4, 4): 'blue'})
+        self.assertEqual(self.board.dots.get(row=0, col=0).id, kept_id)
+
+    def test_unchanged_save_only_reads(self):
+        dots = {(r, c): 'red' for r in range(5) for c in range(5)}
+        save_board_dots(self.board, dots)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(save_board_dots(self.board, dots), (0, 0, 0))
+        statements = [q['sql'].split()[0] for q in ctx.captured_queries]
+        self.assertEqual([s for s in statements if s in ('INSERT', 'UPDATE', 'DELETE')], [])
+        self.assertEqual(statements.count('SELECT'), 1)
+
+class WebBoardSaveTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.login(username='user', password='pass')
+
+    def test_create_board_with_dots(self):
+        resp = self.client.post(reverse('create_board'), {
+            'name': 'Board', 'rows': 3, 'cols': 3,
+            'dots_json': json.dumps([{'row': 0, 'col': 0, 'color': '#e41a1c'}, {'row': 2, 'col': 2, 'color': '#e41a1c'}]),
+        })
+        self.assertEqual(resp.status_code, 302)
+        board = GameBoard.objects.get(name='Board')
+        self.assertEqual(board.dots.count(), 2)
+
+    def test_out_of_bounds_dot_rejected(self):
+        resp = self.client.post(reverse('create_board'), {
+            'name': 'Board', 'rows': 3, 'cols': 3,
+            'dots_json': json.dumps([{'row': 5, 'col': 0, 'color': '#e41a1c'}]),
+        })
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(GameBoard.objects.filter(name='Board').exists())
+        self.assertFalse(Dot.objects.exists())
+
+    def test_board_size_bounded(self):
+        for rows in (0, MAX_BOARD_SIDE + 1):
+            resp = self.client.post(reverse('create_board'), {'name': 'Board', 'rows': rows, 'cols': 3, 'dots_json': '[]'})
+            self.assertEqual(resp.status_code, 200)
+            self.assertIn('rows', resp.context['form'].errors)
+        self.assertFalse(GameBoard.objects.exists())
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import time
+from django.test import SimpleTestCase
+from planer.broker import FanoutHub, InMemoryBroker, SQLiteBroker, DROP_NEWEST, parse_topics
+
+class InMemoryBrokerTestCase(SimpleTestCase):
+    def test_events_delivered_in_order_to_every_subscriber(self):
+        broker = InMemoryBroker()
+        subs = [broker.subscribe() for _ in range(3)]
+        for i in range(5):
+            broker.publish('newBoard', {'board_id': i})
+        for sub in subs:
+            events = sub.get(timeout=0)
+            self.assertEqual([e.id for e in events], [1, 2, 3, 4, 5])
+            self.assertIn(b'event: newBoard\ndata: {"board_id": 4}\n\n', events[-1].payload)
+
+    def test_unsubscribed_client_receives_nothing(self):
+        broker = InMemoryBroker()
+        sub = broker.subscribe()
+        broker.unsubscribe(sub)
+        broker.publish('newBoard', {})
+        self.assertEqual(sub.get(timeout=0), [])
+
+    def test_slow_consumer_drops_oldest(self):
+        broker = InMemoryBroker(maxsize=3)
+        sub = broker.subscribe()
+        for i in range(5):
+            broker.publish('newPath', {'path_id': i})
+        self.assertEqual([e.id for e in sub.get(timeout=0)], [3, 4, 5])
+        self.assertEqual(sub.dropped, 2)
+
+    def test_slow_consumer_drops_newest(self):
+        broker = InMemoryBroker(maxsize=3, policy=DROP_NEWEST)
+        sub = broker.subscribe()
+        for i in range(5):
+            broker.publish('newPath', {'path_id': i})
+        self.assertEqual([e.id for e in sub.get(timeout=0)], [1, 2, 3])
+        self.assertEqual(sub.dropped, 2)
+
+    def test_topics_filter_delivery_and_replay(self):
+        broker = InMemoryBroker()
+        everything = broker.subscribe()
+        board = broker.subscribe(topics={'board:1'})
+        both = broker.subscribe(topics={'board:1', 'user:2'})
+        broker.publish('newPath', {'path_id': 1}, ('global', 'board:1', 'user:2'))
+        broker.publish('newPath', {'path_id': 2}, ('global', 'board:3', 'user:4'))
+        self.assertEqual([e.id for e in everything.get(timeout=0)], [1, 2])
+        self.assertEqual([e.id for e in board.get(timeout=0)], [1])
+        self.assertEqual([e.id for e in both.get(timeout=0)], [1])  # once, though it matches two topics
+        resumed = broker.subscribe(last_event_id=0, topics={'user:4'})
+        self.assertEqual([e.id for e in resumed.get(timeout=0)], [2])
+
+    def test_hub_index_drops_empty_topics(self):
+        hub = FanoutHub()
+        subs = [hub.subscribe({'board:1', 'global'}), hub.subscribe({'board:1'})]
+        self.assertEqual(len(hub), 2)
+        for sub in subs + subs:  # unsubscribing twice is harmless
+            hub.unsubscribe(sub)
+        self.assertEqual((len(hub), dict(hub._index)), (0, {}))
+
+    def test_parse_topics(self):
+        self.assertEqual(parse_topics([]), {'global'})
+        self.assertEqual(parse_topics(['board:5', 'user:3', 'board:5']), {'board:5', 'user:3'})
+        for bad in ('board:', 'board:0', 'board:x', 'path:1', 'global '):
+            with self.assertRaises(ValueError):
+                parse_topics([bad])
+
+class SQLiteBrokerTestCase(SimpleTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def test_events_cross_broker_instances(self):
+        # Two instances on one file stand in for two worker processes.
+        publisher = SQLiteBroker(self.path, poll_interval=0.01)
+        listener = SQLiteBroker(self.path, poll_interval=0.01)
+        self.addCleanup(publisher.close)
+        self.addCleanup(listener.close)
+        sub = listener.subscribe()
+        board = listener.subscribe(topics={'board:2'})
+        publisher.publish('newBoard', {'board_id': 1}, ('global', 'board:1'))
+        publisher.publish('newBoard', {'board_id': 2}, ('global', 'board:2'))
+        received = []
+        deadline = time.monotonic() + 5
+        while len(received) < 2 and time.monotonic() < deadline:
+            received.extend(sub.get(timeout=0.1))
+        self.assertEqual([e.data for e in received], ['{"board_id": 1}', '{"board_id": 2}'])
+        self.assertEqual([e.data for e in board.get(timeout=0)], ['{"board_id": 2}'])
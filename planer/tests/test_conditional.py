@@ -0,0 +1,115 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from planer.boards import save_board_dots
+from planer.models import BackgroundImage, GameBoard, Point, Route, UserPath
+
+
+class RouteRetrieveConditionalTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.bg = BackgroundImage.objects.create(name='bg', image='test.jpg')
+        self.route = Route.objects.create(user=self.user, background=self.bg, name='R')
+        Point.objects.create(route=self.route, x=1, y=2)
+        self.client.force_authenticate(self.user)
+        self.url = f'/planer/api/trasy/{self.route.id}/'
+
+    def test_not_modified_and_cached(self):
+        resp = self.client.get(self.url)
+        etag = resp['ETag']
+        with self.assertNumQueries(1):  # the stamp only
+            self.assertEqual(self.client.get(self.url, headers={'If-None-Match': etag}).status_code, 304)
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.data, resp.data)
+        self.assertEqual(cached['ETag'], etag)
+        # Another projection is another representation
+        self.assertNotEqual(self.client.get(self.url, {'fields': 'id,name'})['ETag'], etag)
+
+    def test_long_route_keeps_etag_but_is_not_cached(self):
+        with mock.patch('planer.api.ROUTE_CACHE_MAX_POINTS', 0):
+            resp = self.client.get(self.url)
+            with self.assertNumQueries(1):
+                self.assertEqual(self.client.get(self.url, headers={'If-None-Match': resp['ETag']}).status_code, 304)
+            with self.assertNumQueries(3):  # stamp, route with background, points
+                self.assertEqual(self.client.get(self.url).data, resp.data)
+            self.client.get(self.url, {'fields': 'id,name'})
+            with self.assertNumQueries(1):  # no points, so cached
+                self.client.get(self.url, {'fields': 'id,name'})
+
+    def test_changes_to_points_route_and_background_change_etag(self):
+        etags = {self.client.get(self.url)['ETag']}
+        self.client.post(self.url + 'points/', {'x': 3, 'y': 4}, format='json')
+        resp = self.client.get(self.url)
+        self.assertEqual(len(resp.data['points']), 2)
+        etags.add(resp['ETag'])
+        Point.objects.filter(route=self.route).delete()  # bulk delete: no signal, so invalidate by hand
+        from planer.packing import invalidate_route_geometry
+        invalidate_route_geometry(self.route.id)
+        etags.add(self.client.get(self.url)['ETag'])
+        self.client.patch(self.url, {'name': 'Renamed'}, format='json')
+        etags.add(self.client.get(self.url)['ETag'])
+        BackgroundImage.objects.filter(id=self.bg.id).update(content_hash='a' * 64, tile_levels=1, derived_format='jpg')
+        resp = self.client.get(self.url, headers={'If-None-Match': resp['ETag']})
+        self.assertEqual(resp.status_code, 200)
+        self.assertIsNotNone(resp.data['background']['tiles'])
+        etags.add(resp['ETag'])
+        self.assertEqual(len(etags), 5)
+
+    def test_other_users_route_is_404(self):
+        other = User.objects.create_user(username='other', password='pass')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get('/planer/api/trasy/abc/').status_code, 404)
+
+
+class BoardPageConditionalTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.board = GameBoard.objects.create(user=self.user, name='B', rows=4, cols=4)
+        save_board_dots(self.board, {(0, 0): 'red', (3, 3): 'red', (1, 1): 'blue', (2, 2): 'blue'})
+        self.client.login(username='user', password='pass')
+
+    def revalidate(self, url):
+        first = self.client.get(url)  # sets the CSRF cookie
+        self.assertNotIn('ETag', first)
+        etag = self.client.get(url)['ETag']
+        return etag, self.client.get(url, headers={'If-None-Match': etag}).status_code
+
+    def test_draw_path_revalidates_until_dots_change(self):
+        url = reverse('draw_path', args=[self.board.id])
+        etag, status = self.revalidate(url)
+        self.assertEqual(status, 304)
+        save_board_dots(self.board, {(0, 0): 'red', (3, 3): 'red'})
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_draw_path_etag_covers_the_edited_path_and_user(self):
+        user_path = UserPath.objects.create(board=self.board, user=self.user, name='p', path=[])
+        url = reverse('draw_path', args=[self.board.id]) + f'?path_id={user_path.id}'
+        etag, status = self.revalidate(url)
+        self.assertEqual(status, 304)
+        user_path.name = 'renamed'
+        user_path.save(update_fields=['name'])
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
+        User.objects.create_user(username='other', password='pass')
+        self.client.login(username='other', password='pass')
+        url = reverse('draw_path', args=[self.board.id])
+        etag = self.client.get(url)['ETag']
+        self.client.login(username='user', password='pass')
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_edit_board_pairs_fragment_follows_version(self):
+        url = reverse('edit_board', args=[self.board.id])
+        etag, status = self.revalidate(url)
+        self.assertEqual(status, 304)
+        resp = self.client.post(url, {'delete_pair_color': 'blue'})
+        self.assertNotContains(resp, 'value="blue"')
+        self.assertContains(resp, 'value="red"')
+        resp = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotContains(resp, 'value="blue"')
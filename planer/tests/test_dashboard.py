@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from planer.models import GameBoard, UserPath
+from planer.views import DASHBOARD_PAGE_SIZE
+
+class DashboardTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.other = User.objects.create_user(username='other', password='pass')
+        self.board = GameBoard.objects.create(user=self.user, name='Mine', rows=3, cols=3)
+        self.client.login(username='user', password='pass')
+
+    def test_step_count_follows_path(self):
+        user_path = UserPath.objects.create(board=self.board, user=self.user, path=[{}, {}])
+        self.assertEqual(user_path.step_count, 2)
+        user_path.path = [{}]
+        user_path.save(update_fields=['path'])
+        self.assertEqual(UserPath.objects.get().step_count, 1)
+
+    def test_sections_paged_without_path_bodies(self):
+        n = DASHBOARD_PAGE_SIZE * 2 + 3
+        UserPath.objects.bulk_create([
+            UserPath(board=self.board, user=self.user, name=f'P{i}', path=[], step_count=i) for i in range(n)
+        ])
+        GameBoard.objects.bulk_create([
+            GameBoard(user=self.other, name=f'O{i}', rows=2, cols=2) for i in range(n)
+        ])
+        seen_paths, seen_boards = [], []
+        url = reverse('route_list')
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            self.assertLessEqual(len(ctx.captured_queries), 5)  # session, user and one per section
+            self.assertFalse(any('"path"' in q['sql'] for q in ctx.captured_queries))
+            seen_paths += [p.name for p in resp.context['user_paths']]
+            seen_boards += [b.name for b in resp.context['other_boards']]
+            url = resp.context['paths_next']
+            if url:
+                self.assertIn('More paths', resp.content.decode())
+                url = reverse('route_list') + url
+        self.assertEqual(seen_paths, [f'P{i}' for i in reversed(range(n))])
+        # other_boards stayed on its first page while paths were walked
+        self.assertEqual(seen_boards[:DASHBOARD_PAGE_SIZE], [f'O{i}' for i in reversed(range(n))][:DASHBOARD_PAGE_SIZE])
+
+    def test_bad_cursor_restarts(self):
+        resp = self.client.get(reverse('route_list'), {'boards': 'garbage!', 'paths': 'W10='})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([b.name for b in resp.context['boards']], ['Mine'])
+
+    def test_tampered_cursor_values_restart(self):
+        # ["notadate", 1], [{"a": 1}] and [[1]]: well-formed cursors holding values of the wrong type
+        for params in ({'paths': 'WyJub3RhZGF0ZSIsIDFd'}, {'boards': 'W3siYSI6IDF9XQ=='}, {'other_boards': 'W1sxXV0='}):
+            resp = self.client.get(reverse('route_list'), params)
+            self.assertEqual(resp.status_code, 200, params)
+            self.assertEqual([b.name for b in resp.context['boards']], ['Mine'])
@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from mysite.databases import from_environ, sqlite_database
+
+
+class DatabaseProfileTestCase(SimpleTestCase):
+    def open(self, database):
+        connection = ConnectionHandler({'default': {}, 'profile': database})['profile']
+        self.addCleanup(connection.close)
+        return connection
+
+    def pragma(self, connection, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_development_is_plain_sqlite(self):
+        database = from_environ('db.sqlite3', environ={})
+        self.assertEqual(database, {'ENGINE': 'django.db.backends.sqlite3', 'NAME': 'db.sqlite3'})
+
+    def test_production_profile_from_environment(self):
+        database = from_environ('db.sqlite3', environ={
+            'PLANER_DB_PROFILE': 'production', 'PLANER_DB_PATH': '/srv/planer.sqlite3', 'PLANER_DB_CONN_MAX_AGE': '60',
+        })
+        self.assertEqual(database['NAME'], '/srv/planer.sqlite3')
+        self.assertEqual(database['CONN_MAX_AGE'], 60)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+        with self.assertRaises(ValueError):
+            from_environ('db.sqlite3', environ={'PLANER_DB_PROFILE': 'staging'})
+
+    def test_production_connection_is_tuned(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            connection = self.open(sqlite_database(os.path.join(tmp, 'db.sqlite3'), 'production', timeout=5))
+            self.assertEqual(self.pragma(connection, 'journal_mode'), 'wal')
+            self.assertEqual(self.pragma(connection, 'synchronous'), 1)  # NORMAL
+            self.assertEqual(self.pragma(connection, 'busy_timeout'), 5000)
+            self.assertEqual(self.pragma(connection, 'mmap_size'), 256 * 2**20)
+            connection.close()
+
+    def test_development_connection_keeps_rollback_journal(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            connection = self.open(sqlite_database(os.path.join(tmp, 'db.sqlite3')))
+            self.assertEqual(self.pragma(connection, 'journal_mode'), 'delete')
+            connection.close()
@@ -0,0 +1,175 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from planer.boards import save_board_dots
+from planer.deltas import DeltaError, apply_route_delta, make_room
+from planer.models import SEQ_GAP, BackgroundImage, GameBoard, Pair, Point, Route, UserPath
+from planer.packing import route_coords
+
+
+class RouteDeltaTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        bg = BackgroundImage.objects.create(name='bg', image='test.jpg')
+        self.route = Route.objects.create(user=self.user, background=bg, name='R')
+        for i in range(4):
+            Point.objects.create(route=self.route, x=i, y=0)
+
+    def revision(self):
+        return Route.objects.get(id=self.route.id).revision
+
+    def xs(self):
+        return list(Point.objects.filter(route=self.route).order_by('seq', 'id').values_list('x', flat=True))
+
+    def apply(self, *ops):
+        return apply_route_delta(self.route.id, {'revision': self.revision(), 'ops': list(ops)})
+
+    def test_ops_apply_in_order(self):
+        revision = self.revision()
+        result = self.apply(
+            {'op': 'insert', 'index': 0, 'value': [{'x': -1, 'y': 0}]},
+            {'op': 'insert', 'index': 2, 'value': [{'x': 0.5, 'y': 0}, {'x': 0.7, 'y': 0}]},
+            {'op': 'append', 'value': [{'x': 9, 'y': 0}]},
+            {'op': 'replace', 'index': 1, 'value': [{'x': 0, 'y': 5}]},
+            {'op': 'delete', 'start': 5, 'stop': 7},
+            {'op': 'append', 'target': 'pairs', 'value': [{'x1': 0, 'y1': 0, 'x2': 1, 'y2': 1}]},
+        )
+        self.assertEqual(self.xs(), [-1, 0, 0.5, 0.7, 1, 9])
+        self.assertEqual(result, {'revision': revision + 1, 'points': 6, 'pairs': 1})
+        self.assertEqual(self.revision(), revision + 1)
+        self.assertEqual(list(route_coords(self.route.id)[:4]), [-1, 0, 0, 5])
+
+    def test_insert_between_neighbours_touches_no_other_row(self):
+        self.apply({'op': 'append', 'value': [{'x': 4, 'y': 0}]})
+        before = dict(Point.objects.values_list('id', 'seq'))
+        self.apply({'op': 'insert', 'index': 2, 'value': [{'x': 1.5, 'y': 0}]})
+        after = dict(Point.objects.values_list('id', 'seq'))
+        self.assertEqual({k: after[k] for k in before}, before)
+        self.assertEqual(self.xs(), [0, 1, 1.5, 2, 3, 4])
+
+    def test_repeated_inserts_at_one_spot_respace_neighbours(self):
+        for i in range(15):  # halves the gap each time, then needs room
+            self.apply({'op': 'insert', 'index': 2, 'value': [{'x': 1.9 - i / 100, 'y': 0}]})
+        xs = self.xs()
+        self.assertEqual(xs[:2] + xs[-2:], [0, 1, 2, 3])
+        self.assertEqual(xs[2:-2], sorted(xs[2:-2]))
+        seqs = list(Point.objects.order_by('seq', 'id').values_list('seq', flat=True))
+        self.assertEqual(len(set(seqs)), len(seqs))
+
+    def test_make_room_handles_equal_seqs(self):
+        Point.objects.filter(route=self.route).update(seq=SEQ_GAP)
+        queryset = Point.objects.filter(route=self.route).order_by('seq', 'id')
+        ids = list(queryset.values_list('id', flat=True))
+        seqs = make_room(queryset, 2, 1, 4)
+        stored = dict(queryset.values_list('id', 'seq'))
+        self.assertLess(stored[ids[1]], seqs[0])
+        self.assertLess(seqs[0], stored[ids[2]])
+        self.assertEqual(list(queryset.values_list('id', flat=True)), ids)
+
+    def test_errors_roll_back_everything(self):
+        revision = self.revision()
+        with self.assertRaises(DeltaError) as caught:
+            self.apply(
+                {'op': 'append', 'value': [{'x': 4, 'y': 0}]},
+                {'op': 'delete', 'start': 2, 'stop': 9},
+            )
+        self.assertEqual(caught.exception.errors[0]['op'], 1)
+        with self.assertRaises(DeltaError) as caught:
+            self.apply({'op': 'recolor', 'from': 'red', 'to': 'blue'})
+        with self.assertRaises(DeltaError):
+            self.apply({'op': 'insert', 'target': 'pairs', 'index': 0, 'value': [{'x1': 0, 'y1': 0, 'x2': 1, 'y2': 1}]})
+        with self.assertRaises(DeltaError):
+            self.apply({'op': 'append', 'value': [{'x': 'a', 'y': 0}]})
+        self.assertEqual(self.xs(), [0, 1, 2, 3])
+        self.assertEqual(self.revision(), revision)
+
+    def test_replace_writes_changed_rows_only(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.apply({'op': 'replace', 'index': 0, 'value': [{'x': 0, 'y': 0}, {'x': 1, 'y': 7}]})
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "planer_point"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(updates[0].count('WHEN'), 2)  # x and y of the second point only
+        self.assertEqual(self.xs(), [0, 1, 2, 3])
+
+
+class DeltaAPITestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        bg = BackgroundImage.objects.create(name='bg', image='test.jpg')
+        self.route = Route.objects.create(user=self.user, background=bg, name='R')
+        Point.objects.create(route=self.route, x=0, y=0)
+        Pair.objects.create(route=self.route, x1=0, y1=0, x2=1, y2=1)
+        self.client.force_authenticate(self.user)
+        self.url = f'/planer/api/trasy/{self.route.id}/delta/'
+
+    def test_route_delta_and_stale_revision(self):
+        revision = self.client.get(f'/planer/api/trasy/{self.route.id}/').data['revision']
+        body = {'revision': revision, 'ops': [{'op': 'delete', 'target': 'pairs', 'start': 0, 'stop': 1}]}
+        resp = self.client.post(self.url, body, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data, {'revision': revision + 1, 'points': 1, 'pairs': 0})
+        resp = self.client.post(self.url, body, format='json')
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp.data['revision'], revision + 1)
+
+    def test_bad_delta_and_other_users_route(self):
+        resp = self.client.post(self.url, {'revision': 'x', 'ops': []}, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('ops', resp.data)
+        other = User.objects.create_user(username='other', password='pass')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.post(self.url, {'revision': 0, 'ops': []}, format='json').status_code, 404)
+
+
+class PathDeltaTestCase(APITestCase):
+    def cells(self, *cols):
+        return [{'row': 0, 'col': col, 'color': 'red', 'route': 0} for col in cols]
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.board = GameBoard.objects.create(user=self.user, name='B', rows=3, cols=4)
+        save_board_dots(self.board, {(0, 0): 'red', (0, 3): 'red'})
+        self.path = UserPath.objects.create(board=self.board, user=self.user, name='p', path=self.cells(1))
+        self.client.force_authenticate(self.user)
+        self.url = f'/planer/api/sciezki/{self.path.id}/delta/'
+
+    def test_append_then_conflict(self):
+        resp = self.client.post(self.url, {'revision': 0, 'ops': [{'op': 'append', 'value': self.cells(2)}]}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data, {'revision': 1, 'steps': 2})
+        self.path.refresh_from_db()
+        self.assertEqual(self.path.path, self.cells(1, 2))
+        self.assertEqual(self.path.step_count, 2)
+        resp = self.client.post(self.url, {'revision': 0, 'ops': [{'op': 'delete', 'start': 0, 'stop': 1}]}, format='json')
+        self.assertEqual(resp.status_code, 409)
+
+    def test_stale_full_save_takes_a_new_revision(self):
+        stale = UserPath.objects.get(id=self.path.id)
+        resp = self.client.post(self.url, {'revision': 0, 'ops': [{'op': 'append', 'value': self.cells(2)}]}, format='json')
+        self.assertEqual(resp.data['revision'], 1)
+        stale.name = 'renamed'
+        stale.save()
+        self.assertEqual(stale.revision, 2)
+        self.assertEqual(UserPath.objects.get(id=self.path.id).revision, 2)
+        # A client still at revision 1 now gets a conflict instead of the divergent path
+        resp = self.client.post(self.url, {'revision': 1, 'ops': [{'op': 'delete', 'start': 0, 'stop': 1}]}, format='json')
+        self.assertEqual(resp.status_code, 409)
+
+    def test_invalid_result_is_rejected(self):
+        resp = self.client.post(self.url, {'revision': 0, 'ops': [
+            {'op': 'append', 'value': self.cells(2)},
+            {'op': 'recolor', 'from': 'red', 'to': 'blue'},
+        ]}, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.path.refresh_from_db()
+        self.assertEqual(self.path.revision, 0)
+        self.assertEqual(self.path.path, self.cells(1))
+
+    def test_only_owner_may_edit(self):
+        User.objects.create_user(username='other', password='pass')
+        self.client.force_authenticate(User.objects.get(username='other'))
+        resp = self.client.post(self.url, {'revision': 0, 'ops': [{'op': 'append', 'value': self.cells(2)}]}, format='json')
+        self.assertEqual(resp.status_code, 404)
@@ -0,0 +1,96 @@
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase
+
+from planer import events
+from planer.broker import InMemoryBroker
+from planer.models import GameBoard, UserPath
+
+
+class EventsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.board = GameBoard.objects.create(user=self.user, name='B', rows=3, cols=3)
+        self.broker = InMemoryBroker()
+        self.subscription = self.broker.subscribe()
+        patcher = mock.patch('planer.events.get_broker', return_value=self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def use_dispatcher(self, window):
+        dispatcher = events.Dispatcher(window)
+        patcher = mock.patch('planer.events.get_dispatcher', return_value=dispatcher)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return dispatcher
+
+    def received(self, subscription=None):
+        return [(e.name, json.loads(e.data)) for e in (subscription or self.subscription).get(timeout=0)]
+
+    def test_published_after_commit_without_extra_queries(self):
+        self.use_dispatcher(0)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertNumQueries(1):
+                user_path = UserPath.objects.create(board=self.board, user=self.user, name='p', path=[])
+            self.assertEqual(self.received(), [])
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.received(), [('newPath', {
+            'path_id': user_path.id, 'board_id': self.board.id, 'board_name': 'B',
+            'user_username': 'user', 'path_name': 'p',
+        })])
+
+    def test_rolled_back_saves_send_nothing(self):
+        self.use_dispatcher(0)
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                GameBoard.objects.create(user=self.user, name='X', rows=2, cols=2)
+                raise RuntimeError
+        self.assertEqual(self.received(), [])
+
+    def test_burst_is_coalesced(self):
+        dispatcher = self.use_dispatcher(60)  # flushed by hand below
+        other = GameBoard.objects.create(user=self.user, name='C', rows=3, cols=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            paths = [
+                UserPath.objects.create(board_id=self.board.id, user_id=self.user.id, name=f'p{i}', path=[])
+                for i in range(3)
+            ]
+            lone = UserPath.objects.create(board_id=other.id, user_id=self.user.id, name='q', path=[])
+            boards = [GameBoard.objects.create(user_id=self.user.id, name=f'N{i}', rows=2, cols=2) for i in range(2)]
+        self.assertEqual(self.received(), [])
+        with self.assertNumQueries(2):  # board names and usernames, once for the batch
+            dispatcher.flush()
+        self.assertEqual(self.received(), [
+            ('newPaths', {
+                'count': 3, 'path_ids': [p.id for p in paths], 'board_id': self.board.id,
+                'board_name': 'B', 'user_username': 'user',
+            }),
+            ('newPath', {
+                'path_id': lone.id, 'board_id': other.id, 'board_name': 'C',
+                'user_username': 'user', 'path_name': 'q',
+            }),
+            ('newBoards', {'count': 2, 'board_ids': [b.id for b in boards], 'creator_username': 'user'}),
+        ])
+
+    def test_events_reach_their_board_and_user_topics(self):
+        dispatcher = self.use_dispatcher(60)
+        other = User.objects.create_user(username='other', password='pass')
+        by_board = self.broker.subscribe(topics={f'board:{self.board.id}'})
+        by_other = self.broker.subscribe(topics={f'user:{other.id}'})
+        with self.captureOnCommitCallbacks(execute=True):
+            UserPath.objects.create(board=self.board, user=self.user, name='p', path=[])
+            UserPath.objects.create(board=self.board, user=other, name='q', path=[])
+            board = GameBoard.objects.create(user=other, name='C', rows=2, cols=2)
+        dispatcher.flush()
+        self.assertEqual([name for name, _ in self.received()], ['newPath', 'newPath', 'newBoard'])
+        self.assertEqual([data['path_name'] for _, data in self.received(by_board)], ['p', 'q'])
+        self.assertEqual(self.received(by_other), [
+            ('newPath', {
+                'path_id': UserPath.objects.get(name='q').id, 'board_id': self.board.id, 'board_name': 'B',
+                'user_username': 'other', 'path_name': 'q',
+            }),
+            ('newBoard', {'board_id': board.id, 'board_name': 'C', 'creator_username': 'other'}),
+        ])
@@ -0,0 +1,58 @@
+import random
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from planer.generator import GeneratorError, create_boards, generate_layout, generate_layouts
+from planer.models import Dot, GameBoard
+from planer.solver import SOLVED, solve
+
+
+class GeneratorTestCase(SimpleTestCase):
+    def test_layouts_are_solvable(self):
+        rng = random.Random(5)
+        for rows, cols, pairs in ((4, 4, 3), (6, 5, 4), (7, 7, 6)):
+            layout = generate_layout(rows, cols, pairs, rng)
+            cells = [cell for _, a, b in layout for cell in (a, b)]
+            self.assertEqual(len(layout), pairs)
+            self.assertEqual(len(set(cells)), 2 * pairs)
+            self.assertTrue(all(0 <= r < rows and 0 <= c < cols for r, c in cells))
+            self.assertEqual(len({color for color, _, _ in layout}), pairs)
+            self.assertEqual(solve(rows, cols, layout).status, SOLVED)
+
+    def test_seed_is_repeatable_for_any_worker_count(self):
+        inline = list(generate_layouts(5, 5, 3, 30, seed=11))
+        self.assertEqual(len(inline), 30)
+        self.assertEqual(list(generate_layouts(5, 5, 3, 30, seed=11, workers=2)), inline)
+        self.assertNotEqual(list(generate_layouts(5, 5, 3, 30, seed=12)), inline)
+
+    def test_too_many_pairs(self):
+        with self.assertRaises(GeneratorError):
+            list(generate_layouts(3, 3, 4, 1))
+
+
+class GenerateBoardsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.force_authenticate(self.user)
+        self.url = '/planer/api/plansze/generuj/'
+
+    def test_create_boards(self):
+        ids = create_boards(self.user, 5, 6, generate_layouts(5, 6, 4, 3, seed=1))
+        boards = GameBoard.objects.filter(id__in=ids).order_by('id')
+        self.assertEqual([b.name for b in boards], ['Losowa 5x6 #1', 'Losowa 5x6 #2', 'Losowa 5x6 #3'])
+        self.assertEqual(Dot.objects.filter(board__in=boards).count(), 24)
+
+    def test_api(self):
+        resp = self.client.post(self.url, {'rows': 6, 'cols': 6, 'pairs': 4, 'count': 2, 'name': 'Zestaw'})
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data['count'], 2)
+        board = GameBoard.objects.get(id=resp.data['boards'][0])
+        self.assertEqual((board.user, board.name, board.dots.count()), (self.user, 'Zestaw #1', 8))
+
+        self.assertEqual(self.client.post(self.url, {'rows': 2, 'cols': 2, 'pairs': 2}).status_code, 400)
+        self.assertEqual(self.client.post(self.url, {'rows': 1, 'cols': 6, 'pairs': 1}).status_code, 400)
+        self.assertEqual(self.client.post(self.url, {'rows': 6, 'cols': 6, 'pairs': 1, 'count': 101}).status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertIn(self.client.post(self.url, {'rows': 6, 'cols': 6, 'pairs': 1}).status_code, (401, 403))
@@ -0,0 +1,92 @@
+import json
+from io import StringIO
+from unittest import mock
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import F
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from planer import geometry
+from planer.ingest import ingest_points
+from planer.models import Route, Point, BackgroundImage, RouteGeometry
+
+class GeometryTestCase(APITestCase):
+    def test_stats(self):
+        result = geometry.stats(np.array([[0, 0], [3, 4], [3, 5]], dtype=float))
+        self.assertEqual(result['length'], 6)
+        self.assertEqual(result['segments'], 2)
+        self.assertEqual(result['segment']['max'], 5)
+        self.assertEqual(result['bbox'], [0, 0, 3, 5])
+        self.assertIsNone(geometry.stats(np.empty((0, 2)))['bbox'])
+
+    def test_simplify(self):
+        points = np.array([[0, 0], [1, 0.01], [2, -0.01], [3, 5], [4, 6], [5, 7]], dtype=float)
+        self.assertEqual(geometry.simplify(points, 0.1).tolist(), [[0, 0], [2, -0.01], [3, 5], [5, 7]])
+        self.assertEqual(geometry.simplify(points, 100).tolist(), [[0, 0], [5, 7]])
+        loop = np.array([[0, 0], [1, 0], [1, 1], [0, 0]], dtype=float)
+        self.assertEqual(geometry.simplify(loop, 0.8).tolist(), [[0, 0], [1, 1], [0, 0]])
+
+    def test_resample(self):
+        points = np.array([[0, 0], [10, 0], [10, 10]], dtype=float)
+        self.assertEqual(geometry.resample(points, 5).tolist(), [[0, 0], [5, 0], [10, 0], [10, 5], [10, 10]])
+        self.assertEqual(geometry.resample(points[:1], 2).tolist(), [[0, 0], [0, 0]])
+
+    def test_simplify_long_runs_match_short_runs(self):
+        rng = np.random.default_rng(0)
+        points = np.cumsum(rng.uniform(-1, 1, (1000, 2)), axis=0)
+        expected = geometry.simplify(points, 2.0)
+        with mock.patch.object(geometry, 'SHORT_RUN', 2):
+            self.assertEqual(geometry.simplify(points, 2.0).tolist(), expected.tolist())
+
+
+class GeometryEndpointTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        bg = BackgroundImage.objects.create(name='bg', image='test.jpg')
+        self.route = Route.objects.create(user=self.user, background=bg, name='R')
+        ingest_points(self.route, [{'x': x, 'y': 0} for x in range(11)])
+        self.client.force_authenticate(self.user)
+        self.url = f'/planer/api/trasy/{self.route.id}/'
+
+    def test_stats_endpoint(self):
+        resp = self.client.get(self.url + 'stats/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['length'], 10)
+
+    def test_simplify_cached_until_points_change(self):
+        resp = self.client.get(self.url + 'simplify/', {'tolerance': 0.5})
+        self.assertEqual(resp.data['coords'], [0, 0, 10, 0])
+        self.assertEqual(resp.data['original_count'], 11)
+        with self.assertNumQueries(2):  # route lookup and packed copy; the simplification is cached
+            self.client.get(self.url + 'simplify/', {'tolerance': 0.5})
+        Point.objects.create(route=self.route, x=10, y=10)
+        resp = self.client.get(self.url + 'simplify/', {'tolerance': 0.5})
+        self.assertEqual(resp.data['coords'], [0, 0, 10, 0, 10, 10])
+
+    def test_simplify_cache_follows_database_revision(self):
+        # A change made by another process only reaches this one through the database
+        geometry.simplified_route(self.route.id, 0.5)
+        Point.objects.bulk_create([Point(route=self.route, x=10, y=10, seq=10 ** 9)])
+        RouteGeometry.objects.filter(route=self.route).delete()
+        Route.objects.filter(pk=self.route.pk).update(revision=F('revision') + 1)
+        self.assertEqual(geometry.simplified_route(self.route.id, 0.5).tolist(), [[0, 0], [10, 0], [10, 10]])
+
+    def test_resample_endpoint(self):
+        resp = self.client.get(self.url + 'resample/', {'step': 2.5})
+        self.assertEqual(resp.data['coords'], [0, 0, 2.5, 0, 5, 0, 7.5, 0, 10, 0])
+        for params in ({}, {'count': 0}, {'count': 'x'}, {'step': 0}, {'count': 10 ** 6}):
+            resp = self.client.get(self.url + 'resample/', params)
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_edit_page_and_command(self):
+        self.client.login(username='user', password='pass')
+        with mock.patch.object(geometry, 'RENDER_MIN_POINTS', 5):
+            resp = self.client.get(reverse('edit_and_view_route', args=[self.route.id]))
+        self.assertEqual(json.loads(resp.context['coords']), [[0, 0], [10, 0]])
+        self.assertIn('window.ROUTE_COORDS = [[0.0, 0.0], [10.0, 0.0]];', resp.content.decode())
+        out = StringIO()
+        call_command('analyze_routes', '--simplify', '0.5', stdout=out)
+        self.assertIn('-> 2 points', out.getvalue())
+        self.assertIn('1 routes, 11 points', out.getvalue())
@@ -0,0 +1,120 @@
+import json
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from planer import imaging
+from planer.models import BackgroundImage, Route
+
+
+def image_file(name, size=(600, 300), mode='RGB', color=(200, 30, 30)):
+    buffer = BytesIO()
+    Image.new(mode, size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ImagingTestCase(APITestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings_patch = override_settings(MEDIA_ROOT=media, PLANER_IMAGE_WORKERS=0)
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+        self.user = User.objects.create_user(username='user', password='pass')
+
+    def upload(self, name='map.png', **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            background = BackgroundImage.objects.create(name=name, image=image_file(name, **kwargs))
+        background.refresh_from_db()
+        return background
+
+    def test_pyramid_and_thumbnails_built_on_upload(self):
+        background = self.upload()
+        self.assertEqual((background.width, background.height), (600, 300))
+        self.assertEqual(background.tile_levels, 3)  # 600 -> 300 -> 150 fits one 256 tile
+        self.assertEqual(background.derived_format, 'jpg')
+        root = imaging.derived_root() / background.content_hash
+        manifest = json.loads((root / 'manifest.json').read_text())
+        self.assertEqual(manifest['thumbnails']['small'], [160, 80])
+        self.assertEqual(sorted(p.name for p in (root / 'tiles' / '2').iterdir()),
+                         ['0_0.jpg', '0_1.jpg', '1_0.jpg', '1_1.jpg', '2_0.jpg', '2_1.jpg'])
+        self.assertEqual([p.name for p in (root / 'tiles' / '0').iterdir()], ['0_0.jpg'])
+        with Image.open(root / 'tiles' / '2' / '2_1.jpg') as tile:
+            self.assertEqual(tile.size, (88, 44))
+
+    def test_transparent_images_keep_alpha(self):
+        background = self.upload(mode='RGBA', color=(0, 0, 0, 0))
+        self.assertEqual(background.derived_format, 'png')
+
+    def test_identical_content_reuses_derived_files(self):
+        first = self.upload('a.png')
+        with mock.patch.object(imaging, 'build_derivatives') as build:
+            second = self.upload('b.png')
+        build.assert_not_called()
+        self.assertEqual(second.content_hash, first.content_hash)
+        self.assertEqual(second.tile_levels, first.tile_levels)
+
+    def test_processing_waits_for_commit_and_skips_own_updates(self):
+        with mock.patch.object(imaging, 'submit') as submit:
+            with self.captureOnCommitCallbacks() as callbacks:
+                background = BackgroundImage.objects.create(name='bg', image='missing.jpg')
+                background.save(update_fields=['name'])
+            submit.assert_not_called()
+            self.assertEqual(len(callbacks), 1)
+            callbacks[0]()
+            submit.assert_called_once_with(background.id)
+        # A row whose file is gone is left unprocessed
+        with self.assertLogs('planer.imaging', 'WARNING'):
+            self.assertIsNone(imaging.process_background(background.id))
+
+    def test_serializer_exposes_urls(self):
+        background = self.upload()
+        route = Route.objects.create(user=self.user, background=background, name='R')
+        self.client.force_authenticate(self.user)
+        data = self.client.get(f'/planer/api/trasy/{route.id}/').data['background']
+        prefix = f'http://testserver/planer/images/{background.content_hash}/'
+        self.assertEqual(data['thumbnails']['medium'], prefix + 'thumb-medium.jpg')
+        self.assertEqual(data['tiles'], {'url': prefix + 'tiles/{z}/{x}_{y}.jpg', 'tile_size': 256, 'levels': 3})
+        self.assertEqual((data['width'], data['height']), (600, 300))
+
+        pending = BackgroundImage.objects.create(name='bg', image='test.jpg')
+        route.background = pending
+        route.save()
+        data = self.client.get(f'/planer/api/trasy/{route.id}/').data['background']
+        self.assertIsNone(data['thumbnails'])
+        self.assertIsNone(data['tiles'])
+
+    def test_files_served_immutable_with_etag(self):
+        background = self.upload()
+        url = reverse('background_file', args=[background.content_hash, 'tiles/1/0_0.jpg'])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', response['Cache-Control'])
+        response = self.client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        for name in ('tiles/9/0_0.jpg', '../../manifest.json', 'thumb-small.gif'):
+            response = self.client.get(reverse('background_file', args=[background.content_hash, name]))
+            self.assertEqual(response.status_code, 404, name)
+
+    def test_command_backfills_and_prunes(self):
+        background = BackgroundImage.objects.create(name='old', image=image_file('old.png'))
+        stale = imaging.derived_root() / ('0' * 64)
+        stale.mkdir(parents=True)
+        out = StringIO()
+        call_command('build_background_tiles', '--prune', stdout=out)
+        background.refresh_from_db()
+        self.assertEqual(background.tile_levels, 3)
+        self.assertIn('1 background images processed', out.getvalue())
+        self.assertFalse(stale.exists())
+        self.assertTrue((imaging.derived_root() / background.content_hash).exists())
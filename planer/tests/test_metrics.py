@@ -0,0 +1,85 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from planer.metrics import Histogram, MetricsMiddleware, registry
+from planer.models import GameBoard
+
+ENABLED = {'ENABLED': True, 'SAMPLE_RATE': 1.0, 'DUPLICATE_QUERY_THRESHOLD': 3, 'TOKEN': 'secret'}
+
+
+@override_settings(PLANER_METRICS=ENABLED)
+class MetricsMiddlewareTestCase(TestCase):
+    def setUp(self):
+        registry.clear()
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.login(username='user', password='pass')
+
+    def test_records_views_and_sets_server_timing(self):
+        resp = self.client.get(reverse('route_list'))
+        self.assertRegex(resp['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+        self.client.get('/planer/nowhere/')
+        text = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret').content.decode()
+        self.assertIn('planer_requests_total{view="route_list",method="GET",status="200"} 1', text)
+        self.assertIn('planer_requests_total{view="<unresolved>",method="GET",status="404"} 1', text)
+        self.assertIn('planer_request_duration_seconds_count{view="route_list"} 1', text)
+        self.assertIn('planer_db_queries_bucket{view="route_list",le="+Inf"} 1', text)
+        self.assertIn(f'planer_response_size_bytes_sum{{view="route_list"}} {len(resp.content)}', text)
+        self.assertIn('planer_board_cache_hits_total', text)
+
+    def test_repeated_queries_are_flagged(self):
+        board = GameBoard.objects.create(user=self.user, name='B', rows=2, cols=2)
+
+        def n_plus_one(request):
+            for _ in range(3):
+                GameBoard.objects.get(id=board.id)
+            return HttpResponse('ok')
+
+        with self.assertLogs('planer.metrics', 'WARNING') as logs:
+            MetricsMiddleware(n_plus_one)(RequestFactory().get('/'))
+        self.assertIn('ran the same query 3 times', logs.output[0])
+        self.assertEqual(registry.duplicates['<unresolved>'], 1)
+
+    @override_settings(PLANER_METRICS={**ENABLED, 'SAMPLE_RATE': 0})
+    def test_unsampled_requests_only_count(self):
+        resp = self.client.get(reverse('route_list'))
+        self.assertNotIn('Server-Timing', resp)
+        self.assertEqual(registry.latency['route_list'].count, 1)
+        self.assertNotIn('route_list', registry.queries)
+
+    def test_async_requests_are_counted(self):
+        async def view(request):
+            return HttpResponse('ok')
+
+        middleware = MetricsMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = async_to_sync(middleware)(RequestFactory().get('/'))
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual(registry.requests[('<unresolved>', 'GET', 200)], 1)
+        self.assertNotIn('Server-Timing', response)
+
+    def test_endpoint_is_for_staff_or_token(self):
+        # The test client comes from 127.0.0.1, which grants nothing by itself
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+        self.client.login(username='user', password='pass')
+        User.objects.filter(id=self.user.id).update(is_staff=True)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+
+class MetricsDisabledTestCase(TestCase):
+    def test_off_by_default(self):
+        registry.clear()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        self.assertFalse(registry.requests)
+
+    def test_histogram_buckets_are_cumulative(self):
+        hist = Histogram((1, 5))
+        for value in (0, 1, 3, 9):
+            hist.observe(value)
+        self.assertEqual(list(hist.samples()), [(1, 2), (5, 3), ('+Inf', 4)])
+        self.assertEqual((hist.sum, hist.count), (13, 4))
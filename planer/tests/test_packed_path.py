@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from planer.fields import JSON, PACKED, decode_path, encode_path
+from planer.models import GameBoard, UserPath
+
+def stroke(color, route, cells):
+    return [{'row': r, 'col': c, 'color': color, 'route': route} for r, c in cells]
+
+class PackedPathTestCase(TestCase):
+    def test_roundtrip_and_size(self):
+        path = (
+            stroke('#e41a1c', 0, [(0, 1), (0, 2), (1, 2), (2, 2), (2, 1)])
+            + stroke('#377eb8', 1, [(300, 400), (299, 400)])
+            + stroke('#e41a1c', 1, [(5, 5)])
+            + stroke('#e41a1c', 0, [(2, 0)])
+        )
+        data = encode_path(path)
+        self.assertEqual(data[0], PACKED)
+        self.assertEqual(decode_path(data), path)
+        long_path = stroke('#e41a1c', 0, [(0, c) for c in range(1000)])
+        self.assertLess(len(encode_path(long_path)), 270)
+
+    def test_unusual_values_fall_back_to_json(self):
+        for value in ([{'row': 1, 'col': 2}], [{'row': 1.5, 'col': 0, 'color': 'x', 'route': 0}],
+                      stroke('x', True, [(0, 0)]), stroke('x', 0, [(-1, 0)]), {'a': 1}):
+            data = encode_path(value)
+            self.assertEqual(data[0], JSON)
+            self.assertEqual(decode_path(data), value)
+
+    def test_model_field(self):
+        user = User.objects.create_user(username='user', password='pass')
+        board = GameBoard.objects.create(user=user, name='B', rows=3, cols=3)
+        path = stroke('#e41a1c', 0, [(0, 1), (1, 1)])
+        user_path = UserPath.objects.create(board=board, user=user, path=path)
+        self.assertEqual(UserPath.objects.get(id=user_path.id).path, path)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT path FROM planer_userpath WHERE id = %s', [user_path.id])
+            self.assertEqual(bytes(cursor.fetchone()[0]), encode_path(path))
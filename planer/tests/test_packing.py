@@ -0,0 +1,60 @@
+from array import array
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+from rest_framework import status
+from planer.ingest import ingest_points
+from planer.models import Route, Point, BackgroundImage, RouteGeometry
+from planer.packing import pack_coords, unpack_coords, route_coords
+
+class PackingTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.bg = BackgroundImage.objects.create(name='bg', image='test.jpg')
+        self.route = Route.objects.create(user=self.user, background=self.bg, name='Route1')
+
+    def test_roundtrip(self):
+        coords = [1.5, -2.25, 1e300, 0.1]
+        data = pack_coords(coords)
+        self.assertEqual(len(data), 32)
+        self.assertEqual(unpack_coords(data), array('d', coords))
+
+    def test_route_coords_rebuilt_once_then_served_packed(self):
+        Point.objects.create(route=self.route, x=1, y=2)
+        Point.objects.create(route=self.route, x=3, y=4)
+        self.assertFalse(RouteGeometry.objects.exists())
+        self.assertEqual(route_coords(self.route.id).tolist(), [1, 2, 3, 4])
+        self.assertTrue(RouteGeometry.objects.filter(route=self.route).exists())
+        with self.assertNumQueries(1):
+            self.assertEqual(route_coords(self.route.id).tolist(), [1, 2, 3, 4])
+
+    def test_point_save_and_bulk_ingest_invalidate(self):
+        point = Point.objects.create(route=self.route, x=1, y=2)
+        route_coords(self.route.id)
+        point.x = 5
+        point.save()
+        self.assertEqual(route_coords(self.route.id).tolist(), [5, 2])
+        ingest_points(self.route, [{'x': 7, 'y': 8}])
+        self.assertEqual(route_coords(self.route.id).tolist(), [5, 2, 7, 8])
+
+    def test_copy_of_older_revision_not_served(self):
+        # A reader that read the points before a writer committed stores them under the old revision
+        Point.objects.create(route=self.route, x=1, y=2)
+        revision = Route.objects.get(pk=self.route.pk).revision
+        stale = Route.objects.get(pk=self.route.pk)
+        Point.objects.create(route=self.route, x=3, y=4)
+        RouteGeometry.objects.create(route=self.route, points=pack_coords([1, 2]), revision=revision)
+        self.assertEqual(route_coords(self.route.id).tolist(), [1, 2, 3, 4])
+        self.assertEqual(RouteGeometry.objects.get(route=self.route).revision, revision + 1)
+        # A full save of a route loaded before the change leaves its revision alone
+        stale.name = 'Renamed'
+        stale.save()
+        self.assertEqual(Route.objects.get(pk=self.route.pk).revision, revision + 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(route_coords(self.route.id).tolist(), [1, 2, 3, 4])
+
+    def test_coords_endpoint(self):
+        Point.objects.create(route=self.route, x=1, y=2)
+        self.client.force_authenticate(self.user)
+        resp = self.client.get(f'/planer/api/trasy/{self.route.id}/coords/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data, {'count': 1, 'coords': [1.0, 2.0]})
@@ -0,0 +1,67 @@
+import json
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+from planer.models import GameBoard, Dot, UserPath
+from planer.validation import BoardIndex
+
+def cell(row, col, color='r', route=0):
+    return {'row': row, 'col': col, 'color': color, 'route': route}
+
+class PathValidationTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.board = GameBoard.objects.create(user=self.user, name='B', rows=3, cols=4)
+        # r: (0, 0) -> (0, 3); b: (2, 0) -> (2, 2)
+        for row, col, color in [(0, 0, 'r'), (0, 3, 'r'), (2, 0, 'b'), (2, 2, 'b')]:
+            Dot.objects.create(board=self.board, row=row, col=col, color=color)
+        self.index = BoardIndex.for_board(self.board)
+
+    def codes(self, path):
+        return [(e['index'], e['code']) for e in self.index.validate(path)]
+
+    def test_valid_path_from_both_ends(self):
+        validator = self.index.validator()
+        self.assertEqual(validator.extend([cell(0, 1), cell(2, 1, 'b')]), [])
+        self.assertEqual(validator.incomplete(), ['r'])
+        self.assertEqual(validator.extend([cell(0, 2, route=1)]), [])
+        self.assertEqual(validator.incomplete(), [])
+
+    def test_structured_errors(self):
+        self.assertEqual(self.codes([
+            cell(0, 2),            # not next to (0, 0)
+            cell(5, 0),            # off the board
+            cell(1, 0, 'g'),       # no such dot pair
+            cell(0, 0),            # on a dot
+            cell(0, 1),
+            cell(0, 1, route=1),   # crossing
+            {'row': '1', 'col': 0, 'color': 'r', 'route': 0},
+            'x',
+        ]), [(0, 'adjacency'), (1, 'bounds'), (2, 'color'), (3, 'dot'), (5, 'crossing'), (6, 'format'), (7, 'format')])
+
+    def test_no_cells_after_completion(self):
+        self.assertEqual(self.codes([cell(2, 1, 'b'), cell(1, 1, 'b')]), [(1, 'complete')])
+
+    def test_draw_path_rejects_invalid_path(self):
+        self.client.login(username='user', password='pass')
+        url = reverse('draw_path', args=[self.board.id])
+        resp = self.client.post(url, {'path_name': 'bad', 'path_json': json.dumps([cell(1, 3)])})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.context['errors'])
+        self.assertFalse(UserPath.objects.exists())
+        resp = self.client.post(url, {'path_name': 'ok', 'path_json': json.dumps([cell(0, 1)])})
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(UserPath.objects.get().path, [cell(0, 1)])
+
+    def test_validate_paths_command(self):
+        UserPath.objects.create(board=self.board, user=self.user, name='ok', path=[cell(0, 1)])
+        out = StringIO()
+        call_command('validate_paths', stdout=out)
+        self.assertIn('All 1 paths are valid', out.getvalue())
+        UserPath.objects.create(board=self.board, user=self.user, name='bad', path=[cell(1, 1)])
+        with self.assertRaises(CommandError):
+            call_command('validate_paths', stdout=out)
+        self.assertIn("'bad'", out.getvalue())
@@ -0,0 +1,99 @@
+import random
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from planer.boards import save_board_dots
+from planer.models import GameBoard, UserPath
+from planer.router import BLOCKED, CACHE_CELLS, FOUND, get_router, route
+from planer.solver import Solver, SolverError
+from planer.validation import BoardIndex
+
+
+def dots(*specs):
+    return [{'row': r, 'col': c, 'color': color} for r, c, color in specs]
+
+
+class RouterTestCase(SimpleTestCase):
+    def test_open_board_takes_a_manhattan_path(self):
+        result = route(10, 10, dots((0, 0, 'red'), (9, 9, 'red')), 'red')
+        self.assertEqual(result.status, FOUND)
+        self.assertEqual(len(result.cells), 19)
+        self.assertEqual(result.expanded, 18)  # straight to the goal
+        self.assertEqual((result.cells[0], result.cells[-1]), ((0, 0), (9, 9)))
+
+    def test_avoids_dots_and_other_colors_of_the_path(self):
+        board = dots((0, 0, 'red'), (0, 4, 'red'), (0, 2, 'blue'), (4, 2, 'blue'))
+        wall = [{'row': 1, 'col': c, 'color': 'green', 'route': 0} for c in range(1, 4)]
+        own = [{'row': 2, 'col': c, 'color': 'red', 'route': 0} for c in range(5)]  # being replaced
+        result = route(5, 5, board, 'red', wall + own)
+        self.assertEqual(result.status, FOUND)
+        self.assertEqual(result.cells, [(0, 0), (1, 0), (2, 0), (2, 1), (2, 2), (2, 3), (2, 4), (1, 4), (0, 4)])
+
+    def test_blocked_and_errors(self):
+        board = dots((0, 0, 'red'), (2, 2, 'red'), (0, 1, 'blue'), (1, 0, 'blue'))
+        result = route(3, 3, board, 'red')
+        self.assertEqual(result.status, BLOCKED)
+        self.assertIsNone(result.as_user_path())
+        with self.assertRaises(SolverError):
+            route(3, 3, board, 'green')
+
+    def test_matches_breadth_first_lengths_with_reused_buffers(self):
+        rng = random.Random(3)
+        for _ in range(30):
+            rows, cols = 12, 15
+            cells = rng.sample(range(rows * cols), 2 + 40)
+            a, b = divmod(cells[0], cols), divmod(cells[1], cols)
+            board = dots((*a, 'red'), (*b, 'red'))
+            walls = [{'row': i // cols, 'col': i % cols, 'color': 'x', 'route': 0} for i in cells[2:]]
+            result = route(rows, cols, board, 'red', walls)
+
+            solver = Solver(rows, cols, [('red', a, b)])
+            occupied = sum(1 << i for i in cells)
+            expected = solver._shortest_path(cells[0], cells[1], occupied)
+            self.assertEqual(result.cells is None, expected is None)
+            if expected is not None:
+                self.assertEqual(len(result.cells), len(expected))
+        self.assertIs(get_router(12, 15), get_router(12, 15))
+        self.assertIsNot(get_router(CACHE_CELLS + 1, 1), get_router(CACHE_CELLS + 1, 1))  # too big to keep
+
+    @mock.patch('planer.router.MAX_CELLS', 20)
+    def test_large_boards_are_refused(self):
+        with self.assertRaises(SolverError):
+            route(5, 5, dots((0, 0, 'red'), (4, 4, 'red')), 'red')
+
+
+class RouterAPITestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.board = GameBoard.objects.create(user=self.user, name='B', rows=4, cols=5)
+        save_board_dots(self.board, {(0, 0): 'red', (0, 4): 'red', (3, 0): 'blue', (3, 4): 'blue'})
+        self.client.force_authenticate(self.user)
+        self.url = f'/planer/api/plansze/{self.board.id}/route/'
+
+    def test_route_is_a_valid_drawn_path(self):
+        resp = self.client.get(self.url, {'color': 'red'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['status'], 'found')
+        self.assertEqual(resp.data['path'], [{'row': 0, 'col': c, 'color': 'red', 'route': 0} for c in (1, 2, 3)])
+        self.assertEqual(BoardIndex.for_board(self.board).validate(resp.data['path']), [])
+
+    def test_existing_path_is_avoided(self):
+        drawn = [{'row': 0, 'col': 2, 'color': 'blue', 'route': 0}]  # need not be valid to act as an obstacle
+        user_path = UserPath.objects.create(board=self.board, user=self.user, name='p', path=drawn)
+        resp = self.client.get(self.url, {'color': 'red', 'path_id': user_path.id})
+        cells = [(cell['row'], cell['col']) for cell in resp.data['path']]
+        self.assertNotIn((0, 2), cells)
+        self.assertEqual(len(cells), 5)
+
+        other = User.objects.create_user(username='other', password='pass')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(self.url, {'color': 'red', 'path_id': user_path.id}).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'color': 'green'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+    @mock.patch('planer.router.MAX_CELLS', 10)
+    def test_large_board_is_a_bad_request(self):
+        self.assertEqual(self.client.get(self.url, {'color': 'red'}).status_code, 400)
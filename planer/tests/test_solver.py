@@ -0,0 +1,106 @@
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+from rest_framework import status
+from planer.models import GameBoard, Dot, UserPath
+from planer.validation import validate_stored_paths
+from planer.solver import solve, pairs_from_dots, SolverError, SOLVED, UNSOLVABLE, UNKNOWN
+
+# Classic 5x5 Flow level: one letter per color, '.' is empty
+LEVEL = ["R.G.Y",
+         "..B.O",
+         ".....",
+         ".G.Y.",
+         ".RBO."]
+
+def level_pairs(grid):
+    return pairs_from_dots(
+        {'row': r, 'col': c, 'color': ch}
+        for r, line in enumerate(grid) for c, ch in enumerate(line) if ch != '.'
+    )
+
+class SolverTestCase(APITestCase):
+    def assertValidSolution(self, rows, cols, pairs, solution, fill=False):
+        self.assertEqual(solution.status, SOLVED)
+        used = set()
+        for color, a, b in pairs:
+            cells = solution.paths[color]
+            self.assertEqual({cells[0], cells[-1]}, {a, b})
+            for (r1, c1), (r2, c2) in zip(cells, cells[1:]):
+                self.assertEqual(abs(r1 - r2) + abs(c1 - c2), 1)
+            self.assertFalse(used & set(cells))
+            used |= set(cells)
+        if fill:
+            self.assertEqual(len(used), rows * cols)
+
+    def test_solves_level(self):
+        pairs = level_pairs(LEVEL)
+        self.assertValidSolution(5, 5, pairs, solve(5, 5, pairs))
+        self.assertValidSolution(5, 5, pairs, solve(5, 5, pairs, fill=True), fill=True)
+
+    def test_crossing_pairs_unsolvable(self):
+        pairs = [('a', (0, 0), (2, 2)), ('b', (0, 2), (2, 0))]
+        self.assertEqual(solve(3, 3, pairs).status, UNSOLVABLE)
+
+    def test_node_limit(self):
+        pairs = [('a', (0, 0), (5, 5)), ('b', (0, 5), (5, 0))]
+        self.assertEqual(solve(6, 6, pairs, fill=True, node_limit=5).status, UNKNOWN)
+
+    def test_invalid_boards(self):
+        with self.assertRaises(SolverError):
+            pairs_from_dots([{'row': 0, 'col': 0, 'color': 'red'}])
+        with self.assertRaises(SolverError):
+            solve(3, 3, [('a', (0, 0), (3, 0))])
+
+    def test_deep_search_needs_no_recursion(self):
+        # Filling a 2 x 510 board is one path more than a thousand cells long
+        solution = solve(2, 510, [('a', (0, 0), (1, 0))], fill=True)
+        self.assertValidSolution(2, 510, [('a', (0, 0), (1, 0))], solution, fill=True)
+
+    @mock.patch('planer.solver.MAX_CELLS', 20)
+    def test_large_boards_are_refused(self):
+        with self.assertRaises(SolverError):
+            solve(5, 5, [('a', (0, 0), (4, 4))])
+
+class SolverEndpointTestCase(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.other = User.objects.create_user(username='other', password='pass')
+        self.board = GameBoard.objects.create(user=self.owner, name='Level', rows=5, cols=5)
+        Dot.objects.bulk_create([
+            Dot(board=self.board, row=r, col=c, color=ch)
+            for r, line in enumerate(LEVEL) for c, ch in enumerate(line) if ch != '.'
+        ])
+
+    def test_solve_endpoint(self):
+        self.client.force_authenticate(self.other)
+        resp = self.client.get(f'/planer/api/plansze/{self.board.id}/solve/', {'fill': 1})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['status'], SOLVED)
+        self.assertEqual(sum(len(cells) for cells in resp.data['paths'].values()), 25)
+        self.assertEqual(len(resp.data['path']), 25 - 10)
+        self.assertEqual(set(resp.data['path'][0]), {'row', 'col', 'color', 'route'})
+
+    @mock.patch('planer.solver.MAX_CELLS', 20)
+    def test_large_board_is_a_bad_request(self):
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(f'/planer/api/plansze/{self.board.id}/solve/').status_code, 400)
+
+    def test_solve_requires_auth(self):
+        resp = self.client.get(f'/planer/api/plansze/{self.board.id}/solve/')
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_unpaired_dot_rejected(self):
+        Dot.objects.create(board=self.board, row=2, col=2, color='X')
+        self.client.force_authenticate(self.owner)
+        resp = self.client.get(f'/planer/api/plansze/{self.board.id}/solve/')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_management_command_saves_path(self):
+        out = StringIO()
+        call_command('solve_board', self.board.id, '--fill', '--save-as', 'auto', stdout=out)
+        self.assertIn('solved', out.getvalue())
+        self.assertEqual(UserPath.objects.get(name='auto').user, self.owner)
+        self.assertEqual(list(validate_stored_paths()), [])
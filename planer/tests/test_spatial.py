@@ -0,0 +1,97 @@
+import random
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+from rest_framework import status
+from planer.ingest import ingest_points
+from planer.models import Route, Point, Pair, BackgroundImage, RouteCell, RouteGeometry
+from planer.packing import route_coords
+from planer.spatial import (
+    CELL_SIZE, BBox, Circle, matching_route_ids, route_segments, segment_cells, segment_hits_box,
+)
+
+class SpatialIndexTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.bg = BackgroundImage.objects.create(name='bg', image='test.jpg')
+        self.client.force_authenticate(self.user)
+
+    def route(self, name, points=(), pairs=()):
+        route = Route.objects.create(user=self.user, background=self.bg, name=name)
+        ingest_points(route, [{'x': x, 'y': y} for x, y in points])
+        for x1, y1, x2, y2 in pairs:
+            Pair.objects.create(route=route, x1=x1, y1=y1, x2=x2, y2=y2)
+        return route
+
+    def names(self, **params):
+        resp = self.client.get('/planer/api/trasy/', params)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        return sorted(r['name'] for r in resp.data['results'])
+
+    def test_diagonal_segment_cells(self):
+        self.assertEqual(sorted(segment_cells(1, 1, 30, 10)), [(0, 0), (1, 0), (2, 0), (2, 1), (3, 1)])
+        self.assertEqual(sorted(segment_cells(1, 1, 1, 20)), [(0, 0), (0, 1), (0, 2)])
+        self.assertEqual(sorted(segment_cells(30, 10, 1, 1)), [(0, 0), (1, 0), (2, 0), (2, 1), (3, 1)])
+        self.assertEqual(sorted(segment_cells(4, 4, 20, 20)), [(0, 0), (0, 1), (1, 0), (1, 1), (1, 2), (2, 1), (2, 2)])
+
+    def test_walk_matches_box_tests(self):
+        rng = random.Random(4)
+        for _ in range(200):
+            ax, ay, bx, by = (rng.uniform(-60, 60) for _ in range(4))
+            box = {
+                (cx, cy)
+                for cx in range(-8, 8) for cy in range(-8, 8)
+                if segment_hits_box(ax, ay, bx, by, cx * CELL_SIZE, cy * CELL_SIZE,
+                                    (cx + 1) * CELL_SIZE, (cy + 1) * CELL_SIZE)
+            }
+            self.assertEqual(set(segment_cells(ax, ay, bx, by)), box)
+
+    def test_long_segments_are_tested_exactly(self):
+        route = self.route('Long', [(0, 0), (1e7, 1e7)])
+        route_coords(route.id)
+        self.assertTrue(RouteGeometry.objects.get(route=route).long_segments)
+        self.assertFalse(RouteCell.objects.filter(route=route).exists())
+        self.assertEqual(self.names(bbox='5000000,5000000,5000010,5000010'), ['Long'])
+        self.assertEqual(self.names(bbox='0,1000000,10,1000010'), [])
+
+    def test_index_built_with_geometry(self):
+        route = self.route('R', [(0, 0), (20, 0)])
+        self.assertFalse(RouteCell.objects.exists())
+        route_coords(route.id)
+        geometry = RouteGeometry.objects.get(route=route)
+        self.assertEqual((geometry.min_x, geometry.min_y, geometry.max_x, geometry.max_y), (0, 0, 20, 0))
+        self.assertEqual(RouteCell.objects.filter(route=route).count(), 3)
+
+    def test_bbox_filter(self):
+        self.route('Crossing', [(0, 50), (100, 50)])   # no point inside, but the segment passes through
+        self.route('Inside', [(45, 45)])
+        self.route('Outside', [(0, 0), (10, 10)])
+        self.route('Pair', pairs=[(40, 0, 60, 100)])
+        self.assertEqual(self.names(bbox='40,40,60,60'), ['Crossing', 'Inside', 'Pair'])
+        self.assertEqual(self.names(bbox='0,0,10,10'), ['Outside'])
+        self.assertEqual(self.names(bbox='200,200,300,300'), [])
+
+    def test_near_filter(self):
+        self.route('Close', [(0, 0), (100, 0)])
+        self.route('Far', [(0, 20), (100, 20)])
+        self.assertEqual(self.names(near='50,5', radius='6'), ['Close'])
+        self.assertEqual(self.names(near='50,10', radius='10'), ['Close', 'Far'])
+
+    def test_index_follows_point_changes(self):
+        route = self.route('R', [(0, 0)])
+        self.assertEqual(self.names(bbox='90,90,110,110'), [])
+        Point.objects.create(route=route, x=100, y=100)
+        self.assertEqual(self.names(bbox='90,90,110,110'), ['R'])
+
+    def test_shapes_agree_with_brute_force(self):
+        rng = random.Random(1)
+        routes = [self.route(f'R{i}', [(rng.uniform(0, 200), rng.uniform(0, 200)) for _ in range(5)]) for i in range(20)]
+        queryset = Route.objects.filter(user=self.user)
+        for shape in [BBox(50, 60, 90, 75), Circle(100, 100, 17.5), BBox(0, 0, 8, 8)]:
+            expected = {r.id for r in routes if any(
+                shape.hits(*segment) for segment in route_segments(route_coords(r.id), []))}
+            self.assertEqual(matching_route_ids(queryset, shape), expected)
+
+    def test_invalid_params(self):
+        for params in ({'bbox': '1,2,3'}, {'bbox': '5,0,1,1'}, {'near': '1,1'}, {'near': 'a,b', 'radius': '1'}):
+            resp = self.client.get('/planer/api/trasy/', params)
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST, params)
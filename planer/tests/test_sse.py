@@ -0,0 +1,54 @@
+import asyncio
+from unittest import mock
+from django.test import SimpleTestCase, RequestFactory, override_settings
+from planer.broker import InMemoryBroker
+from planer.views import sse_notifications
+
+class SseNotificationsTestCase(SimpleTestCase):
+    def setUp(self):
+        self.broker = InMemoryBroker()
+        patcher = mock.patch('planer.views.get_broker', return_value=self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def open_stream(self, query=None, **headers):
+        request = RequestFactory().get('/planer/sse/notifications/', query, headers=headers)
+        response = await sse_notifications(request)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        return stream
+
+    async def test_event_wakes_listener_immediately(self):
+        stream = await self.open_stream()
+        chunk = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        self.broker.publish('newBoard', {'board_id': 7})
+        payload = await asyncio.wait_for(chunk, timeout=1)
+        self.assertEqual(payload, b'id: 1\nevent: newBoard\ndata: {"board_id": 7}\n\n')
+        await stream.aclose()
+
+    @override_settings(PLANER_SSE_KEEPALIVE=0.01)
+    async def test_keepalive_on_idle_stream(self):
+        stream = await self.open_stream()
+        self.assertEqual(await asyncio.wait_for(anext(stream), timeout=1), b': keep-alive\n\n')
+        await stream.aclose()
+
+    async def test_resume_from_last_event_id(self):
+        for i in range(3):
+            self.broker.publish('newPath', {'path_id': i})
+        stream = await self.open_stream(**{'Last-Event-ID': '1'})
+        self.assertTrue((await anext(stream)).startswith(b'id: 2\n'))
+        self.assertTrue((await anext(stream)).startswith(b'id: 3\n'))
+        await stream.aclose()
+
+    async def test_topic_scoped_stream(self):
+        stream = await self.open_stream({'topic': ['board:5']})
+        self.broker.publish('newPath', {'path_id': 1}, ('global', 'board:4'))
+        self.broker.publish('newPath', {'path_id': 2}, ('global', 'board:5'))
+        self.assertTrue((await asyncio.wait_for(anext(stream), timeout=1)).startswith(b'id: 2\n'))
+        await stream.aclose()
+
+    async def test_malformed_topic(self):
+        request = RequestFactory().get('/planer/sse/notifications/', {'topic': 'board:x'})
+        self.assertEqual((await sse_notifications(request)).status_code, 400)
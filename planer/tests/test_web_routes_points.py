@@ -1,7 +1,8 @@
+import json
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.test import TestCase
-from planer.models import BackgroundImage, Route, Point
+from planer.models import BackgroundImage, GameBoard, Route, Point
 
 class WebRoutesPointsTestCase(TestCase):
     def setUp(self):
@@ -49,3 +50,21 @@ class WebRoutesPointsTestCase(TestCase):
         # Check if point is not visible in the view
         resp = self.client.get(reverse('edit_and_view_route', args=[route.id]))
         self.assertNotContains(resp, "Point (5.0, 15.0)")
+
+    def test_create_route_on_board(self):
+        self.login()
+        board = GameBoard.objects.create(user=self.user, name='B', rows=3, cols=3)
+        url = reverse('create_route_on_board', args=[board.id])
+        route_json = json.dumps([{'row': 0, 'col': 1}, {'row': 2, 'col': 2}])
+        # Without a background the route can't be stored
+        resp = self.client.post(url, {'name': 'OnBoard', 'route_json': route_json})
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('background', resp.context['form'].errors)
+        resp = self.client.post(url, {'name': 'OnBoard', 'background': self.bg.id, 'route_json': '{'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(Route.objects.filter(name='OnBoard').exists())
+        resp = self.client.post(url, {'name': 'OnBoard', 'background': self.bg.id, 'route_json': route_json})
+        self.assertEqual(resp.status_code, 302)
+        route = Route.objects.get(name='OnBoard', user=self.user)
+        self.assertEqual(route.background, self.bg)
+        self.assertEqual(list(route.points.order_by('seq').values_list('x', 'y')), [(1, 0), (2, 2)])
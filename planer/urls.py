@@ -5,6 +5,7 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
+from .metrics import metrics_view
 from .views import sse_notifications
 
 urlpatterns = [
@@ -23,4 +24,6 @@ urlpatterns = [
     path('board/<int:board_id>/draw/', views.draw_path, name='draw_path'),
     path('board/<int:board_id>/create_route/', views.create_user_route_on_board, name='create_route_on_board'),
     path('sse/notifications/', sse_notifications, name='sse_notifications'),
+    path('images/<str:digest>/<path:name>', views.background_file, name='background_file'),
+    path('metrics/', metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""
+Validation of the paths drawn in draw_path.
+
+A path is a list of {"row", "col", "color", "route"} cells. For every color
+route 0 grows out of the color's first dot and route 1 out of its second (the
+dots in id order, as the editor receives them); cells of one route are listed
+in drawing order. A color is complete once its two routes meet, or one route
+reaches the other dot.
+
+The board is indexed once into a flat occupancy grid, after which a path is
+checked in O(len(path)) and can be extended cell by cell while it is drawn.
+"""
+from django.core.exceptions import ValidationError
+
+from .board_cache import get_snapshot
+from .models import UserPath
+
+DOT = -1  # marker for dot cells in the occupancy grid; path cells hold their point index
+
+
+class BoardIndex:
+    """Dots of one board: an occupancy grid plus both dot cells per color."""
+
+    def __init__(self, rows, cols, dots):
+        self.rows = rows
+        self.cols = cols
+        self.grid = [None] * (rows * cols)
+        self.ends = {}
+        for dot in dots:
+            cell = dot['row'] * cols + dot['col']
+            self.grid[cell] = DOT
+            self.ends.setdefault(dot['color'], []).append(cell)
+
+    @classmethod
+    def for_board(cls, board):
+        return cls(board.rows, board.cols, get_snapshot(board).dots)
+
+    def validator(self):
+        return PathValidator(self)
+
+    def validate(self, path):
+        """Structured errors for a whole path; an empty list means it is valid."""
+        return self.validator().extend(path)
+
+
+class PathValidator:
+    """Incremental checker: feed it cells with extend() as they are drawn."""
+
+    def __init__(self, index):
+        self.index = index
+        self.grid = list(index.grid)
+        self.tails = {}
+        self.complete = set()
+        self.count = 0
+        self.errors = []
+
+    def _adjacent(self, a, b):
+        cols = self.index.cols
+        return abs(a // cols - b // cols) + abs(a % cols - b % cols) == 1
+
+    def _tail(self, color, route):
+        return self.tails.get((color, route), self.index.ends[color][route])
+
+    def _check(self, point):
+        index = self.index
+        if not isinstance(point, dict):
+            return 'format', "Punkt musi być obiektem z polami row, col, color i route."
+        row, col, color, route = (point.get(key) for key in ('row', 'col', 'color', 'route'))
+        if type(row) is not int or type(col) is not int or route not in (0, 1):
+            return 'format', "Punkt musi mieć całkowite row i col oraz route równe 0 lub 1."
+        if not (0 <= row < index.rows and 0 <= col < index.cols):
+            return 'bounds', f"Pole ({row}, {col}) leży poza planszą {index.rows} x {index.cols}."
+        if not isinstance(color, str) or len(index.ends.get(color, ())) != 2:
+            return 'color', f"Kolor {color} nie ma na planszy pary kropek."
+        if color in self.complete:
+            return 'complete', f"Ścieżka koloru {color} jest już połączona."
+        cell = row * index.cols + col
+        taken = self.grid[cell]
+        if taken == DOT:
+            return 'dot', f"Pole ({row}, {col}) zajmuje kropka."
+        if taken is not None:
+            return 'crossing', f"Pole ({row}, {col}) jest już zajęte przez punkt #{taken}."
+        if not self._adjacent(cell, self._tail(color, route)):
+            return 'adjacency', f"Pole ({row}, {col}) nie sąsiaduje z końcem ścieżki {color}/{route}."
+        return None
+
+    def extend(self, points):
+        """Validate and take in more cells; returns the errors they caused."""
+        errors = []
+        for point in points:
+            i = self.count
+            self.count += 1
+            problem = self._check(point)
+            if problem:
+                code, message = problem
+                errors.append({'index': i, 'code': code, 'message': message})
+                continue
+            color, route = point['color'], point['route']
+            cell = point['row'] * self.index.cols + point['col']
+            self.grid[cell] = i
+            self.tails[(color, route)] = cell
+            if self._adjacent(cell, self._tail(color, 1 - route)):
+                self.complete.add(color)
+        self.errors += errors
+        return errors
+
+    def incomplete(self):
+        """Colors whose two dots are not connected yet."""
+        return sorted(
+            color for color, ends in self.index.ends.items()
+            if len(ends) == 2 and color not in self.complete and not self._adjacent(*ends)
+        )
+
+
+def validate_path(board, path):
+    """Raise ValidationError listing every problem in `path` on `board`."""
+    if not isinstance(path, list):
+        raise ValidationError("Ścieżka musi być listą punktów.")
+    errors = BoardIndex.for_board(board).validate(path)
+    if errors:
+        raise ValidationError([f"Punkt #{e['index']}: {e['message']}" for e in errors])
+
+
+def validate_stored_paths(queryset=None):
+    """
+    Check stored UserPaths, indexing each board once. Yields (user_path, errors)
+    for every path that fails.
+    """
+    queryset = UserPath.objects.all() if queryset is None else queryset
+    indexes = {}
+    for user_path in queryset.select_related('board').order_by('board_id', 'id').iterator():
+        index = indexes.get(user_path.board_id)
+        if index is None:
+            indexes.clear()  # ordered by board, so earlier boards are done with
+            index = indexes[user_path.board_id] = BoardIndex.for_board(user_path.board)
+        path = user_path.path
+        if not isinstance(path, list):
+            yield user_path, [{'index': None, 'code': 'format', 'message': "Ścieżka musi być listą punktów."}]
+            continue
+        errors = index.validate(path)
+        if errors:
+            yield user_path, errors
@@ -3,33 +3,66 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm  # Add this import
 from .models import BackgroundImage, Route, Point, Pair, GameBoard, Dot, UserPath
 from .forms import RouteForm, PointForm, UserRegistrationForm, PairForm, GameBoardForm
+from .board_cache import EMPTY_SNAPSHOT, get_snapshot, mark_dirty
+from .boards import parse_dots, save_board_dots
+from .conditional import page_etag
+from .ingest import ingest_points
+from .geometry import render_coords
+from . import imaging
+from .packing import invalidate_route_geometry
+from .pagination import keyset_page
+from .validation import validate_path
 from django.contrib.auth import logout, authenticate, login
 from django.contrib.auth.views import LogoutView
-from django.http import JsonResponse, StreamingHttpResponse
+from django.http import FileResponse, Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import condition
 import json
-import time
+import re
 from django.urls import reverse
+from django.conf import settings
+from .broker import get_broker, parse_topics
 
-# Prosta globalna lista subskrybentów (w produkcji użyj kolejki/pubsub)
-subscribers = []
+DASHBOARD_PAGE_SIZE = 20  # rows per section of the route_list dashboard
 
 @login_required
 def route_list(request):
     routes = Route.objects.filter(user=request.user)
-    boards = GameBoard.objects.filter(user=request.user)
-    user_paths = UserPath.objects.filter(user=request.user).select_related('board')
-    other_boards = GameBoard.objects.exclude(user=request.user).select_related('user')
+    # Each section is paged on its own; the path bodies themselves are never loaded
+    user_paths, paths_next = keyset_page(
+        UserPath.objects.filter(user=request.user).select_related('board')
+        .only('id', 'name', 'step_count', 'created_at', 'board__id', 'board__name'),
+        ('-created_at', '-id'), request.GET.get('paths'), DASHBOARD_PAGE_SIZE,
+    )
+    boards, boards_next = keyset_page(
+        GameBoard.objects.filter(user=request.user), ('id',), request.GET.get('boards'), DASHBOARD_PAGE_SIZE,
+    )
+    other_boards, other_boards_next = keyset_page(
+        GameBoard.objects.exclude(user=request.user).select_related('user')
+        .only('id', 'name', 'rows', 'cols', 'user__username'),
+        ('-id',), request.GET.get('other_boards'), DASHBOARD_PAGE_SIZE,
+    )
     context = {
         'routes': routes,
         'boards': boards,
         'user_paths': user_paths,
         'other_boards': other_boards,
+        'paths_next': _next_page_url(request, 'paths', paths_next),
+        'boards_next': _next_page_url(request, 'boards', boards_next),
+        'other_boards_next': _next_page_url(request, 'other_boards', other_boards_next),
         "show_sse_log": True,
     }
     return render(request, "planer/route_list.html", context)
 
+def _next_page_url(request, param, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query[param] = cursor
+    return f'?{query.urlencode()}'
+
 @login_required
 def create_route(request):
     if request.method == 'POST':
@@ -46,7 +79,7 @@ def create_route(request):
 @login_required
 def edit_and_view_route(request, route_id):
     route = get_object_or_404(Route, id=route_id, user=request.user)
-    points = route.points.order_by('id')
+    points = route.points.order_by('seq', 'id')
     pairs = route.pairs.order_by('id')
     grid_size = request.session.get(f'grid_size_{route_id}', 20)
     form = PointForm()
@@ -67,6 +100,7 @@ def edit_and_view_route(request, route_id):
                 pair = pair_form.save(commit=False)
                 pair.route = route
                 pair.save()
+                invalidate_route_geometry(route.id)
                 return redirect('edit_and_view_route', route_id=route.id)
         elif 'add_point' in request.POST or ('x' in request.POST and 'y' in request.POST):
             form = PointForm(request.POST)
@@ -78,78 +112,81 @@ def edit_and_view_route(request, route_id):
         elif 'delete_point' in request.POST:
             point_id = request.POST.get('point_id')
             Point.objects.filter(id=point_id, route=route).delete()
+            invalidate_route_geometry(route.id)
             return redirect('edit_and_view_route', route_id=route.id)
         elif 'delete_pair' in request.POST:
             pair_id = request.POST.get('pair_id')
             Pair.objects.filter(id=pair_id, route=route).delete()
+            invalidate_route_geometry(route.id)
             return redirect('edit_and_view_route', route_id=route.id)
 
     return render(request, 'planer/edit_and_view_route.html', {
         'route': route,
         'points': points,
+        # Geometry for drawing, decoded from the packed copy of the route's current revision
+        # without building Point objects; long routes come simplified (and cached) so the page stays light
+        'coords': json.dumps(render_coords(route)),
         'pairs': pairs,
         'form': form,
         'pair_form': pair_form,
         'grid_size': grid_size,
     })
 
+def _board_stamp(board_id, **filters):
+    return GameBoard.objects.filter(id=board_id, **filters).values_list('version', 'updated_at').first()
+
+def _edit_board_etag(request, board_id=None):
+    if board_id is None:
+        return None
+    return page_etag(request, 'edit_board', board_id, _board_stamp(board_id, user=request.user))
+
 @login_required
+@condition(etag_func=_edit_board_etag)
 def create_or_edit_board(request, board_id=None):
     if board_id:
         board = get_object_or_404(GameBoard, id=board_id, user=request.user)
-        dots = list(board.dots.values('row', 'col', 'color'))
-        # Group dots by color for pairs (only colors with exactly 2 dots)
-        from collections import defaultdict
-        color_map = defaultdict(list)
-        for dot in dots:
-            color_map[dot['color']].append(dot)
-        pairs = [
-            (color, color_map[color])
-            for color in color_map
-            if len(color_map[color]) == 2
-        ]
+        snapshot = get_snapshot(board)
     else:
         board = None
-        dots = []
-        pairs = []
+        snapshot = EMPTY_SNAPSHOT
 
     if request.method == 'POST':
         # Handle pair deletion
         if 'delete_pair_color' in request.POST and board:
             color_to_delete = request.POST.get('delete_pair_color')
-            board.dots.filter(color=color_to_delete).delete()
-            # Refresh dots and pairs after deletion
-            dots = list(board.dots.values('row', 'col', 'color'))
-            from collections import defaultdict
-            color_map = defaultdict(list)
-            for dot in dots:
-                color_map[dot['color']].append(dot)
-            pairs = [
-                (color, color_map[color])
-                for color in color_map
-                if len(color_map[color]) == 2
-            ]
+            with transaction.atomic():
+                board.dots.filter(color=color_to_delete).delete()
+                mark_dirty(board.id)
+            board.refresh_from_db(fields=['version'])
+            snapshot = get_snapshot(board)
+            form = GameBoardForm(instance=board)
         else:
             form = GameBoardForm(request.POST, instance=board)
             if form.is_valid():
-                board = form.save(commit=False)
-                board.user = request.user
-                board.save()
-                board.dots.all().delete()
-                dots_json = request.POST.get('dots_json')
-                if dots_json:
-                    dots_data = json.loads(dots_json)
-                    for dot in dots_data:
-                        Dot.objects.create(board=board, row=dot['row'], col=dot['col'], color=dot['color'])
-                return redirect('route_list')
+                try:
+                    new_dots = parse_dots(
+                        request.POST.get('dots_json'),
+                        form.cleaned_data['rows'],
+                        form.cleaned_data['cols'],
+                    )
+                except ValidationError as e:
+                    form.add_error(None, e)
+                else:
+                    with transaction.atomic():
+                        board = form.save(commit=False)
+                        board.user = request.user
+                        board.save()
+                        # Zapisz tylko różnicę względem kropek w bazie
+                        save_board_dots(board, new_dots)
+                    return redirect('route_list')
     else:
         form = GameBoardForm(instance=board)
 
     return render(request, 'planer/edit_board.html', {
         'form': form,
         'board': board,
-        'dots': json.dumps(dots),
-        'pairs': pairs,
+        'dots': snapshot.dots_json,
+        'pairs': snapshot.pairs.items(),
     })
 
 @login_required
@@ -164,10 +201,22 @@ def delete_board(request, board_id):
 def create_board(request):
     return redirect('create_or_edit_board')
 
+def _draw_path_etag(request, board_id):
+    path_id = request.GET.get('path_id', '')
+    path_stamp = ''
+    if path_id:
+        if not path_id.isdigit():
+            return None
+        path_stamp = UserPath.objects.filter(
+            id=path_id, user=request.user, board_id=board_id,
+        ).values_list('updated_at', flat=True).first()
+    return page_etag(request, 'draw_path', board_id, _board_stamp(board_id), path_id, path_stamp)
+
 @login_required
+@condition(etag_func=_draw_path_etag)
 def draw_path(request, board_id):
     board = get_object_or_404(GameBoard, id=board_id)
-    dots = list(board.dots.values('row', 'col', 'color'))
+    snapshot = get_snapshot(board)
 
     path_id = request.GET.get('path_id')
     path = []
@@ -179,58 +228,75 @@ def draw_path(request, board_id):
         path = user_path.path
         path_name = user_path.name
 
+    errors = []
     if request.method == 'POST':
         path_json = request.POST.get('path_json')
         path_name = request.POST.get('path_name', '').strip()
         if path_json and path_name:
-            if user_path:
-                user_path.path = json.loads(path_json)
-                user_path.name = path_name
-                user_path.save()
+            try:
+                path = json.loads(path_json)
+                validate_path(board, path)
+            except ValueError:
+                errors = ["Nieprawidłowe dane ścieżki (JSON)."]
+                path = []
+            except ValidationError as e:
+                errors = e.messages
             else:
-                UserPath.objects.create(
-                    board=board,
-                    user=request.user,
-                    path=json.loads(path_json),
-                    name=path_name
-                )
-            return redirect('route_list')
+                if user_path:
+                    user_path.path = path
+                    user_path.name = path_name
+                    user_path.save()
+                else:
+                    UserPath.objects.create(
+                        board=board,
+                        user=request.user,
+                        path=path,
+                        name=path_name
+                    )
+                return redirect('route_list')
 
     return render(request, 'planer/draw_path.html', {
         'board': board,
-        'dots': json.dumps(dots),
+        'dots': snapshot.dots_json,
         'path': json.dumps(path),
         'path_name': path_name,
+        'errors': errors,
     })
 
 @login_required
 def create_user_route_on_board(request, board_id):
     board = get_object_or_404(GameBoard, id=board_id)
-    dots = list(board.dots.values('row', 'col', 'color'))
+    snapshot = get_snapshot(board)
+    errors = []
 
     if request.method == 'POST':
-        # Save a new route for this user on this board
-        route_json = request.POST.get('route_json')
-        route_name = request.POST.get('route_name', '').strip()
-        if route_json and route_name:
-            # Create a new Route instance (not UserPath)
-            route = Route.objects.create(
-                user=request.user,
-                background=None,  # or set to a default BackgroundImage if required
-                name=route_name
-            )
-            # Save points for the route
-            route_points = json.loads(route_json)
-            for pt in route_points:
-                Point.objects.create(route=route, x=pt['col'], y=pt['row'])
-            return redirect('route_list')
+        # Save a new route for this user on this board; the form picks its background
+        form = RouteForm(request.POST)
+        try:
+            route_points = json.loads(request.POST.get('route_json') or '[]')
+        except ValueError:
+            route_points = None
+        if not isinstance(route_points, list) or not all(isinstance(pt, dict) for pt in route_points):
+            form.add_error(None, 'Invalid route data.')
+        if form.is_valid():
+            with transaction.atomic():
+                route = form.save(commit=False)
+                route.user = request.user
+                route.save()
+                # Save points for the route through the same bulk path as the API
+                report = ingest_points(route, ({'x': pt.get('col'), 'y': pt.get('row')} for pt in route_points))
+                if not report['errors']:
+                    return redirect('route_list')
+                transaction.set_rollback(True)
+                errors = report['errors']
     else:
-        route_name = ''
+        form = RouteForm()
 
     return render(request, 'planer/create_route_on_board.html', {
         'board': board,
-        'dots': json.dumps(dots),
-        'route_name': route_name,
+        'dots': snapshot.dots_json,
+        'form': form,
+        'errors': errors,
     })
 
 def register(request):
@@ -266,22 +332,60 @@ def logout_view(request):
 class CustomLogoutView(LogoutView):
     next_page = 'login'  # Redirect to the login page after logout
 
-def sse_notifications(request):
-    def event_stream():
-        # Dodaj subskrybenta do globalnej listy
-        queue = []
-        subscribers.append(queue)
+SSE_MAX_TOPICS = 20
+
+async def sse_notifications(request):
+    broker = get_broker()
+    keepalive = getattr(settings, 'PLANER_SSE_KEEPALIVE', 15)
+    # ?topic=board:5&topic=user:3 limits the stream to those boards and users; all events by default
+    try:
+        topics = parse_topics(request.GET.getlist('topic'))
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    if len(topics) > SSE_MAX_TOPICS:
+        return HttpResponseBadRequest(f"At most {SSE_MAX_TOPICS} topics")
+    try:
+        # Przeglądarka wysyła id ostatniego zdarzenia przy ponownym połączeniu
+        last_event_id = int(request.headers['Last-Event-ID'])
+    except (KeyError, ValueError):
+        last_event_id = None
+
+    async def event_stream():
+        subscription = broker.subscribe(last_event_id, topics)
         try:
+            yield "retry: 3000\n\n"
             while True:
-                # Keep-alive co 15s
-                yield ": keep-alive\n\n"
-                # Wysyłaj zdarzenia z kolejki
-                while queue:
-                    event = queue.pop(0)
-                    yield event
-                time.sleep(15)
+                # Czekaj na zdarzenia bez blokowania wątku; keep-alive gdy nic nie przyszło
+                events = await subscription.get_async(timeout=keepalive)
+                if not events:
+                    yield ": keep-alive\n\n"
+                for event in events:
+                    yield event.payload
         finally:
-            subscribers.remove(queue)
+            broker.unsubscribe(subscription)
     response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
     response['Cache-Control'] = 'no-cache'
-    return response
\ No newline at end of file
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+_DIGEST = re.compile(r'[0-9a-f]{64}')
+_DERIVED_NAME = re.compile(r'manifest\.json|thumb-\w+\.(?:jpg|png)|tiles/\d+/\d+_\d+\.(?:jpg|png)')
+
+def _derived_etag(request, digest, name):
+    # Derived files never change under their content hash, so the path itself is the ETag
+    if _DIGEST.fullmatch(digest) and _DERIVED_NAME.fullmatch(name):
+        return f'{digest}/{name}'
+    return None
+
+@condition(etag_func=_derived_etag)
+def background_file(request, digest, name):
+    """A thumbnail, tile or manifest built by planer.imaging."""
+    if _derived_etag(request, digest, name) is None:
+        raise Http404
+    try:
+        f = open(imaging.derived_root() / digest / name, 'rb')
+    except FileNotFoundError:
+        raise Http404
+    response = FileResponse(f)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
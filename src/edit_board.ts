@@ -94,24 +94,14 @@ window.addEventListener('DOMContentLoaded', () => {
                 point2Td.textContent = `(${pair[1].row}, ${pair[1].col})`;
                 tr.appendChild(point2Td);
 
-                // Delete button cell
+                // Delete button cell; the table sits inside the form that carries the CSRF token
                 const deleteTd = document.createElement('td');
-                const deleteForm = document.createElement('form');
-                deleteForm.method = 'post';
-                deleteForm.style.display = 'inline';
-                deleteForm.innerHTML = `
-                    <input type="hidden" name="delete_pair_color" value="${color}">
-                    <button type="submit">Usuń parę</button>
-                `;
-                const csrfToken = document.querySelector('input[name="csrfmiddlewaretoken"]') as HTMLInputElement;
-                if (csrfToken) {
-                    const csrfInput = document.createElement('input');
-                    csrfInput.type = 'hidden';
-                    csrfInput.name = 'csrfmiddlewaretoken';
-                    csrfInput.value = csrfToken.value;
-                    deleteForm.appendChild(csrfInput);
-                }
-                deleteTd.appendChild(deleteForm);
+                const deleteButton = document.createElement('button');
+                deleteButton.type = 'submit';
+                deleteButton.name = 'delete_pair_color';
+                deleteButton.value = color;
+                deleteButton.textContent = 'Usuń parę';
+                deleteTd.appendChild(deleteButton);
                 tr.appendChild(deleteTd);
 
                 pairsTable.appendChild(tr);
@@ -29,6 +29,14 @@ document.addEventListener("DOMContentLoaded", () => {
         const data = JSON.parse(e.data);
         addLog(`Nowa ścieżka: "${data.path_name}" (ID: ${data.path_id}) na planszy "${data.board_name}" (ID planszy: ${data.board_id}) utworzona przez ${data.user_username}`);
     });
+    evtSource.addEventListener("newBoards", function(e: MessageEvent) {
+        const data = JSON.parse(e.data);
+        addLog(`${data.count} nowych plansz (ID: ${data.board_ids.join(", ")}) utworzonych przez ${data.creator_username}`);
+    });
+    evtSource.addEventListener("newPaths", function(e: MessageEvent) {
+        const data = JSON.parse(e.data);
+        addLog(`${data.count} nowych ścieżek na planszy "${data.board_name}" (ID planszy: ${data.board_id}) utworzonych przez ${data.user_username}`);
+    });
     evtSource.onerror = function() {
         addLog("Błąd połączenia z serwerem powiadomień.");
     };